@@ -1,16 +1,18 @@
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Query
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import calendar
 from app.auth.oauth2 import get_current_user
 from app.services.availability_service import AvailabilityService
+from app.services.holiday_service import month_holidays, normalize_state
+from app.services.schedule_service import ScheduleService
 from app.models import schemas
+from app.responses import fast_response
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 # API-Endpunkte
@@ -21,10 +23,10 @@ async def create_availability(
 ):
     """Erstellt eine neue Verfügbarkeit"""
     try:
-        return AvailabilityService.create_availability(
+        return fast_response(AvailabilityService.create_availability(
             username=current_user["username"],
             availability_data=availability
-        )
+        ))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -36,11 +38,25 @@ async def get_availabilities(
     end_date: Optional[date] = None
 ):
     """Holt alle Verfügbarkeiten eines Benutzers"""
-    return AvailabilityService.get_availabilities(
+    return fast_response(AvailabilityService.get_availabilities(
         username=current_user["username"],
         start_date=start_date,
         end_date=end_date
-    )
+    ))
+
+
+@router.get("/free-slots", response_model=List[schemas.FreeSlot])
+async def get_free_slots(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    current_user=Depends(get_current_user)
+):
+    """Eigene freie Zeiten im Zeitraum: Verfügbarkeiten abzüglich der Einsätze"""
+    try:
+        slots = ScheduleService.get_free_slots(username=current_user["username"], start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_response(slots or [])
 
 
 @router.get("/by_id", response_model=schemas.AvailabilityResponse)
@@ -55,7 +71,7 @@ async def get_availability(
     )
     if not availability:
         raise HTTPException(status_code=404, detail="Verfügbarkeit nicht gefunden")
-    return availability
+    return fast_response(availability)
 
 
 @router.delete("/by_id")
@@ -72,6 +88,48 @@ async def delete_availability(
     return {"message": "Verfügbarkeit gelöscht"}
 
 
+@router.delete("/", response_model=schemas.AvailabilityBulkResult)
+async def delete_availabilities_in_range(
+    start_date: date = Query(..., alias="from"),
+    end_date: date = Query(..., alias="to"),
+    name: Optional[str] = None,
+    current_user=Depends(get_current_user)
+):
+    """Löscht alle Verfügbarkeiten im Zeitraum (optional nur mit dieser Bezeichnung)"""
+    try:
+        ids = AvailabilityService.delete_availabilities_in_range(
+            username=current_user["username"],
+            start_date=start_date,
+            end_date=end_date,
+            name=name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.AvailabilityBulkResult(ids=ids, count=len(ids))
+
+
+@router.post("/shift", response_model=schemas.AvailabilityBulkResult)
+async def shift_availabilities_in_range(
+    days: int,
+    start_date: date = Query(..., alias="from"),
+    end_date: date = Query(..., alias="to"),
+    name: Optional[str] = None,
+    current_user=Depends(get_current_user)
+):
+    """Verschiebt alle Verfügbarkeiten im Zeitraum um die angegebene Anzahl Tage"""
+    try:
+        ids = AvailabilityService.shift_availabilities_in_range(
+            username=current_user["username"],
+            start_date=start_date,
+            end_date=end_date,
+            days=days,
+            name=name
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.AvailabilityBulkResult(ids=ids, count=len(ids))
+
+
 @router.get("/page")
 async def availability_page(request: Request, current_user=Depends(get_current_user)):
     # Get current month and year for the calendar
@@ -97,9 +155,10 @@ async def get_calendar(
     request: Request,
     current_user=Depends(get_current_user),
     year: Optional[int] = None,
-    month: Optional[int] = None
+    month: Optional[int] = None,
+    state: Optional[str] = None
 ):
-    """Liefert eine Kalenderansicht für HTMX"""
+    """Liefert eine Kalenderansicht für HTMX (Feiertage nach Bundesland state)"""
     try:
         now = datetime.now()
         year = year or now.year
@@ -112,6 +171,15 @@ async def get_calendar(
                 status_code=400
             )
 
+        try:
+            holidays = month_holidays(year, month, normalize_state(state))
+        except ValueError as e:
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "message": str(e)},
+                status_code=400
+            )
+
         # Verfügbarkeiten für den Monat laden
         start_date = date(year, month, 1)
         if month == 12:
@@ -133,6 +201,7 @@ async def get_calendar(
                 "current_year": year,
                 "current_month": month,
                 "month_name": calendar.month_name[month],
+                "holidays": holidays,
                 "availabilities": [a.model_dump() for a in availabilities]
             }
         )
@@ -144,6 +213,96 @@ async def get_calendar(
         )
 
 
+@router.get("/overview", response_class=HTMLResponse, name="get_calendar_overview")
+async def get_calendar_overview(
+    request: Request,
+    current_user=Depends(get_current_user),
+    year: Optional[int] = None,
+    month: Optional[int] = None,
+    months: int = Query(12, ge=1, le=24),
+    chunk: int = Query(3, ge=1, le=12),
+    state: Optional[str] = None,
+    continued: bool = False
+):
+    """Mehrmonatsübersicht für HTMX.
+
+    Liefert die ersten chunk von months Monaten ab year/month mit einer Abfrage.
+    Die restlichen Monate lädt HTMX abschnittsweise nach, sobald das Ende der
+    Übersicht sichtbar wird (hx-trigger="revealed").
+    """
+    try:
+        now = datetime.now()
+        year = year or now.year
+        month = month or now.month
+
+        if not (1 <= month <= 12 and 1900 <= year <= 2100):
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "message": "Ungültiges Datum"},
+                status_code=400
+            )
+        try:
+            state = normalize_state(state)
+        except ValueError as e:
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "message": str(e)},
+                status_code=400
+            )
+
+        # Monate dieses Abschnitts und der erste Monat des nächsten als (Jahr, Monat)
+        count = min(chunk, months)
+        first_index = year * 12 + month - 1
+        month_list = [(index // 12, index % 12 + 1) for index in range(first_index, first_index + count + 1)]
+        (last_year, last_month), (next_year, next_month) = month_list[-2:]
+
+        blocks = {
+            (block_year, block_month): {
+                "year": block_year,
+                "month": block_month,
+                "month_name": calendar.month_name[block_month],
+                "weeks": calendar.monthcalendar(block_year, block_month),
+                "holidays": month_holidays(block_year, block_month, state),
+                "days": {}
+            }
+            for block_year, block_month in month_list[:-1]
+        }
+
+        # Eine Abfrage für den ganzen Abschnitt, danach in einem Durchlauf auf die Tage verteilt
+        days = AvailabilityService.get_availabilities_by_day(
+            username=current_user["username"],
+            start_date=date(year, month, 1),
+            end_date=date(last_year, last_month, calendar.monthrange(last_year, last_month)[1])
+        )
+        for day, availabilities in days.items():
+            blocks[day.year, day.month]["days"][day.day] = [a.model_dump() for a in availabilities]
+
+        remaining = months - count
+        return templates.TemplateResponse(
+            "partials/calendar_overview.html",
+            {
+                "request": request,
+                "blocks": list(blocks.values()),
+                "continued": continued,
+                "current_year": year,
+                "current_month": month,
+                "next": {
+                    "year": next_year,
+                    "month": next_month,
+                    "months": remaining,
+                    "chunk": chunk,
+                    "state": state
+                } if remaining > 0 and next_year <= 2100 else None
+            }
+        )
+    except Exception as e:
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {"request": request, "message": f"Fehler beim Laden der Übersicht: {str(e)}"},
+            status_code=500
+        )
+
+
 @router.post("/add-availability-htmx")
 async def add_availability_htmx(
     request: Request,
@@ -245,6 +404,71 @@ async def delete_availability_htmx(
         )
 
 
+async def _range_form(request: Request) -> dict:
+    """Formularwerte der Zeitraum-Aktionen (htmx sendet sie bei DELETE in der URL)"""
+    values = dict(request.query_params)
+    values.update(await request.form())
+    return values
+
+
+@router.api_route("/range-htmx", methods=["DELETE", "POST"])
+async def bulk_availability_htmx(
+    request: Request,
+    current_user=Depends(get_current_user)
+):
+    """HTMX-Endpunkt zum Löschen (DELETE) oder Verschieben (POST) aller Verfügbarkeiten im Zeitraum"""
+    try:
+        form_data = await _range_form(request)
+        try:
+            start_date = date.fromisoformat(form_data["from"])
+            end_date = date.fromisoformat(form_data["to"])
+            days = int(form_data.get("days") or 0) if request.method == "POST" else 0
+        except (KeyError, ValueError):
+            return templates.TemplateResponse(
+                "partials/error.html",
+                {"request": request, "message": "Ungültiger Zeitraum"},
+                status_code=400
+            )
+
+        if request.method == "POST":
+            AvailabilityService.shift_availabilities_in_range(
+                username=current_user["username"],
+                start_date=start_date,
+                end_date=end_date,
+                days=days,
+                name=form_data.get("name") or None
+            )
+            shown = start_date + timedelta(days=days)
+        else:
+            AvailabilityService.delete_availabilities_in_range(
+                username=current_user["username"],
+                start_date=start_date,
+                end_date=end_date,
+                name=form_data.get("name") or None
+            )
+            shown = start_date
+
+        # Kalender einmal für den gesamten Vorgang neu rendern
+        return await get_calendar(
+            request=request,
+            current_user=current_user,
+            year=shown.year,
+            month=shown.month
+        )
+    except ValueError as e:
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {"request": request, "message": str(e)},
+            status_code=400
+        )
+    except Exception as e:
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {"request": request, "message": f"Fehler beim Bearbeiten des Zeitraums: {str(e)}"},
+            status_code=500
+        )
+
+
 # HTMX-Endpunkte für die Weboberfläche
 @router.get("/summary-htmx")
 async def get_availability_summary_htmx(
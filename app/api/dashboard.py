@@ -1,14 +1,13 @@
 from datetime import datetime
 
 from fastapi import APIRouter, Request, Depends
-from fastapi.templating import Jinja2Templates
-from pony.orm import db_session, select
+from pony.orm import db_session, count
 
 from app.auth.oauth2 import get_current_user
-from app.models import entities
+from app.replica import read_entities
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 @router.get("/")
@@ -16,15 +15,15 @@ async def dashboard(request: Request, current_user=Depends(get_current_user)):
     # Get availability summary data
     with db_session:
         now = datetime.now()
-        user = entities.User.get(username=current_user["username"])
+        source = read_entities(current_user["username"])
+        user = source.User.get(username=current_user["username"])
 
         if user:
-            availabilities = list(select(a for a in entities.Availability if a.user == user))
-            upcoming = [a for a in availabilities if a.start_time > now]
-
+            # Archivierte Verfügbarkeiten liegen immer in der Vergangenheit
             availability_summary = {
-                "total_count": len(availabilities),
-                "upcoming_count": len(upcoming)
+                "total_count": count(a for a in source.Availability if a.user == user)
+                + count(a for a in source.ArchivedAvailability if a.user == user),
+                "upcoming_count": count(a for a in source.Availability if a.user == user and a.start_time > now)
             }
         else:
             availability_summary = {
@@ -0,0 +1,82 @@
+import os
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.auth.oauth2 import get_payroll_user
+from app.models import schemas
+from app.responses import PydanticJSONResponse
+from app.services.export_service import (
+    EXPORT_FORMATS, EXPORT_SYNC_MAX_DAYS, ExportService, export_filename, job_export_path, xlsx_available
+)
+from app.services.holiday_service import normalize_state
+from app.services.job_service import JOB_DONE, JobService
+
+router = APIRouter()
+
+
+@router.get("/assignments")
+async def export_assignments(
+    start_date: date,
+    end_date: date,
+    export_format: str = Query("csv", alias="format"),
+    state: Optional[str] = None,
+    current_user=Depends(get_payroll_user)
+):
+    """Exportiert die Einsätze im Zeitraum für die Lohnabrechnung (CSV oder XLSX).
+
+    Bis EXPORT_SYNC_MAX_DAYS Tage wird die Datei direkt gestreamt. Längere
+    Zeiträume laufen als Hintergrundauftrag: Antwort 202 mit dem Auftrag, die
+    Datei gibt es nach Abschluss unter /api/exports/jobs/{id}/download.
+    Nur für die Lohnabrechnung (PAYROLL_USERNAMES) und Administratoren.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unbekanntes Exportformat")
+    if export_format == "xlsx" and not xlsx_available():
+        raise HTTPException(status_code=400, detail="XLSX-Export nicht verfügbar (openpyxl ist nicht installiert)")
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Startdatum muss vor dem Enddatum liegen")
+    try:
+        state = normalize_state(state)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if (end_date - start_date).days + 1 > EXPORT_SYNC_MAX_DAYS:
+        job = JobService.enqueue(current_user["username"], schemas.JobCreate(
+            kind="assignment_export",
+            params={
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "format": export_format,
+                "state": state
+            }
+        ))
+        return PydanticJSONResponse(job, status_code=status.HTTP_202_ACCEPTED)
+
+    if export_format == "xlsx":
+        chunks = ExportService.iter_xlsx(start_date, end_date, state)
+    else:
+        chunks = ExportService.iter_csv(start_date, end_date, state)
+    filename = export_filename(start_date, end_date, export_format)
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export(job_id: int, current_user=Depends(get_payroll_user)):
+    """Lädt die Datei eines abgeschlossenen Export-Auftrags herunter"""
+    job = JobService.get_job(job_id=job_id, username=current_user["username"])
+    if not job or job.kind != "assignment_export":
+        raise HTTPException(status_code=404, detail="Auftrag nicht gefunden")
+    if job.status != JOB_DONE:
+        raise HTTPException(status_code=409, detail="Export ist noch nicht abgeschlossen")
+
+    path = job_export_path(job_id, job.result["format"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Exportdatei nicht mehr vorhanden")
+    return FileResponse(path, media_type=EXPORT_FORMATS[job.result["format"]], filename=job.result["filename"])
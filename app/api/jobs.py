@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.auth.oauth2 import check_payroll, get_current_user
+from app.models import schemas
+from app.services.job_service import JobService
+from app.templating import templates
+
+router = APIRouter()
+
+# Auftragsarten nur für die Lohnabrechnung
+PAYROLL_JOB_KINDS = {"assignment_export"}
+
+
+@router.post("/", response_model=schemas.JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_job(job: schemas.JobCreate, current_user=Depends(get_current_user)):
+    """Stellt einen Hintergrundauftrag ein"""
+    # Exporte nur wie unter /api/exports (Lohnabrechnung)
+    if job.kind in PAYROLL_JOB_KINDS:
+        check_payroll(current_user)
+    try:
+        return JobService.enqueue(username=current_user["username"], job_data=job)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{job_id}", response_model=schemas.JobResponse)
+async def get_job(job_id: int, current_user=Depends(get_current_user)):
+    """Status, Fortschritt und Ergebnis eines Auftrags"""
+    job = JobService.get_job(job_id=job_id, username=current_user["username"])
+    if not job:
+        raise HTTPException(status_code=404, detail="Auftrag nicht gefunden")
+    return job
+
+
+@router.get("/{job_id}/progress-htmx")
+async def get_job_progress_htmx(request: Request, job_id: int, current_user=Depends(get_current_user)):
+    """Fortschrittsanzeige für HTMX, aktualisiert sich selbst bis zum Abschluss"""
+    job = JobService.get_job(job_id=job_id, username=current_user["username"])
+    if not job:
+        return templates.TemplateResponse(
+            "partials/error.html",
+            {"request": request, "message": "Auftrag nicht gefunden"}
+        )
+    return templates.TemplateResponse("partials/job_progress.html", {"request": request, "job": job})
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends, status
+
+from app.auth.oauth2 import get_current_user
+from app.models import schemas
+from app.services.geo_service import GeoService
+
+router = APIRouter()
+
+
+@router.post("/", response_model=schemas.LocationResponse, status_code=status.HTTP_201_CREATED)
+async def create_location(location: schemas.LocationCreate, current_user=Depends(get_current_user)):
+    """Legt einen neuen Einsatzort an"""
+    # Hier sollte eine Berechtigungsprüfung erfolgen
+    return GeoService.create_location(location)
@@ -0,0 +1,56 @@
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from app.auth.oauth2 import get_admin_user
+from app.models import schemas
+from app.profiling import PROFILE_FORMATS, profile_store, sampling_settings
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[schemas.ProfileInfo])
+async def list_profiles(current_user=Depends(get_admin_user)):
+    """Gespeicherte Profile dieses Hosts, neueste zuerst (nur für Administratoren)"""
+    return profile_store.list()
+
+
+@router.get("/sampling", response_model=Optional[schemas.ProfileSampling])
+async def get_sampling(current_user=Depends(get_admin_user)):
+    """Aktuelle Stichprobe (None = nur PROFILE_SAMPLE_RATE bzw. X-Profile-Header)"""
+    return sampling_settings.get()
+
+
+@router.put("/sampling", response_model=schemas.ProfileSampling)
+async def set_sampling(sampling: schemas.ProfileSampling, current_user=Depends(get_admin_user)):
+    """Profiliert einen Anteil der passenden Anfragen in allen Workern für einige Minuten (gemeinsamer Cache nötig)"""
+    if not 0 <= sampling.rate <= 1:
+        raise HTTPException(status_code=400, detail="Anteil muss zwischen 0 und 1 liegen")
+    if not 1 <= sampling.minutes <= 24 * 60:
+        raise HTTPException(status_code=400, detail="Dauer muss zwischen 1 Minute und 24 Stunden liegen")
+    try:
+        sampling_settings.set(sampling.model_dump(), ttl=sampling.minutes * 60)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return sampling
+
+
+@router.delete("/sampling", status_code=204)
+async def stop_sampling(current_user=Depends(get_admin_user)):
+    """Beendet die Stichprobe vorzeitig"""
+    sampling_settings.set(None, ttl=0)
+
+
+@router.get("/{profile_id}")
+async def download_profile(
+    profile_id: str,
+    profile_format: str = Query("speedscope", alias="format", pattern="^(speedscope|collapsed)$"),
+    current_user=Depends(get_admin_user)
+):
+    """Profil als speedscope-Datei (https://www.speedscope.app) oder Collapsed-Stacks (flamegraph.pl)"""
+    path = profile_store.file(profile_id, profile_format)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden")
+    suffix, media_type = PROFILE_FORMATS[profile_format]
+    return FileResponse(path, media_type=media_type, filename=f"profile_{profile_id}.{suffix}")
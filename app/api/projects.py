@@ -0,0 +1,72 @@
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.auth.oauth2 import get_current_user
+from app.models import schemas
+from app.responses import fast_response
+from app.services.coverage_service import CoverageService
+from app.services.geo_service import GeoService
+
+router = APIRouter()
+
+
+@router.get("/{project_id}/nearest-users", response_model=List[schemas.NearestUserResponse])
+async def get_nearest_users(
+    project_id: int,
+    limit: int = Query(10, ge=1, le=100),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    current_user=Depends(get_current_user)
+):
+    """Geeignete Benutzer (alle geforderten Fähigkeiten) nach Entfernung zum Einsatzort.
+
+    Mit from/to nur Benutzer, die im ganzen Zeitraum verfügbar und frei sind.
+    """
+    if (start is None) != (end is None):
+        raise HTTPException(status_code=400, detail="from und to nur gemeinsam angeben")
+    try:
+        users = GeoService.get_nearest_eligible_users(project_id=project_id, limit=limit, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if users is None:
+        raise HTTPException(status_code=404, detail="Projekt nicht gefunden")
+    return fast_response(users)
+
+
+@router.get("/coverage", response_model=List[schemas.ProjectCoverage])
+async def get_all_coverage(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    resolution: str = Query("day", pattern="^(hour|day)$"),
+    project_ids: Optional[List[int]] = Query(None),
+    current_user=Depends(get_current_user)
+):
+    """Besetzung aller (oder der angegebenen) Projekte im Zeitraum"""
+    try:
+        return fast_response(CoverageService.get_coverage(
+            start=start, end=end, resolution=resolution, project_ids=project_ids
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/{project_id}/coverage", response_model=schemas.ProjectCoverage)
+async def get_project_coverage(
+    project_id: int,
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    resolution: str = Query("day", pattern="^(hour|day)$"),
+    current_user=Depends(get_current_user)
+):
+    """Besetzung eines Projekts je Zeitfenster im Vergleich zum Bedarf, inklusive Lücken"""
+    try:
+        coverage = CoverageService.get_coverage(
+            start=start, end=end, resolution=resolution, project_ids=[project_id]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not coverage:
+        raise HTTPException(status_code=404, detail="Projekt im Zeitraum nicht gefunden")
+    return fast_response(coverage[0])
@@ -0,0 +1,63 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.auth.oauth2 import get_current_user
+from app.models import schemas
+from app.responses import fast_response
+from app.services.occupancy_service import OccupancyService
+from app.services.utilization_service import UtilizationService
+
+router = APIRouter()
+
+
+@router.get("/utilization", response_model=List[schemas.UtilizationReportRow])
+async def get_utilization(
+    start_date: date,
+    end_date: date,
+    username: Optional[str] = None,
+    project_id: Optional[int] = None,
+    state: Optional[str] = None,
+    current_user=Depends(get_current_user)
+):
+    """Auslastung (Verfügbarkeiten und Einsatzstunden) je Benutzer und Projekt im Zeitraum"""
+    # Hier sollte eine Berechtigungsprüfung erfolgen
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="Startdatum muss vor dem Enddatum liegen")
+
+    try:
+        return fast_response(UtilizationService.get_report(
+            start_date=start_date,
+            end_date=end_date,
+            username=username,
+            project_id=project_id,
+            viewer=current_user["username"],
+            state=state
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/heatmap", response_model=schemas.OccupancyHeatmap)
+async def get_heatmap(
+    year: int,
+    month: int,
+    kind: str = "assignments",
+    username: Optional[List[str]] = Query(None),
+    project_id: Optional[int] = None,
+    current_user=Depends(get_current_user)
+):
+    """Belegung eines Teams je 15-Minuten-Slot im Monat (Anzahl belegter Benutzer)"""
+    # Hier sollte eine Berechtigungsprüfung erfolgen
+    try:
+        return fast_response(OccupancyService.get_heatmap(
+            year=year,
+            month=month,
+            kind=kind,
+            usernames=username,
+            project_id=project_id,
+            viewer=current_user["username"]
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
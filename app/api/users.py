@@ -1,14 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.templating import Jinja2Templates
-from typing import List
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
+from typing import List, Optional
 from pony.orm import db_session, select
 
-from app.auth.oauth2 import get_current_user, get_password_hash
+from app.auth.oauth2 import get_current_user, get_password_hash, user_cache_namespace
+from app.cache import cache
 from app.models import schemas
 from app.models import entities
+from app.templating import templates
+from app.replica import mark_write, read_entities
+from app.responses import fast_response
+from app.services.availability_service import availability_cache_namespace
+from app.services.geo_service import geo_index
+from app.services.schedule_service import ScheduleService, schedule_snapshot
+from app.services.user_search_service import user_search_index
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 # API-Endpunkte
@@ -42,30 +50,53 @@ async def update_user_info(
         if user_update.password is not None and user_update.password.strip():
             user.hashed_password = get_password_hash(user_update.password)
 
+        if user_update.home_postal_code is not None:
+            user.home_postal_code = user_update.home_postal_code.strip()
+        user_id, home_postal_code = user.id, user.home_postal_code
+
         # Aktualisierte Benutzerinformationen zurückgeben
-        return schemas.UserResponse(
+        response = schemas.UserResponse(
             username=user.username,
             email=user.email,
             full_name=user.full_name,
             is_active=user.is_active
         )
 
+    # Nach dem Commit auch die Verfügbarkeiten verwerfen, sie enthalten die Benutzerdaten
+    mark_write(current_user["username"])
+    cache.invalidate(user_cache_namespace(current_user["username"]))
+    user_search_index.user_changed(user_id)
+    cache.invalidate(availability_cache_namespace(current_user["username"]))
+    if user_update.home_postal_code is not None:
+        geo_index.user_changed(user_id, home_postal_code)
+    return response
+
 
 # Admin-Endpunkte (erfordern spezielle Berechtigung in einer echten Anwendung)
 @router.get("/", response_model=List[schemas.UserResponse])
-async def get_all_users(current_user=Depends(get_current_user)):
-    """Gibt eine Liste aller Benutzer zurück (nur für Administratoren)"""
+async def get_all_users(
+    response: Response,
+    q: Optional[str] = None,
+    skill: Optional[List[str]] = Query(None),
+    active: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user=Depends(get_current_user)
+):
+    """Sucht Benutzer (nur für Administratoren), seitenweise nach Benutzername sortiert.
+
+    q durchsucht Benutzername, Namen und E-Mail, skill filtert nach Fähigkeiten
+    (mehrfach möglich). Gibt es weitere Treffer, steht der Cursor für die
+    nächste Seite im Header X-Next-Cursor.
+    """
     # Hier sollte eine Berechtigungsprüfung erfolgen
-    with db_session:
-        users = select(u for u in entities.User)
-        return [
-            schemas.UserResponse(
-                username=u.username,
-                email=u.email,
-                full_name=u.full_name,
-                is_active=u.is_active
-            ) for u in users
-        ]
+    users, next_cursor = user_search_index.sync().search(
+        q=q, skills=skill, active=active, cursor=cursor, limit=limit
+    )
+    result = fast_response(users)
+    if next_cursor:
+        (result if isinstance(result, Response) else response).headers["X-Next-Cursor"] = next_cursor
+    return result
 
 
 @router.post("/", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
@@ -88,22 +119,42 @@ async def create_user(user_create: schemas.UserCreate, current_user=Depends(get_
             full_name=user_create.full_name,
             hashed_password=hashed_password
         )
+        user.flush()
+        user_id = user.id
 
         # Neuen Benutzer zurückgeben
-        return schemas.UserResponse(
+        response = schemas.UserResponse(
             username=user.username,
             email=user.email,
             full_name=user.full_name,
             is_active=user.is_active
         )
 
+    mark_write(current_user["username"])
+    user_search_index.user_changed(user_id)
+    return response
+
+
+@router.get("/free", response_model=List[schemas.UserResponse])
+async def get_free_users(
+    start: datetime = Query(..., alias="from"),
+    end: datetime = Query(..., alias="to"),
+    skill: Optional[str] = None,
+    current_user=Depends(get_current_user)
+):
+    """Aktive Benutzer, die im ganzen Zeitraum verfügbar und noch nicht eingeplant sind"""
+    try:
+        return fast_response(ScheduleService.get_free_users(start=start, end=end, skill=skill))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.get("/{username}", response_model=schemas.UserResponse)
 async def get_user(username: str, current_user=Depends(get_current_user)):
     """Gibt Informationen über einen bestimmten Benutzer zurück"""
     # Hier sollte eine Berechtigungsprüfung erfolgen oder nur eigene Daten erlauben
     with db_session:
-        user = entities.User.get(username=username)
+        user = read_entities(current_user["username"]).User.get(username=username)
         if not user:
             raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
 
@@ -128,4 +179,11 @@ async def delete_user(username: str, current_user=Depends(get_current_user)):
         if user.username == current_user["username"]:
             raise HTTPException(status_code=400, detail="Sie können Ihren eigenen Benutzer nicht löschen")
 
-        user.delete()
\ No newline at end of file
+        user_id = user.id
+        user.delete()
+
+    mark_write(current_user["username"])
+    cache.invalidate(user_cache_namespace(username))
+    user_search_index.user_changed(user_id)
+    cache.invalidate(availability_cache_namespace(username))
+    schedule_snapshot.user_removed(user_id)
\ No newline at end of file
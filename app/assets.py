@@ -0,0 +1,89 @@
+import json
+import mimetypes
+import os
+from functools import lru_cache
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+STATIC_DIR = "app/static"
+
+# Ausgabeverzeichnis des Asset-Builds (scripts/build_assets.py), relativ zu STATIC_DIR
+DIST_DIR = "dist"
+MANIFEST_PATH = os.path.join(STATIC_DIR, DIST_DIR, "manifest.json")
+
+# Vorkomprimierte Varianten in Reihenfolge der Präferenz
+PRECOMPRESSED_ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+@lru_cache(maxsize=1)
+def load_manifest() -> dict:
+    """Lädt das Manifest der gehashten Dateinamen (leer, wenn kein Build vorliegt)"""
+    try:
+        with open(MANIFEST_PATH, encoding="utf-8") as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(path: str) -> str:
+    """Liefert die URL eines statischen Assets, bevorzugt in der gehashten Variante"""
+    path = path.lstrip("/")
+    return f"/static/{load_manifest().get(path, path)}"
+
+
+def accepted_encodings(accept_encoding: str) -> set:
+    """Liest die akzeptierten Kodierungen aus dem Accept-Encoding-Header (ohne q=0)"""
+    encodings = set()
+    for item in accept_encoding.split(","):
+        name, _, params = item.partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            pass
+        if name.strip():
+            encodings.add(name.strip().lower())
+    return encodings
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Statische Dateien mit vorkomprimierten Varianten und langlebigem Caching.
+
+    Liegt neben einer Datei eine .br- oder .gz-Variante und akzeptiert der Client
+    die Kodierung, wird diese ausgeliefert. Gehashte Dateien aus dem Build-Verzeichnis
+    ändern ihren Inhalt nie und werden als immutable markiert.
+    """
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        request_headers = Headers(scope=scope)
+        dist_root = os.path.realpath(os.path.join(self.directory, DIST_DIR))
+        fingerprinted = full_path.startswith(dist_root + os.sep)
+        encodings = accepted_encodings(request_headers.get("accept-encoding", ""))
+
+        response = None
+        for encoding, extension in PRECOMPRESSED_ENCODINGS:
+            compressed_path = full_path + extension
+            if encoding in encodings and os.path.isfile(compressed_path):
+                response = FileResponse(
+                    compressed_path,
+                    status_code=status_code,
+                    stat_result=os.stat(compressed_path),
+                    media_type=mimetypes.guess_type(full_path)[0] or "application/octet-stream",
+                    headers={"Content-Encoding": encoding}
+                )
+                break
+
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+
+        response.headers["Vary"] = "Accept-Encoding"
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if fingerprinted else "no-cache"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -5,14 +5,20 @@ from datetime import datetime, timedelta
 from typing import Optional
 from pony.orm import db_session
 import bcrypt
+import json
 import os
 
+from app.cache import cache
 from app.models.entities import User
 
 # OAuth2 Konfiguration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Administratoren (kommagetrennte Benutzernamen), z. B. für das Profiling
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+# Lohnabrechnung (kommagetrennte Benutzernamen), darf Einsätze exportieren; Administratoren ebenfalls
+PAYROLL_USERNAMES = {name.strip() for name in os.getenv("PAYROLL_USERNAMES", "").split(",") if name.strip()}
 
 # OAuth2 Schema ohne tokenUrl für Cookie-basierte Auth
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token", auto_error=False)
@@ -42,6 +48,48 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
 
 
+def user_cache_namespace(username: str) -> str:
+    """Cache-Namensraum der Benutzerdaten"""
+    return f"user:{username}"
+
+
+def token_username(token: Optional[str]) -> Optional[str]:
+    """Benutzername aus einem Token (auch mit "Bearer "-Präfix), None wenn ungültig"""
+    if not token:
+        return None
+    if token.startswith("Bearer "):
+        token = token[7:]
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
+
+
+def is_admin(username: Optional[str]) -> bool:
+    return username is not None and username in ADMIN_USERNAMES
+
+
+def is_payroll(username: Optional[str]) -> bool:
+    return is_admin(username) or (username is not None and username in PAYROLL_USERNAMES)
+
+
+def load_user(username: str) -> Optional[dict]:
+    """Benutzerdaten aus dem Cache oder der Datenbank, None für unbekannte Benutzer"""
+    cache_key = cache.key(user_cache_namespace(username), "profile")
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return json.loads(cached)
+
+    with db_session:
+        user = User.get(username=username)
+        if user is None:
+            return None
+        user_data = user.to_dict()
+
+    cache.set(cache_key, json.dumps(user_data).encode())
+    return user_data
+
+
 # Benutzer über Token validieren
 async def get_current_user(
         request: Request,
@@ -72,9 +120,26 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    # Benutzer aus Datenbank abrufen
-    with db_session:
-        user = User.get(username=username)
-        if user is None:
-            raise credentials_exception
-        return user.to_dict()
\ No newline at end of file
+    user_data = load_user(username)
+    if user_data is None:
+        raise credentials_exception
+    return user_data
+
+
+async def get_admin_user(current_user=Depends(get_current_user)):
+    """Wie get_current_user, aber nur für aktive Benutzer aus ADMIN_USERNAMES"""
+    if not current_user.get("is_active") or not is_admin(current_user["username"]):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nur für Administratoren")
+    return current_user
+
+
+def check_payroll(current_user: dict) -> None:
+    """403, wenn der Benutzer nicht aktiv und nicht in der Lohnabrechnung (oder Administrator) ist"""
+    if not current_user.get("is_active") or not is_payroll(current_user["username"]):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Nur für die Lohnabrechnung")
+
+
+async def get_payroll_user(current_user=Depends(get_current_user)):
+    """Wie get_current_user, aber nur für die Lohnabrechnung (siehe check_payroll)"""
+    check_payroll(current_user)
+    return current_user
@@ -1,15 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.templating import Jinja2Templates
 from datetime import timedelta
 from pony.orm import db_session, commit
 import os
 
 from app.auth.oauth2 import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, verify_password
 from app.models import entities, schemas
+from app.templating import templates
+from app.services.user_search_service import user_search_index
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 # OAuth2 Token-Route
@@ -120,5 +120,6 @@ async def create_test_user(user: schemas.UserCreate):
             hashed_password=hashed_password
         )
         commit()
+        user_search_index.user_changed(user.id)
 
         return {"message": f"Testbenutzer {user.username} wurde erstellt"}
\ No newline at end of file
@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+# Cache-Konfiguration
+# sqlite: gemeinsam für alle Worker auf einem Host, memory: nur innerhalb eines Prozesses
+# (nur für einen einzelnen Worker, z.B. Entwicklung und Tests)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(tempfile.gettempdir(), "hcc_plan_cache.sqlite"))
+CACHE_TTL = int(os.getenv("CACHE_TTL", 300))
+# Aufbewahrung der Änderungsprotokolle (siehe Cache.publish); ältere Lücken erzwingen einen Neuaufbau
+CACHE_CHANGE_TTL = int(os.getenv("CACHE_CHANGE_TTL", 3600))
+# Höchstzahl der Einträge im prozesslokalen Cache (älteste werden zuerst verdrängt)
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 10000))
+
+
+class CacheBackend:
+    """Schnittstelle für Cache-Backends mit Byte-Werten"""
+
+    # Ob alle Worker eines Hosts dieselben Einträge sehen
+    shared = False
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        """Erhöht einen Zähler atomar und gibt den neuen Wert zurück"""
+        raise NotImplementedError
+
+    def incr_and_set(self, key: str, prefix: str, value: bytes, ttl: Optional[int] = None) -> int:
+        """Erhöht einen Zähler und legt value unter "prefix:neuer Wert" ab, beides atomar"""
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Prozesslokaler Cache mit LRU-Verdrängung.
+
+    Zähler aus incr() (Namensraum-Versionen) liegen getrennt und werden nie
+    verdrängt, sonst würden alte versionierte Einträge wieder erreichbar.
+    """
+
+    # Anteil der Schreibzugriffe, bei denen abgelaufene Einträge entfernt werden
+    PURGE_EVERY = 1000
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return str(self._counters[key]).encode()
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge()
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def _purge(self):
+        """Entfernt abgelaufene Einträge (Aufruf unter der Sperre)"""
+        now = time.time()
+        expired = [key for key, (_, expires_at) in self._data.items()
+                   if expires_at is not None and expires_at < now]
+        for key in expired:
+            del self._data[key]
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def incr_and_set(self, key, prefix, value, ttl=None):
+        with self._lock:
+            counter = self._counters.get(key, 0) + 1
+            self._counters[key] = counter
+            self._data[f"{prefix}:{counter}"] = (value, time.time() + ttl if ttl else None)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            return counter
+
+
+class SQLiteCache(CacheBackend):
+    """Cache in einer gemeinsamen SQLite-Datei (WAL), sichtbar für alle Prozesse eines Hosts"""
+
+    shared = True
+
+    # Anteil der Schreibzugriffe, bei denen abgelaufene Einträge entfernt werden
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Verbindungen pro Thread und Prozess (nach einem Fork neu öffnen)
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)"
+            )
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        # Zähler aus incr() liegen als INTEGER vor
+        return row[0] if isinstance(row[0], bytes) else str(row[0]).encode()
+
+    def set(self, key, value, ttl=None):
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, value, time.time() + ttl if ttl else None)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            connection.execute("DELETE FROM cache WHERE expires_at < ?", (time.time(),))
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def incr(self, key):
+        row = self._connection().execute(
+            "INSERT INTO cache (key, value, expires_at) VALUES (?, 1, NULL) "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1 "
+            "RETURNING value",
+            (key,)
+        ).fetchone()
+        return int(row[0])
+
+    def incr_and_set(self, key, prefix, value, ttl=None):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            counter = self.incr(key)
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (f"{prefix}:{counter}", value, time.time() + ttl if ttl else None)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return counter
+
+
+class Cache:
+    """Cache mit versionierten Namensräumen.
+
+    Jeder Schlüssel enthält die aktuelle Version seines Namensraums. Eine
+    Invalidierung erhöht nur die Version, wodurch alle alten Einträge in allen
+    Workern sofort unerreichbar werden und später ablaufen.
+
+    Der versionierte Schlüssel wird vor dem Laden der Daten bestimmt. Wird der
+    Namensraum währenddessen invalidiert, landet das Ergebnis unter der alten
+    Version und wird nie ausgeliefert.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int = CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+
+    def version(self, namespace: str) -> int:
+        """Aktuelle Version eines Namensraums (auch für prozesslokale Strukturen nutzbar)"""
+        return int(self.backend.get(f"version:{namespace}") or 0)
+
+    def key(self, namespace: str, key: str) -> str:
+        """Liefert den Schlüssel für die aktuelle Version des Namensraums"""
+        return f"{namespace}:{self.version(namespace)}:{key}"
+
+    def get(self, versioned_key: str) -> Optional[bytes]:
+        return self.backend.get(versioned_key)
+
+    def set(self, versioned_key: str, value: bytes, ttl: Optional[int] = None) -> None:
+        self.backend.set(versioned_key, value, ttl or self.ttl)
+
+    def invalidate(self, namespace: str) -> int:
+        """Verwirft alle Einträge eines Namensraums und gibt die neue Version zurück.
+
+        Muss nach dem Commit der zugehörigen Änderung aufgerufen werden.
+        """
+        return self.backend.incr(f"version:{namespace}")
+
+    def publish(self, namespace: str, change: bytes) -> int:
+        """Wie invalidate, legt aber die Änderung unter der neuen Version ab.
+
+        Prozesslokale Strukturen können so statt eines Neuaufbaus die Änderungen
+        seit ihrer Version nachspielen (siehe changes). Muss nach dem Commit
+        aufgerufen werden.
+        """
+        return self.backend.incr_and_set(f"version:{namespace}", f"changes:{namespace}", change, CACHE_CHANGE_TTL)
+
+    def changes(self, namespace: str, after: int, until: int) -> Optional[List[bytes]]:
+        """Änderungen der Versionen after+1 bis until, None bei einer Lücke"""
+        changes = []
+        for version in range(after + 1, until + 1):
+            change = self.backend.get(f"changes:{namespace}:{version}")
+            if change is None:
+                return None
+            changes.append(change)
+        return changes
+
+
+def create_backend(name: str = CACHE_BACKEND) -> CacheBackend:
+    if name == "memory":
+        return MemoryCache()
+    if name == "sqlite":
+        return SQLiteCache(CACHE_PATH)
+    raise ValueError(f"Unbekanntes Cache-Backend: {name}")
+
+
+cache = Cache(create_backend())
@@ -0,0 +1,109 @@
+import gzip
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.assets import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Antworten unterhalb dieser Größe (in Bytes) werden unkomprimiert ausgeliefert
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", 1024))
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+
+COMPRESSIBLE_TYPES = {
+    "text/html",
+    "text/css",
+    "text/plain",
+    "text/javascript",
+    "text/csv",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+}
+
+
+class CompressionMiddleware:
+    """Komprimiert vollständige Antworten kompressibler Typen mit brotli oder gzip.
+
+    Gestreamte Antworten (mehrere Body-Nachrichten, z.B. NDJSON oder SSE) werden
+    unverändert durchgereicht und nie gepuffert.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encodings = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if brotli is not None and "br" in encodings:
+            encoding = "br"
+        elif "gzip" in encodings:
+            encoding = "gzip"
+        else:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.minimum_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.started = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            # Start zurückhalten, bis feststeht, ob der Body komprimiert wird
+            self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.started:
+            await self._send(message)
+            return
+
+        self.started = True
+        body = message.get("body", b"")
+        if message.get("more_body", False) or not self._is_compressible(len(body)):
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        compressed = self._compress(body)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if len(compressed) >= len(body):
+            compressed = body
+        else:
+            headers["Content-Encoding"] = self.encoding
+            headers["Content-Length"] = str(len(compressed))
+        headers.add_vary_header("Accept-Encoding")
+
+        await self._send(self.start_message)
+        await self._send({"type": "http.response.body", "body": compressed})
+
+    def _is_compressible(self, size: int) -> bool:
+        if size < self.minimum_size or self.start_message["status"] in (204, 304):
+            return False
+        headers = Headers(raw=self.start_message["headers"])
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+        return content_type in COMPRESSIBLE_TYPES
+
+    def _compress(self, body: bytes) -> bytes:
+        if self.encoding == "br":
+            return brotli.compress(body, quality=BROTLI_QUALITY)
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
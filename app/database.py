@@ -1,27 +1,100 @@
+from functools import lru_cache
 from pony.orm import Database
 import os
 
+from app.migrations import migrate
+from app.overload import sqlite_progress_handler, statement_timeout_ms
+
 # Datenbank-Konfiguration
 db = Database()
 
+# Alle so vielen SQLite-VM-Schritte wird die Frist der Anfrage geprüft
+SQLITE_PROGRESS_STEPS = int(os.getenv("SQLITE_PROGRESS_STEPS", 10000))
+
+
+@lru_cache(maxsize=None)
+def deadline_postgres_provider():
+    """Postgres-Provider, der die Restzeit der Anfrage als statement_timeout setzt
+
+    Erst beim Binden erzeugt, da der Import psycopg2 voraussetzt.
+    """
+    from pony.orm.dbproviders.postgres import PGProvider
+
+    class DeadlinePGProvider(PGProvider):
+        def set_transaction_mode(self, connection, cache):
+            super().set_transaction_mode(connection, cache)
+            # Bei jeder db_session neu setzen, damit kein Wert über den Verbindungspool weiterlebt
+            connection.cursor().execute("SET statement_timeout = %d" % statement_timeout_ms())
+
+    return DeadlinePGProvider
+
+
+def bind_postgres(database: Database, **params) -> None:
+    """Bindet an Postgres und setzt je db_session die Restzeit der Anfrage als statement_timeout.
+
+    Gebunden wird mit dem Providernamen, damit provider_name und die
+    on_connect-Hooks für 'postgres' greifen (auch für die erste Verbindung,
+    die Pony schon beim Binden öffnet). Erst danach wird der Provider durch
+    die Unterklasse mit der Frist ersetzt.
+    """
+    database.bind(provider='postgres', **params)
+    database.provider.__class__ = deadline_postgres_provider()
+
+
+@db.on_connect(provider='sqlite')
+def _sqlite_deadline(db, connection):
+    connection.set_progress_handler(sqlite_progress_handler, SQLITE_PROGRESS_STEPS)
+
+# Lesereplikat (optional): REPLICA_DB_PATH für SQLite, REPLICA_DB_HOST für Postgres
+REPLICA_DB_PATH = os.getenv("REPLICA_DB_PATH")
+REPLICA_DB_HOST = os.getenv("REPLICA_DB_HOST")
+replica_db = Database()
+
+
+@replica_db.on_connect(provider='sqlite')
+def _sqlite_read_only(db, connection):
+    # Versehentliche Schreibzugriffe auf das Replikat schlagen fehl
+    connection.cursor().execute("PRAGMA query_only = ON")
+    connection.set_progress_handler(sqlite_progress_handler, SQLITE_PROGRESS_STEPS)
+
+
+@replica_db.on_connect(provider='postgres')
+def _postgres_read_only(db, connection):
+    connection.cursor().execute("SET default_transaction_read_only = on")
+
+
 def init_database(debug=True):
     """Initialisiert die Datenbankverbindung"""
     if not db.provider:  # Nur binden wenn noch nicht gebunden
         db_path = os.getenv("DB_PATH", "hcc_plan_db.sqlite")
-        
+
         if debug:
             # SQLite für die Entwicklung
             db.bind(provider='sqlite', filename=db_path, create_db=True)
         else:
             # Produktionseinstellungen
             db_params = {
-                'provider': 'postgres',
                 'user': os.getenv("DB_USER", "postgres"),
                 'password': os.getenv("DB_PASSWORD", ""),
                 'host': os.getenv("DB_HOST", "localhost"),
                 'database': os.getenv("DB_NAME", "hcc_plan_db")
             }
-            db.bind(**db_params)
+            bind_postgres(db, **db_params)
 
-        # Datenbankschema generieren
-        db.generate_mapping(create_tables=True)
\ No newline at end of file
+        # Neue Spalten bestehender Tabellen ergänzen, danach das Schema generieren
+        migrate(db)
+        db.generate_mapping(create_tables=True)
+
+    if not replica_db.provider and (REPLICA_DB_PATH or REPLICA_DB_HOST):
+        if REPLICA_DB_PATH:
+            replica_db.bind(provider='sqlite', filename=REPLICA_DB_PATH)
+        else:
+            bind_postgres(
+                replica_db,
+                user=os.getenv("REPLICA_DB_USER", os.getenv("DB_USER", "postgres")),
+                password=os.getenv("REPLICA_DB_PASSWORD", os.getenv("DB_PASSWORD", "")),
+                host=REPLICA_DB_HOST,
+                database=os.getenv("REPLICA_DB_NAME", os.getenv("DB_NAME", "hcc_plan_db"))
+            )
+        # Das Schema legt die Replikation an, hier wird nur geprüft
+        replica_db.generate_mapping(create_tables=False)
@@ -1,8 +1,8 @@
+import asyncio
 import calendar
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Depends
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 import uvicorn
@@ -16,8 +16,16 @@ from app.models import entities
 from app.models.entities import User, Availability
 
 from app.auth.oauth2 import get_current_user
-from app.api import availability, users, dashboard
+from app.api import availability, users, dashboard, reports, locations, projects, jobs, exports, profiles
 from app.auth import routes as auth_routes
+from app.assets import PrecompressedStaticFiles, STATIC_DIR
+from app.compression import CompressionMiddleware
+from app.overload import OverloadMiddleware
+from app.profiling import ProfilingMiddleware
+from app.templating import templates
+from app.services.archive_service import ARCHIVE_INTERVAL_HOURS, run_archive_schedule
+from app.services.job_service import JOB_CONCURRENCY, job_runner
+from app.services.schedule_service import schedule_snapshot
 
 # Debug-Modus
 DEBUG = os.getenv("DEBUG", "True").lower() in ("true", "1", "t")
@@ -25,7 +33,24 @@ DEBUG = os.getenv("DEBUG", "True").lower() in ("true", "1", "t")
 # Datenbank initialisieren
 init_database(debug=DEBUG)
 
-app = FastAPI(title="HCC Einsatzplanung")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Snapshot vor der ersten Anfrage aufbauen, ohne die Event-Loop zu blockieren
+    await asyncio.to_thread(schedule_snapshot.sync)
+    # Hintergrundaufgaben je Worker
+    tasks = []
+    if ARCHIVE_INTERVAL_HOURS > 0:
+        tasks.append(asyncio.create_task(run_archive_schedule()))
+    if JOB_CONCURRENCY > 0:
+        tasks.append(asyncio.create_task(job_runner.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+app = FastAPI(title="HCC Einsatzplanung", lifespan=lifespan)
 
 # Middleware
 app.add_middleware(
@@ -35,12 +60,14 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Profiling ausgewählter Anfragen (innerhalb der Lastbegrenzung, inklusive Komprimierung)
+app.add_middleware(ProfilingMiddleware)
+# Fristen und Lastabwurf (außen, damit abgewiesene Anfragen keine weitere Arbeit verursachen)
+app.add_middleware(OverloadMiddleware)
 
-# Statische Dateien einrichten
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-
-# Templates einrichten
-templates = Jinja2Templates(directory="app/templates")
+# Statische Dateien einrichten (gehashte und vorkomprimierte Varianten aus scripts/build_assets.py)
+app.mount("/static", PrecompressedStaticFiles(directory=STATIC_DIR), name="static")
 
 # Globale Template-Kontexte
 from datetime import datetime
@@ -56,6 +83,12 @@ app.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
 app.include_router(availability.router, prefix="/api/availability", tags=["availability"])
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(locations.router, prefix="/api/locations", tags=["locations"])
+app.include_router(projects.router, prefix="/api/projects", tags=["projects"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+app.include_router(exports.router, prefix="/api/exports", tags=["exports"])
+app.include_router(profiles.router, prefix="/api/profiles", tags=["profiles"])
 
 # Web-Routen
 @app.get("/")
@@ -68,4 +101,4 @@ async def login_page(request: Request):
 
 
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=DEBUG)
\ No newline at end of file
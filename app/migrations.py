@@ -0,0 +1,51 @@
+"""
+Schemaänderungen an bestehenden Datenbanken
+
+generate_mapping(create_tables=True) legt nur fehlende Tabellen an, neue Spalten
+in bestehenden Tabellen ergänzt Pony nicht. Die Migrationen hier laufen bei jedem
+Start vor dem Mapping (siehe init_database) und sind idempotent: eine Spalte wird
+nur angelegt, wenn sie fehlt. Neue Tabellen überspringen sie, die legt das
+Mapping vollständig an.
+"""
+from typing import List, Optional, Set
+
+from pony.orm import Database, db_session
+
+# Nachträglich hinzugefügte Spalten: (Tabelle, Spalte, Definition für SQLite und Postgres)
+# mit Namen wie in den Entitäten
+# Bestehende Zeilen erhalten den Standardwert, damit NOT NULL erfüllt ist.
+ADDED_COLUMNS = [
+    ("User", "home_postal_code", "TEXT NOT NULL DEFAULT ''"),
+    ("Project", "required_staff", "INTEGER NOT NULL DEFAULT 1"),
+]
+
+
+def _existing_columns(database: Database, table: str) -> Optional[Set[str]]:
+    """Spalten einer Tabelle, None wenn die Tabelle noch nicht existiert"""
+    if database.provider_name == "sqlite":
+        rows = database.execute(f'PRAGMA table_info("{table}")').fetchall()
+        columns = {row[1] for row in rows}
+    else:
+        rows = database.execute(
+            "SELECT column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = $table"
+        ).fetchall()
+        columns = {row[0] for row in rows}
+    return columns or None
+
+
+def migrate(database: Database) -> List[str]:
+    """Legt fehlende Spalten an und gibt die ausgeführten Änderungen zurück"""
+    applied = []
+    with db_session:
+        for table, column, definition in ADDED_COLUMNS:
+            # Namen wie beim Mapping (Postgres: Kleinbuchstaben)
+            table, column = database.provider.normalize_name(table), database.provider.normalize_name(column)
+            columns = _existing_columns(database, table)
+            if columns is None or column in columns:
+                continue
+            # Postgres: IF NOT EXISTS, falls ein anderer Host gleichzeitig migriert
+            if_not_exists = "" if database.provider_name == "sqlite" else "IF NOT EXISTS "
+            database.execute(f'ALTER TABLE "{table}" ADD COLUMN {if_not_exists}"{column}" {definition}')
+            applied.append(f"{table}.{column}")
+    return applied
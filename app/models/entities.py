@@ -1,141 +1,290 @@
-from pony.orm import Required, Optional, Set, PrimaryKey
+from types import SimpleNamespace
+
+from pony.orm import Database, Required, Optional, Set, PrimaryKey, Json, composite_key, composite_index
 from datetime import datetime
-from app.database import db
-
-
-class User(db.Entity):
-    """Benutzer-Entität (Freiberuflicher Mitarbeiter)"""
-
-    username = Required(str, unique=True)
-    email = Required(str, unique=True)
-    full_name = Required(str)
-    hashed_password = Required(str)
-    is_active = Required(bool, default=True)
-    created_at = Required(datetime, default=lambda: datetime.now())
-
-    # Beziehungen
-    availabilities = Set('Availability')
-    skills = Set('Skill')
-    assignments = Set('Assignment')
-
-    def to_dict(self):
-        return {
-            "username": self.username,
-            "email": self.email,
-            "full_name": self.full_name,
-            "is_active": self.is_active,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
-
-
-class Availability(db.Entity):
-    """Verfügbarkeits-Entität (Freie Tageszeiten / Sperrtermine)"""
-
-    name = Required(str)  # Bezeichnung für die Verfügbarkeit/Sperrzeit
-    start_time = Required(datetime)
-    end_time = Required(datetime)
-    created_at = Required(datetime, default=lambda: datetime.now())
-
-    # Beziehungen
-    user = Required(User)
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "user_id": self.user.username,
-            "start_time": self.start_time.isoformat() if self.start_time else None,
-            "end_time": self.end_time.isoformat() if self.end_time else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
-
-
-class Skill(db.Entity):
-    """Fähigkeiten-Entität"""
-
-    name = Required(str, unique=True)
-    description = Optional(str)
-
-    # Beziehungen
-    users = Set(User)
-    required_for = Set('Project')
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description
-        }
-
-
-class Location(db.Entity):
-    """Einsatzort-Entität"""
-
-    name = Required(str)
-    address = Required(str)
-    city = Required(str)
-    postal_code = Required(str)
-    country = Required(str, default="Deutschland")
-
-    # Beziehungen
-    projects = Set('Project')
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "address": self.address,
-            "city": self.city,
-            "postal_code": self.postal_code,
-            "country": self.country
-        }
-
-
-class Project(db.Entity):
-    """Projekt-Entität"""
-
-    name = Required(str)
-    description = Optional(str)
-    start_date = Required(datetime)
-    end_date = Required(datetime)
-
-    # Beziehungen
-    location = Required(Location)
-    required_skills = Set(Skill)
-    assignments = Set('Assignment')
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "name": self.name,
-            "description": self.description,
-            "start_date": self.start_date.isoformat() if self.start_date else None,
-            "end_date": self.end_date.isoformat() if self.end_date else None,
-            "location_id": self.location.id
-        }
-
-
-class Assignment(db.Entity):
-    """Einsatzplan-Entität (Zuordnung von Mitarbeitern zu Projekten)"""
-
-    start_date = Required(datetime)
-    end_date = Required(datetime)
-    status = Required(str, default="geplant")  # geplant, bestätigt, abgeschlossen, storniert
-    notes = Optional(str)
-    created_at = Required(datetime, default=lambda: datetime.now())
-
-    # Beziehungen
-    user = Required(User)
-    project = Required(Project)
-
-    def to_dict(self):
-        return {
-            "id": self.id,
-            "user_id": self.user.username,
-            "project_id": self.project.id,
-            "start_date": self.start_date.isoformat() if self.start_date else None,
-            "end_date": self.end_date.isoformat() if self.end_date else None,
-            "status": self.status,
-            "notes": self.notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+from app.database import db, replica_db
+
+
+def define_entities(db: Database) -> SimpleNamespace:
+    """Definiert alle Entitäten auf einer Datenbank (Primärdatenbank und Lesereplikat)"""
+
+    class User(db.Entity):
+        """Benutzer-Entität (Freiberuflicher Mitarbeiter)"""
+
+        username = Required(str, unique=True)
+        email = Required(str, unique=True)
+        full_name = Required(str)
+        hashed_password = Required(str)
+        is_active = Required(bool, default=True)
+        created_at = Required(datetime, default=lambda: datetime.now())
+        home_postal_code = Optional(str)  # Wohnort für Anfahrtsentfernungen
+
+        # Beziehungen
+        availabilities = Set('Availability')
+        skills = Set('Skill')
+        assignments = Set('Assignment')
+        utilization = Set('UtilizationRollup')
+        occupancy = Set('OccupancySlots')
+        archived_availabilities = Set('ArchivedAvailability')
+        archived_assignments = Set('ArchivedAssignment')
+        jobs = Set('Job')
+
+        def to_dict(self):
+            return {
+                "username": self.username,
+                "email": self.email,
+                "full_name": self.full_name,
+                "is_active": self.is_active,
+                "created_at": self.created_at.isoformat() if self.created_at else None
+            }
+
+
+    class Availability(db.Entity):
+        """Verfügbarkeits-Entität (Freie Tageszeiten / Sperrtermine)"""
+
+        name = Required(str)  # Bezeichnung für die Verfügbarkeit/Sperrzeit
+        start_time = Required(datetime)
+        end_time = Required(datetime)
+        created_at = Required(datetime, default=lambda: datetime.now())
+
+        # Beziehungen
+        user = Required(User)
+
+        # Zeitraumabfragen je Benutzer (Kalender, Übersichten)
+        composite_index(user, start_time)
+
+        def to_dict(self):
+            return {
+                "id": self.id,
+                "name": self.name,
+                "user_id": self.user.username,
+                "start_time": self.start_time.isoformat() if self.start_time else None,
+                "end_time": self.end_time.isoformat() if self.end_time else None,
+                "created_at": self.created_at.isoformat() if self.created_at else None
+            }
+
+
+    class Skill(db.Entity):
+        """Fähigkeiten-Entität"""
+
+        name = Required(str, unique=True)
+        description = Optional(str)
+
+        # Beziehungen
+        users = Set(User)
+        required_for = Set('Project')
+
+        def to_dict(self):
+            return {
+                "id": self.id,
+                "name": self.name,
+                "description": self.description
+            }
+
+
+    class Location(db.Entity):
+        """Einsatzort-Entität"""
+
+        name = Required(str)
+        address = Required(str)
+        city = Required(str)
+        postal_code = Required(str)
+        country = Required(str, default="Deutschland")
+
+        # Beziehungen
+        projects = Set('Project')
+
+        def to_dict(self):
+            return {
+                "id": self.id,
+                "name": self.name,
+                "address": self.address,
+                "city": self.city,
+                "postal_code": self.postal_code,
+                "country": self.country
+            }
+
+
+    class Project(db.Entity):
+        """Projekt-Entität"""
+
+        name = Required(str)
+        description = Optional(str)
+        start_date = Required(datetime)
+        end_date = Required(datetime)
+        required_staff = Required(int, default=1)  # Benötigte Mitarbeiter gleichzeitig
+
+        # Beziehungen
+        location = Required(Location)
+        required_skills = Set(Skill)
+        assignments = Set('Assignment')
+        archived_assignments = Set('ArchivedAssignment')
+
+        def to_dict(self):
+            return {
+                "id": self.id,
+                "name": self.name,
+                "description": self.description,
+                "start_date": self.start_date.isoformat() if self.start_date else None,
+                "end_date": self.end_date.isoformat() if self.end_date else None,
+                "required_staff": self.required_staff,
+                "location_id": self.location.id
+            }
+
+
+    class Assignment(db.Entity):
+        """Einsatzplan-Entität (Zuordnung von Mitarbeitern zu Projekten)"""
+
+        start_date = Required(datetime)
+        end_date = Required(datetime)
+        status = Required(str, default="geplant")  # geplant, bestätigt, abgeschlossen, storniert
+        notes = Optional(str)
+        created_at = Required(datetime, default=lambda: datetime.now())
+
+        # Beziehungen
+        user = Required(User)
+        project = Required(Project)
+
+        def to_dict(self):
+            return {
+                "id": self.id,
+                "user_id": self.user.username,
+                "project_id": self.project.id,
+                "start_date": self.start_date.isoformat() if self.start_date else None,
+                "end_date": self.end_date.isoformat() if self.end_date else None,
+                "status": self.status,
+                "notes": self.notes,
+                "created_at": self.created_at.isoformat() if self.created_at else None
+            }
+
+
+    class UtilizationRollup(db.Entity):
+        """Monatliche Auslastung je Benutzer und Projekt (inkrementell gepflegt)
+
+        Verfügbarkeiten werden mit project_id 0 geführt, Einsätze mit ihrem Projekt.
+        """
+        _table_ = "utilization_rollup"
+
+        user = Required(User, column="user_id")
+        project_id = Required(int, default=0)
+        year = Required(int)
+        month = Required(int)
+        availability_seconds = Required(int, default=0)
+        assigned_seconds = Required(int, default=0)
+
+        composite_key(user, project_id, year, month)
+
+
+    class OccupancySlots(db.Entity):
+        """Belegung eines Benutzers in einem Monat als Bitmap aus 15-Minuten-Slots
+
+        Je Tag 96 Bits, der Monat hat immer 31 Tage (372 Bytes je Bitmap). Ein Bit
+        ist gesetzt, wenn eine Verfügbarkeit bzw. ein nicht stornierter Einsatz
+        den Slot berührt (siehe OccupancyService).
+        """
+        _table_ = "occupancy_slots"
+
+        user = Required(User, column="user_id")
+        year = Required(int)
+        month = Required(int)
+        availability = Required(bytes)
+        assignments = Required(bytes)
+
+        composite_key(user, year, month)
+
+
+    class ArchivedAvailability(db.Entity):
+        """Archivierte Verfügbarkeit (Vergangenheit, siehe ArchiveService)
+
+        Spalten wie Availability, die ID wird aus der aktiven Tabelle übernommen.
+        """
+        _table_ = "availability_archive"
+
+        id = PrimaryKey(int)
+        name = Required(str)
+        start_time = Required(datetime)
+        end_time = Required(datetime)
+        created_at = Required(datetime)
+
+        user = Required(User)
+
+        composite_index(user, start_time)
+
+
+    class ArchivedAssignment(db.Entity):
+        """Archivierter abgeschlossener oder stornierter Einsatz (siehe ArchiveService)
+
+        Spalten wie Assignment, die ID wird aus der aktiven Tabelle übernommen.
+        """
+        _table_ = "assignment_archive"
+
+        id = PrimaryKey(int)
+        start_date = Required(datetime)
+        end_date = Required(datetime)
+        status = Required(str)
+        notes = Optional(str)
+        created_at = Required(datetime)
+
+        user = Required(User)
+        project = Required(Project)
+
+        composite_index(user, start_date)
+
+    class Job(db.Entity):
+        """Hintergrundauftrag (siehe JobService)
+
+        Ein Worker übernimmt einen Auftrag mit einem zeitlich begrenzten Lease und
+        verlängert es, solange der Auftrag läuft. Läuft ein Lease ab (Worker
+        beendet), wird der Auftrag erneut vergeben.
+        """
+
+        kind = Required(str)
+        params = Required(Json)
+        status = Required(str, default="wartend")  # wartend, läuft, fertig, fehlgeschlagen
+        progress = Required(float, default=0)
+        message = Optional(str, nullable=True)
+        result = Optional(Json, nullable=True)
+        error = Optional(str, nullable=True)
+        attempts = Required(int, default=0)
+        lease_token = Optional(str, nullable=True)
+        lease_expires_at = Optional(datetime)
+        created_at = Required(datetime, default=lambda: datetime.now())
+        started_at = Optional(datetime)
+        finished_at = Optional(datetime)
+
+        # Beziehungen
+        user = Required(User)
+
+        composite_index(status, lease_expires_at)
+
+    return SimpleNamespace(
+        User=User,
+        Availability=Availability,
+        Skill=Skill,
+        Location=Location,
+        Project=Project,
+        Assignment=Assignment,
+        UtilizationRollup=UtilizationRollup,
+        OccupancySlots=OccupancySlots,
+        ArchivedAvailability=ArchivedAvailability,
+        ArchivedAssignment=ArchivedAssignment,
+        Job=Job,
+    )
+
+
+# Primärdatenbank (Lesen und Schreiben)
+_primary = define_entities(db)
+User = _primary.User
+Availability = _primary.Availability
+Skill = _primary.Skill
+Location = _primary.Location
+Project = _primary.Project
+Assignment = _primary.Assignment
+UtilizationRollup = _primary.UtilizationRollup
+OccupancySlots = _primary.OccupancySlots
+ArchivedAvailability = _primary.ArchivedAvailability
+ArchivedAssignment = _primary.ArchivedAssignment
+Job = _primary.Job
+
+# Lesereplikat, nur gemappt wenn eines konfiguriert ist (siehe app/replica.py)
+replica = define_entities(replica_db)
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, ConfigDict, EmailStr
 
@@ -18,6 +18,7 @@ class UserUpdate(BaseModel):
     email: Optional[EmailStr] = None
     full_name: Optional[str] = None
     password: Optional[str] = None
+    home_postal_code: Optional[str] = None
 
 
 class UserResponse(UserBase):
@@ -41,3 +42,128 @@ class AvailabilityResponse(AvailabilityBase):
 
     id: int
     user: UserResponse
+
+
+class AvailabilityBulkResult(BaseModel):
+    ids: List[int]
+    count: int
+
+
+class AssignmentBase(BaseModel):
+    project_id: int
+    start_date: datetime
+    end_date: datetime
+    status: str = "geplant"
+    notes: Optional[str] = None
+
+
+class AssignmentCreate(AssignmentBase):
+    pass
+
+
+class AssignmentResponse(AssignmentBase):
+    id: int
+    username: str
+    travel_km: Optional[float] = None
+    working_hours: Optional[float] = None  # Arbeitsstunden ohne Wochenenden und Feiertage
+
+
+class UtilizationReportRow(BaseModel):
+    username: str
+    project_id: Optional[int] = None
+    availability_hours: float
+    assigned_hours: float
+    capacity_hours: float  # Arbeitsstunden im Zeitraum (ohne Wochenenden und Feiertage)
+
+
+class OccupancyHeatmap(BaseModel):
+    year: int
+    month: int
+    kind: str  # availability oder assignments
+    slot_minutes: int
+    users: int  # Größe des Teams
+    counts: List[List[int]]  # je Tag die Anzahl belegter Benutzer je Slot
+
+
+class FreeSlot(BaseModel):
+    start: datetime
+    end: datetime
+
+
+class LocationBase(BaseModel):
+    name: str
+    address: str
+    city: str
+    postal_code: str
+    country: str = "Deutschland"
+
+
+class LocationCreate(LocationBase):
+    pass
+
+
+class LocationResponse(LocationBase):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+
+
+class NearestUserResponse(BaseModel):
+    username: str
+    full_name: str
+    distance_km: float
+
+
+class CoverageGap(BaseModel):
+    start: datetime
+    end: datetime
+    missing: int
+
+
+class ProjectCoverage(BaseModel):
+    project_id: int
+    project_name: str
+    required_staff: int
+    resolution: str
+    start: datetime  # Beginn des ersten Zeitfensters, die Listen enthalten je einen Wert pro Fenster
+    assigned: List[int]
+    required: List[int]
+    gaps: List[CoverageGap]
+
+
+class JobCreate(BaseModel):
+    kind: str
+    params: Dict[str, Any] = {}
+
+
+class JobResponse(BaseModel):
+    id: int
+    kind: str
+    status: str
+    progress: float
+    message: Optional[str] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
+class ProfileInfo(BaseModel):
+    id: str
+    method: str
+    path: str
+    query: str
+    username: Optional[str] = None
+    status: Optional[int] = None
+    duration_ms: float
+    samples: int
+    sampled_ms: float
+    created_at: datetime
+
+
+class ProfileSampling(BaseModel):
+    rate: float  # Anteil der passenden Anfragen (0 bis 1)
+    paths: List[str] = []  # Pfadpräfixe, leer = alle
+    usernames: List[str] = []  # leer = alle Benutzer
+    minutes: int = 10  # danach endet die Stichprobe von selbst
@@ -0,0 +1,251 @@
+"""
+Fristen für Anfragen und Lastabwurf
+
+Jede Anfrage bekommt eine Frist (REQUEST_DEADLINE_SECONDS, je Pfadpräfix über
+REQUEST_DEADLINES anpassbar). Die Restzeit steht über eine ContextVar bereit
+und wird an die Datenbank weitergegeben: SQLite bricht Abfragen über einen
+Progress-Handler ab, Postgres erhält sie als statement_timeout (siehe
+database.py). Außerhalb von Anfragen (Hintergrundaufträge, Skripte) gilt keine
+Frist.
+
+Die Anzahl gleichzeitiger Anfragen ist je Worker begrenzt, global
+(MAX_CONCURRENT_REQUESTS) und je Pfadpräfix (CONCURRENCY_LIMITS). Ist ein Limit
+erreicht, warten höchstens MAX_QUEUED_REQUESTS Anfragen bis zu
+QUEUE_WAIT_SECONDS auf einen Platz, alle weiteren werden sofort mit 503 und
+Retry-After abgewiesen, statt die Warteschlange wachsen zu lassen.
+
+Format der Präfixlisten: "/auth=4,/api/reports=8"
+"""
+import asyncio
+import json
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+
+def _parse_prefixes(value: str) -> List[Tuple[str, float]]:
+    """Liest "präfix=wert,..." ein, längste Präfixe zuerst"""
+    entries = []
+    for item in value.split(","):
+        if "=" in item:
+            prefix, number = item.split("=", 1)
+            entries.append((prefix.strip(), float(number)))
+    return sorted(entries, key=lambda entry: len(entry[0]), reverse=True)
+
+
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", 10))  # 0 = keine Frist
+REQUEST_DEADLINES = _parse_prefixes(os.getenv("REQUEST_DEADLINES", "/api/reports=30,/api/jobs=5,/api/exports=600"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", 100))
+CONCURRENCY_LIMITS = _parse_prefixes(os.getenv("CONCURRENCY_LIMITS", "/auth=4,/api/reports=8"))
+MAX_QUEUED_REQUESTS = int(os.getenv("MAX_QUEUED_REQUESTS", 50))
+QUEUE_WAIT_SECONDS = float(os.getenv("QUEUE_WAIT_SECONDS", 1))
+SHED_RETRY_AFTER_SECONDS = int(os.getenv("SHED_RETRY_AFTER_SECONDS", 2))
+# Ohne Frist und Limit: statische Dateien und die Metriken selbst
+UNLIMITED_PREFIXES = ("/static", "/metrics")
+
+# Frist der laufenden Anfrage (time.monotonic()), None = unbegrenzt
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Die Frist der Anfrage ist abgelaufen"""
+
+
+def remaining_seconds() -> Optional[float]:
+    """Restzeit der laufenden Anfrage, None außerhalb von Anfragen"""
+    deadline = request_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def deadline_exceeded() -> bool:
+    remaining = remaining_seconds()
+    return remaining is not None and remaining <= 0
+
+
+def check_deadline() -> None:
+    """Für lange Schleifen in Python: bricht nach Ablauf der Frist ab"""
+    if deadline_exceeded():
+        raise DeadlineExceeded("Zeitlimit der Anfrage überschritten")
+
+
+def sqlite_progress_handler() -> int:
+    """Progress-Handler für SQLite: ein Wert ungleich 0 bricht die Abfrage ab"""
+    if deadline_exceeded():
+        metrics.statement_timeouts += 1
+        return 1
+    return 0
+
+
+def statement_timeout_ms() -> int:
+    """Restzeit als statement_timeout für Postgres (0 = unbegrenzt)"""
+    remaining = remaining_seconds()
+    if remaining is None:
+        return 0
+    return max(1, int(remaining * 1000))
+
+
+def _lookup(entries: List[Tuple[str, float]], path: str) -> Optional[Tuple[str, float]]:
+    for prefix, value in entries:
+        if path.startswith(prefix):
+            return prefix, value
+    return None
+
+
+class ConcurrencyLimit:
+    """Begrenzt gleichzeitige Anfragen mit kurzer, begrenzter Warteschlange"""
+
+    def __init__(self, limit: int, queue: int = MAX_QUEUED_REQUESTS):
+        self.limit = limit
+        self.queue = queue
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self, timeout: float) -> bool:
+        """Belegt einen Platz; False, wenn die Anfrage abgewiesen werden soll"""
+        if self._semaphore.locked() and self.waiting >= self.queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(timeout, 0))
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+
+class OverloadMetrics:
+    """Zähler je Worker, ausgeliefert unter /metrics (Prometheus-Textformat)"""
+
+    def __init__(self):
+        self.requests: Dict[str, int] = {}
+        self.shed: Dict[str, int] = {}
+        self.timed_out: Dict[str, int] = {}
+        self.statement_timeouts = 0
+
+    @staticmethod
+    def increment(counter: Dict[str, int], group: str) -> None:
+        counter[group] = counter.get(group, 0) + 1
+
+    def render(self, limits: Dict[str, ConcurrencyLimit]) -> str:
+        lines = []
+        for name, counter, help_text in (
+            ("hcc_requests_total", self.requests, "Angenommene Anfragen"),
+            ("hcc_requests_shed_total", self.shed, "Mit 503 abgewiesene Anfragen"),
+            ("hcc_requests_timed_out_total", self.timed_out, "Anfragen mit überschrittener Frist"),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [f'{name}{{group="{group}"}} {value}' for group, value in sorted(counter.items())]
+        lines += [
+            "# HELP hcc_statement_timeouts_total Wegen der Frist abgebrochene Datenbankabfragen",
+            "# TYPE hcc_statement_timeouts_total counter",
+            f"hcc_statement_timeouts_total {self.statement_timeouts}",
+        ]
+        for name, attribute in (("hcc_requests_active", "active"), ("hcc_requests_queued", "waiting")):
+            lines += [f"# TYPE {name} gauge"]
+            lines += [f'{name}{{group="{group}"}} {getattr(limit, attribute)}' for group, limit in sorted(limits.items())]
+        return "\n".join(lines) + "\n"
+
+
+metrics = OverloadMetrics()
+
+
+class OverloadMiddleware:
+    """Setzt die Frist der Anfrage und wirft Last über den Limits ab (503 + Retry-After).
+
+    Läuft eine Anfrage wegen der Frist in einen Fehler, bevor die Antwort
+    begonnen hat, wird 504 geliefert.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.limits: Dict[str, ConcurrencyLimit] = {"*": ConcurrencyLimit(MAX_CONCURRENT_REQUESTS)}
+        for prefix, limit in CONCURRENCY_LIMITS:
+            self.limits[prefix] = ConcurrencyLimit(int(limit))
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or path.startswith(UNLIMITED_PREFIXES):
+            if scope["type"] == "http" and path == "/metrics":
+                await self._send_metrics(send)
+                return
+            await self.app(scope, receive, send)
+            return
+
+        deadline_entry = _lookup(REQUEST_DEADLINES, path)
+        seconds = deadline_entry[1] if deadline_entry else REQUEST_DEADLINE_SECONDS
+        deadline = time.monotonic() + seconds if seconds > 0 else None
+
+        limit_entry = _lookup(CONCURRENCY_LIMITS, path)
+        group = limit_entry[0] if limit_entry else "*"
+        limits = [self.limits[group]] if group == "*" else [self.limits[group], self.limits["*"]]
+
+        acquired = []
+        for limit in limits:
+            wait = QUEUE_WAIT_SECONDS if deadline is None else min(QUEUE_WAIT_SECONDS, deadline - time.monotonic())
+            if not await limit.acquire(wait):
+                break
+            acquired.append(limit)
+        if len(acquired) < len(limits):
+            for limit in acquired:
+                limit.release()
+            metrics.increment(metrics.shed, group)
+            await self._send_error(send, 503, "Server ausgelastet, bitte später erneut versuchen",
+                                   [(b"retry-after", str(SHED_RETRY_AFTER_SECONDS).encode())])
+            return
+
+        metrics.increment(metrics.requests, group)
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        token = request_deadline.set(deadline)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            if not deadline_exceeded():
+                raise
+            metrics.increment(metrics.timed_out, group)
+            if response_started:
+                raise
+            await self._send_error(send, 504, "Zeitlimit der Anfrage überschritten")
+        else:
+            if deadline_exceeded():
+                metrics.increment(metrics.timed_out, group)
+        finally:
+            request_deadline.reset(token)
+            for limit in acquired:
+                limit.release()
+
+    @staticmethod
+    async def _send_error(send, status: int, detail: str, headers: Optional[list] = None) -> None:
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                       + (headers or []),
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_metrics(self, send) -> None:
+        body = metrics.render(self.limits).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"text/plain; version=0.0.4"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
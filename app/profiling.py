@@ -0,0 +1,333 @@
+"""
+Profiling einzelner Anfragen (Sampling-Profiler)
+
+Ein Hintergrund-Thread liest während der Anfrage in kurzen Abständen den
+Stack des Event-Loop-Threads aus (sys._current_frames). Erfasst wird damit
+alles, was die Anfrage im Worker tut: Pony-Abfragen samt Übersetzung,
+Pydantic-Validierung, Template-Rendering und die Komprimierung. Jede Probe
+wird mit der tatsächlich vergangenen Zeit gewichtet, der GIL verzögert
+Proben also nicht zulasten der Genauigkeit. Laufen gleichzeitig andere
+Anfragen im selben Worker, erscheinen deren Stacks mit im Profil.
+
+Profiliert wird
+- mit dem Header "X-Profile: 1" von aktiven Administratoren (ADMIN_USERNAMES),
+- per Stichprobe (PROFILE_SAMPLE_RATE bzw. zur Laufzeit über
+  PUT /api/profiles/sampling), optional nur für bestimmte Pfadpräfixe und
+  aktive Benutzer.
+
+Die Laufzeit-Stichprobe liegt im Cache und gilt damit für alle Worker eines
+Hosts. Sie setzt deshalb ein gemeinsames Cache-Backend voraus
+(CACHE_BACKEND=sqlite); mit dem prozesslokalen Cache wird sie abgelehnt, da
+sonst nur der Worker profilieren würde, der die Anfrage bekommen hat. Bei
+mehreren Hosts ist sie je Host zu setzen.
+
+Ergebnisse landen in PROFILE_DIR als Collapsed-Stacks (flamegraph.pl,
+speedscope) und im speedscope-Format, abrufbar über /api/profiles. Die
+Profil-ID steht im Antwort-Header X-Profile-Id.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import HTTPConnection
+
+from app.auth.oauth2 import is_admin, load_user, token_username
+from app.cache import cache
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "hcc_profiles"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", 1))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))  # Anteil der Anfragen, 0 = aus
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", 60))  # danach keine weiteren Proben
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", 2))  # je Worker
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", 200))  # ältere Profile werden gelöscht
+# Laufzeit-Einstellungen der Stichprobe im Cache (gemeinsam für alle Worker)
+PROFILE_SAMPLING_KEY = "profiling:sampling"
+PROFILE_SAMPLING_REFRESH_SECONDS = 1
+PROFILE_FORMATS = {
+    "speedscope": ("speedscope.json", "application/json"),
+    "collapsed": ("collapsed.txt", "text/plain; charset=utf-8"),
+}
+
+_SITE_PACKAGES = re.compile(r".*[/\\](site|dist)-packages[/\\]")
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+Frame = Tuple[str, str, int]  # Funktion, Datei, Zeile der Definition
+
+
+def _short_path(path: str) -> str:
+    """Pfade relativ zum Projekt bzw. zu site-packages, damit Profile lesbar bleiben"""
+    if path.startswith(_APP_ROOT):
+        return path[len(_APP_ROOT):]
+    return _SITE_PACKAGES.sub("", path)
+
+
+class StackSampler:
+    """Sammelt Stacks eines Threads, gewichtet mit der Zeit seit der letzten Probe"""
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_INTERVAL_MS / 1000,
+                 max_seconds: float = PROFILE_MAX_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()  # Tupel von Frames (außen nach innen) -> Sekunden
+        self.samples = 0
+        self.duration = 0.0
+        self._codes: Dict[object, Frame] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _frame(self, code) -> Frame:
+        frame = self._codes.get(code)
+        if frame is None:
+            frame = self._codes[code] = (code.co_name, _short_path(code.co_filename), code.co_firstlineno)
+        return frame
+
+    def _run(self) -> None:
+        started = last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            if now - started > self.max_seconds:
+                break
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(self._frame(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += now - last
+                self.samples += 1
+            last = now
+        self.duration = time.perf_counter() - started
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+
+def collapsed_stacks(stacks: Counter) -> str:
+    """Format von flamegraph.pl: "außen;...;innen <Mikrosekunden>" je Zeile"""
+    lines = []
+    for stack, seconds in stacks.most_common():
+        names = ";".join(f"{name} ({path}:{line})".replace(";", ",") for name, path, line in stack)
+        lines.append(f"{names} {max(1, round(seconds * 1e6))}")
+    return "\n".join(lines) + "\n"
+
+
+def speedscope_profile(stacks: Counter, name: str) -> dict:
+    """Profil im speedscope-Dateiformat (eine Stichprobe je unterschiedlichem Stack)"""
+    frames: Dict[Frame, int] = {}
+    samples, weights = [], []
+    for stack, seconds in stacks.items():
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+        weights.append(round(seconds * 1000, 3))
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "hcc-plan",
+        "shared": {"frames": [{"name": n, "file": path, "line": line} for n, path, line in frames]},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(weights), 3),
+            "samples": samples,
+            "weights": weights,
+        }],
+    }
+
+
+class ProfileStore:
+    """Ablage der Profile als Dateien in PROFILE_DIR (je Profil Metadaten und beide Formate)"""
+
+    def __init__(self, directory: str = PROFILE_DIR, keep: int = PROFILE_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def path(self, profile_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{profile_id}.{suffix}")
+
+    def save(self, sampler: StackSampler, meta: dict) -> dict:
+        os.makedirs(self.directory, exist_ok=True)
+        meta = {**meta, "samples": sampler.samples, "sampled_ms": round(sampler.duration * 1000, 1)}
+        name = f"{meta['method']} {meta['path']}"
+        with open(self.path(meta["id"], PROFILE_FORMATS["collapsed"][0]), "w", encoding="utf-8") as target:
+            target.write(collapsed_stacks(sampler.stacks))
+        with open(self.path(meta["id"], PROFILE_FORMATS["speedscope"][0]), "w", encoding="utf-8") as target:
+            json.dump(speedscope_profile(sampler.stacks, name), target)
+        # Metadaten zuletzt, damit nur vollständige Profile gelistet werden
+        with open(self.path(meta["id"], "meta.json"), "w", encoding="utf-8") as target:
+            json.dump(meta, target)
+        self.prune()
+        return meta
+
+    def list(self) -> List[dict]:
+        """Alle Profile, neueste zuerst"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            if filename.endswith(".meta.json"):
+                try:
+                    with open(os.path.join(self.directory, filename), encoding="utf-8") as source:
+                        profiles.append(json.load(source))
+                except (OSError, ValueError):
+                    continue  # gleichzeitig gelöscht oder unvollständig
+        return profiles
+
+    def file(self, profile_id: str, profile_format: str) -> Optional[str]:
+        """Pfad der Profildatei, None für unbekannte IDs"""
+        if not re.fullmatch(r"[0-9a-f-]+", profile_id) or profile_format not in PROFILE_FORMATS:
+            return None
+        path = self.path(profile_id, PROFILE_FORMATS[profile_format][0])
+        return path if os.path.exists(path) else None
+
+    def prune(self) -> None:
+        metas = sorted(name for name in os.listdir(self.directory) if name.endswith(".meta.json"))
+        for filename in metas[:max(0, len(metas) - self.keep)]:
+            profile_id = filename[:-len(".meta.json")]
+            for suffix in ["meta.json"] + [suffix for suffix, _ in PROFILE_FORMATS.values()]:
+                try:
+                    os.remove(self.path(profile_id, suffix))
+                except FileNotFoundError:
+                    pass
+
+
+profile_store = ProfileStore()
+
+
+class SamplingSettings:
+    """Stichprobe zur Laufzeit: Anteil, Pfadpräfixe und Benutzer, mit Ablaufzeit im Cache"""
+
+    def __init__(self):
+        self._settings: Optional[dict] = None
+        self._loaded_at = 0.0
+
+    def get(self) -> Optional[dict]:
+        now = time.monotonic()
+        if now - self._loaded_at > PROFILE_SAMPLING_REFRESH_SECONDS:
+            data = cache.get(PROFILE_SAMPLING_KEY)
+            self._settings = json.loads(data) if data else None
+            self._loaded_at = now
+        return self._settings
+
+    def set(self, settings: Optional[dict], ttl: int) -> None:
+        """Setzt (oder mit None beendet) die Stichprobe; ValueError ohne gemeinsamen Cache"""
+        if settings is not None and not cache.backend.shared:
+            raise ValueError("Stichprobe zur Laufzeit braucht einen gemeinsamen Cache (CACHE_BACKEND=sqlite)")
+        if settings is None:
+            cache.backend.delete(PROFILE_SAMPLING_KEY)
+        else:
+            cache.set(PROFILE_SAMPLING_KEY, json.dumps(settings).encode(), ttl)
+        self._loaded_at = 0.0
+
+    def matches(self, path: str, username: Optional[str]) -> bool:
+        settings = self.get()
+        if settings is None:
+            return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        if settings.get("paths") and not path.startswith(tuple(settings["paths"])):
+            return False
+        if settings.get("usernames") and username not in settings["usernames"]:
+            return False
+        return random.random() < settings.get("rate", 0)
+
+
+sampling_settings = SamplingSettings()
+
+
+def new_profile_id() -> str:
+    """Zeitlich sortierbare ID (für Auflistung und Löschen der ältesten)"""
+    return f"{datetime.now():%Y%m%d-%H%M%S-%f}-{uuid.uuid4().hex[:6]}"
+
+
+class ProfilingMiddleware:
+    """Profiliert ausgewählte Anfragen und legt das Ergebnis in profile_store ab"""
+
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+        self._switch_interval = sys.getswitchinterval()
+
+    def _username(self, scope) -> Optional[str]:
+        """Angemeldeter Benutzer, None ohne gültiges Token oder für unbekannte und inaktive Benutzer"""
+        connection = HTTPConnection(scope)
+        username = token_username(connection.headers.get("authorization") or connection.cookies.get("access_token"))
+        user = load_user(username) if username else None
+        return username if user and user.get("is_active") else None
+
+    def _requested(self, scope) -> Tuple[bool, Optional[str]]:
+        """Ob die Anfrage profiliert wird, und der Benutzer (nur ermittelt, wenn nötig)"""
+        path = scope.get("path", "")
+        if path.startswith(("/static", "/api/profiles")):
+            return False, None
+        explicit = any(name == b"x-profile" and value.strip() == b"1" for name, value in scope["headers"])
+        settings = sampling_settings.get()
+        if not explicit and settings is None and PROFILE_SAMPLE_RATE <= 0:
+            return False, None
+
+        username = self._username(scope)
+        if explicit and is_admin(username):
+            return True, username
+        return sampling_settings.matches(path, username), username
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.active >= PROFILE_MAX_CONCURRENT:
+            await self.app(scope, receive, send)
+            return
+        profiled, username = self._requested(scope)
+        if not profiled:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = new_profile_id()
+        status_code = [None]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        if not self.active:
+            # Sonst kommt der Sampler erst nach dem GIL-Umschaltintervall (5 ms) zum Zug
+            self._switch_interval = sys.getswitchinterval()
+            sys.setswitchinterval(min(self._switch_interval, PROFILE_INTERVAL_MS / 1000))
+        self.active += 1
+        started = time.perf_counter()
+        sampler = StackSampler(threading.get_ident()).start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            self.active -= 1
+            if not self.active:
+                sys.setswitchinterval(self._switch_interval)
+            meta = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "username": username,
+                "status": status_code[0],
+                "duration_ms": round(elapsed * 1000, 1),
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            try:
+                await asyncio.to_thread(profile_store.save, sampler, meta)
+            except OSError as e:
+                print(f"Profil {profile_id} konnte nicht gespeichert werden: {e}")
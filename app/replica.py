@@ -0,0 +1,42 @@
+"""
+Lenkung von Lesezugriffen auf das Lesereplikat
+
+Lesende Endpunkte holen ihre Entitäten über read_entities(). Ist ein Replikat
+konfiguriert, liefern sie dessen Entitäten, sonst die der Primärdatenbank.
+Nach einem Schreibzugriff liest der betroffene Benutzer für
+REPLICA_STICKY_SECONDS von der Primärdatenbank und sieht so seine eigenen
+Änderungen, auch wenn das Replikat noch nicht nachgezogen hat. Das Fenster muss
+größer als die übliche Replikationsverzögerung sein. Bei mehreren Workern muss
+der Cache gemeinsam sein (CACHE_BACKEND=sqlite).
+"""
+import os
+from typing import Optional
+
+from app.cache import cache
+from app.database import replica_db
+from app.models import entities
+
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 5))
+
+
+def replica_enabled() -> bool:
+    return replica_db.provider is not None
+
+
+def _sticky_key(username: str) -> str:
+    return f"primary-sticky:{username}"
+
+
+def mark_write(username: str) -> None:
+    """Leitet die Lesezugriffe des Benutzers für das Sticky-Fenster auf die Primärdatenbank"""
+    if replica_enabled():
+        cache.set(_sticky_key(username), b"1", REPLICA_STICKY_SECONDS)
+
+
+def read_entities(username: Optional[str] = None):
+    """Entitäten für einen reinen Lesezugriff im Namen des Benutzers"""
+    if not replica_enabled():
+        return entities
+    if username and cache.get(_sticky_key(username)) is not None:
+        return entities
+    return entities.replica
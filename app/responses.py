@@ -0,0 +1,29 @@
+import os
+from typing import Any
+
+from fastapi.responses import Response
+from pydantic_core import to_json
+
+# Schneller Antwortmodus: bereits validierte Pydantic-Modelle werden direkt
+# serialisiert, ohne dass FastAPI sie gegen das response_model erneut validiert
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "False").lower() in ("true", "1", "t")
+
+
+class PydanticJSONResponse(Response):
+    """JSON-Antwort, die Pydantic-Modelle (auch in Listen) über pydantic-core serialisiert"""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def fast_response(content: Any, status_code: int = 200) -> Any:
+    """Gibt im schnellen Modus eine fertige Antwort zurück, sonst den Inhalt unverändert.
+
+    Der Inhalt muss bereits aus validierten Schema-Objekten bestehen, da FastAPI
+    bei einer fertigen Response das response_model nicht mehr anwendet.
+    """
+    if not FAST_JSON_RESPONSES:
+        return content
+    return PydanticJSONResponse(content, status_code=status_code)
@@ -0,0 +1,213 @@
+"""
+Prefork-Server für den Produktionsbetrieb
+
+Der Master-Prozess importiert die Anwendung einmal (Templates, ORM-Mapping) und
+forkt danach die Worker, die sich den Speicher per Copy-on-Write teilen und alle
+auf demselben Socket lauschen. Beendete Worker werden ersetzt, SIGHUP startet
+die Worker nacheinander neu, ohne dass der Dienst unterbrochen wird.
+"""
+import os
+import random
+import select
+import signal
+import socket
+import time
+
+import uvicorn
+from uvicorn.importer import import_from_string
+
+from app.cache import cache
+from app.database import db
+
+# Standardwerte aus der Umgebung
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", os.cpu_count() or 1))
+WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", 0))
+WEB_MAX_REQUESTS_JITTER = int(os.getenv("WEB_MAX_REQUESTS_JITTER", 0))
+WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", 30))
+
+# Wartezeit auf die Startmeldung eines neuen Workers beim rollierenden Neustart
+WORKER_BOOT_TIMEOUT = 30
+
+
+class _WorkerServer(uvicorn.Server):
+    """Uvicorn-Server, der dem Master über eine Pipe meldet, wenn er bereit ist"""
+
+    def __init__(self, config, ready_fd):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets=sockets)
+        if self.started:
+            os.write(self.ready_fd, b"1")
+        os.close(self.ready_fd)
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        app_path: str,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = WEB_WORKERS,
+        max_requests: int = WEB_MAX_REQUESTS,
+        max_requests_jitter: int = WEB_MAX_REQUESTS_JITTER,
+        graceful_timeout: int = WEB_GRACEFUL_TIMEOUT
+    ):
+        self.app_path = app_path
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+
+        self.app = None
+        self.sock = None
+        self.children = {}  # pid -> Lesepipe der Startmeldung
+        self.stopping = False
+        self.restart_requested = False
+
+    def run(self):
+        """Lädt die Anwendung vor, startet die Worker und überwacht sie"""
+        # Preload: Anwendung einmal im Master importieren
+        self.app = import_from_string(self.app_path)
+        # Der prozesslokale Cache würde Invalidierungen nicht an andere Worker weitergeben
+        if self.workers > 1 and not cache.backend.shared:
+            raise RuntimeError(
+                "CACHE_BACKEND=memory ist nur mit einem Worker möglich (WEB_WORKERS=1 oder CACHE_BACKEND=sqlite)"
+            )
+        # Keine Datenbankverbindung des Masters an die Worker vererben
+        db.disconnect()
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.listen(2048)
+        self.sock.set_inheritable(True)
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_restart)
+
+        print(f"Master {os.getpid()} lauscht auf {self.host}:{self.port} mit {self.workers} Workern")
+        for _ in range(self.workers):
+            self.spawn_worker()
+
+        try:
+            while not self.stopping:
+                self.reap_workers()
+                if self.restart_requested:
+                    self.restart_requested = False
+                    self.rolling_restart()
+                while not self.stopping and len(self.children) < self.workers:
+                    self.spawn_worker()
+                time.sleep(0.5)
+        finally:
+            self.stop_workers()
+            self.sock.close()
+
+    def spawn_worker(self) -> int:
+        ready_read, ready_write = os.pipe()
+        pid = os.fork()
+        if pid != 0:
+            os.close(ready_write)
+            self.children[pid] = ready_read
+            return pid
+
+        # Worker-Prozess
+        os.close(ready_read)
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+            signal.signal(signum, signal.SIG_DFL)
+        random.seed()
+
+        max_requests = None
+        if self.max_requests > 0:
+            max_requests = self.max_requests + random.randint(0, self.max_requests_jitter)
+
+        config = uvicorn.Config(
+            self.app,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=self.graceful_timeout,
+            proxy_headers=True
+        )
+        exit_code = 0
+        try:
+            _WorkerServer(config, ready_write).run(sockets=[self.sock])
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def reap_workers(self):
+        """Entfernt beendete Worker aus der Verwaltung"""
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            ready_fd = self.children.pop(pid, None)
+            if ready_fd is not None:
+                os.close(ready_fd)
+
+    def wait_ready(self, pid: int) -> bool:
+        """Wartet auf die Startmeldung eines Workers"""
+        ready, _, _ = select.select([self.children[pid]], [], [], WORKER_BOOT_TIMEOUT)
+        return bool(ready) and os.read(self.children[pid], 1) == b"1"
+
+    def rolling_restart(self):
+        """Ersetzt die Worker einzeln: neuer Worker zuerst, dann Graceful Shutdown des alten"""
+        for old_pid in list(self.children):
+            if self.stopping:
+                return
+            new_pid = self.spawn_worker()
+            if not self.wait_ready(new_pid):
+                print(f"Worker {new_pid} ist nicht gestartet, Neustart abgebrochen")
+                return
+            self.terminate_worker(old_pid)
+
+    def terminate_worker(self, pid: int):
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        deadline = time.monotonic() + self.graceful_timeout
+        while time.monotonic() < deadline:
+            try:
+                finished, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if finished:
+                break
+            time.sleep(0.1)
+        else:
+            os.kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        ready_fd = self.children.pop(pid, None)
+        if ready_fd is not None:
+            os.close(ready_fd)
+
+    def stop_workers(self):
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.children and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self.reap_workers()
+
+    def _handle_stop(self, signum, frame):
+        self.stopping = True
+
+    def _handle_restart(self, signum, frame):
+        self.restart_requested = True
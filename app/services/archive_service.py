@@ -0,0 +1,137 @@
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pony.orm import db_session, select, max as pony_max
+
+from app.cache import cache
+from app.database import db
+from app.models import entities
+
+# Archiv-Konfiguration
+# Verfügbarkeiten und abgeschlossene/stornierte Einsätze, die vor mehr als
+# ARCHIVE_AFTER_DAYS Tagen geendet haben, wandern in die Archivtabellen.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", 24))  # 0 = kein automatischer Lauf
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 1000))
+ARCHIVE_CACHE_NAMESPACE = "archive"
+ARCHIVED_ASSIGNMENT_STATUSES = ("abgeschlossen", "storniert")
+
+
+def archive_cutoff(now: Optional[datetime] = None) -> datetime:
+    """Stichtag der Archivierung (Mitternacht vor ARCHIVE_AFTER_DAYS Tagen)"""
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - timedelta(days=ARCHIVE_AFTER_DAYS)
+
+
+class ArchiveHorizon:
+    """Spätestes archiviertes Ende je Tabelle.
+
+    Lesezugriffe fragen das Archiv nur ab, wenn ihr Zeitraum vor diesem Zeitpunkt
+    beginnt. Der Wert ist prozesslokal und wird über die Version des
+    Cache-Namensraums mit den übrigen Workern abgeglichen.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.availability: Optional[datetime] = None
+        self.assignment: Optional[datetime] = None
+
+    def sync(self) -> "ArchiveHorizon":
+        version = cache.version(ARCHIVE_CACHE_NAMESPACE)
+        if version != self.version:
+            with db_session:
+                self.availability = pony_max(a.end_time for a in entities.ArchivedAvailability)
+                self.assignment = pony_max(a.end_date for a in entities.ArchivedAssignment)
+            self.version = version
+        return self
+
+
+archive_horizon = ArchiveHorizon()
+
+
+def reaches_archive(horizon: Optional[datetime], start: Optional[datetime]) -> bool:
+    """Ob ein ab start (None = unbegrenzt) reichender Zeitraum archivierte Einträge enthalten kann"""
+    return horizon is not None and (start is None or start < horizon)
+
+
+class ArchiveService:
+    @staticmethod
+    def _move_batch(hot, archive, columns: str, ids) -> None:
+        """Kopiert Zeilen ins Archiv und löscht sie aus der aktiven Tabelle (innerhalb der db_session)"""
+        hot_table = db.provider.quote_name(hot._table_)
+        archive_table = db.provider.quote_name(archive._table_)
+        id_list = ",".join(str(int(row_id)) for row_id in ids)
+        # ON CONFLICT: ein paralleler Lauf in einem anderen Worker hat die Zeile bereits kopiert
+        db.execute(f"""
+            INSERT INTO {archive_table} ({columns})
+            SELECT {columns} FROM {hot_table} WHERE id IN ({id_list})
+            ON CONFLICT (id) DO NOTHING
+        """)
+        db.execute(f"DELETE FROM {hot_table} WHERE id IN ({id_list})")
+
+    @staticmethod
+    def compact(cutoff: Optional[datetime] = None) -> Dict[str, int]:
+        """Verschiebt alle Einträge, die vor dem Stichtag geendet haben, ins Archiv.
+
+        Jeder Stapel läuft in einer eigenen Transaktion, damit die aktiven Tabellen
+        nicht lange gesperrt sind. Die Auslastungs-Rollups bleiben unverändert.
+        """
+        cutoff = cutoff or archive_cutoff()
+        moved = {"availabilities": 0, "assignments": 0}
+
+        while True:
+            with db_session:
+                ids = select(a.id for a in entities.Availability if a.end_time < cutoff)[:ARCHIVE_BATCH_SIZE]
+                if ids:
+                    ArchiveService._move_batch(
+                        entities.Availability, entities.ArchivedAvailability,
+                        'id, name, start_time, end_time, created_at, "user"', ids
+                    )
+            if not ids:
+                break
+            moved["availabilities"] += len(ids)
+
+        while True:
+            with db_session:
+                ids = select(
+                    a.id for a in entities.Assignment
+                    if a.end_date < cutoff and a.status in ARCHIVED_ASSIGNMENT_STATUSES
+                )[:ARCHIVE_BATCH_SIZE]
+                if ids:
+                    ArchiveService._move_batch(
+                        entities.Assignment, entities.ArchivedAssignment,
+                        'id, start_date, end_date, status, notes, created_at, "user", project', ids
+                    )
+            if not ids:
+                break
+            moved["assignments"] += len(ids)
+
+        if moved["availabilities"] or moved["assignments"]:
+            cache.invalidate(ARCHIVE_CACHE_NAMESPACE)
+        return moved
+
+
+def archive_job(job) -> Dict[str, int]:
+    """Job-Funktion: Archivierung zu einem Stichtag (Parameter cutoff, optional)"""
+    cutoff = job.params.get("cutoff")
+    return ArchiveService.compact(datetime.fromisoformat(cutoff) if cutoff else None)
+
+
+async def run_archive_schedule(interval_hours: float = ARCHIVE_INTERVAL_HOURS) -> None:
+    """Führt die Archivierung regelmäßig im Hintergrund aus.
+
+    Läuft in jedem Worker; durch den zufälligen Versatz und die idempotente
+    Kompaktierung stören sich parallele Läufe nicht.
+    """
+    await asyncio.sleep(random.uniform(0, 60))
+    while True:
+        try:
+            moved = await asyncio.to_thread(ArchiveService.compact)
+            if moved["availabilities"] or moved["assignments"]:
+                print(f"Archiviert: {moved['availabilities']} Verfügbarkeiten, {moved['assignments']} Einsätze")
+        except Exception as e:
+            print(f"Fehler bei der Archivierung: {e}")
+        await asyncio.sleep(interval_hours * 3600)
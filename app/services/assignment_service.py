@@ -0,0 +1,135 @@
+from typing import Optional
+
+from pony.orm import db_session, commit, flush, select
+
+from app.models import entities
+from app.models import schemas
+from app.replica import mark_write
+from app.services.geo_service import geo_index
+from app.services.availability_service import lock_user
+from app.services.holiday_service import working_hours
+from app.services.occupancy_service import OccupancyService
+from app.services.schedule_service import schedule_snapshot
+from app.services.utilization_service import UtilizationService
+
+ASSIGNMENT_STATUSES = ("geplant", "bestätigt", "abgeschlossen", "storniert")
+
+
+class AssignmentService:
+    @staticmethod
+    def _to_response(assignment: entities.Assignment) -> schemas.AssignmentResponse:
+        return schemas.AssignmentResponse(
+            id=assignment.id,
+            username=assignment.user.username,
+            project_id=assignment.project.id,
+            start_date=assignment.start_date,
+            end_date=assignment.end_date,
+            status=assignment.status,
+            notes=assignment.notes,
+            travel_km=geo_index.sync().user_distance_km(assignment.user.id, assignment.project.location.id),
+            working_hours=round(float(working_hours([assignment.start_date], [assignment.end_date])[0]), 2)
+        )
+
+    @staticmethod
+    @db_session
+    def create_assignment(username: str, assignment_data: schemas.AssignmentCreate) -> schemas.AssignmentResponse:
+        """Plant einen Benutzer für ein Projekt ein"""
+        user = lock_user(username=username)
+        if not user:
+            raise ValueError("Benutzer nicht gefunden")
+
+        project = entities.Project.get(id=assignment_data.project_id)
+        if not project:
+            raise ValueError("Projekt nicht gefunden")
+
+        if assignment_data.start_date >= assignment_data.end_date:
+            raise ValueError("Startzeit muss vor Endzeit liegen")
+
+        if assignment_data.status not in ASSIGNMENT_STATUSES:
+            raise ValueError("Ungültiger Status")
+
+        assignment = entities.Assignment(
+            user=user,
+            project=project,
+            start_date=assignment_data.start_date,
+            end_date=assignment_data.end_date,
+            status=assignment_data.status,
+            notes=assignment_data.notes or ""
+        )
+        UtilizationService.apply_assignment(assignment)
+        assignment.flush()
+        OccupancyService.refresh(user.id, assignment.start_date, assignment.end_date)
+        response = AssignmentService._to_response(assignment)
+        commit()
+        mark_write(username)
+        schedule_snapshot.assignment_changed(response.id, user.id, response.project_id,
+                                             response.start_date, response.end_date, response.status)
+        return response
+
+    @staticmethod
+    @db_session
+    def _user_id(assignment_id: int) -> Optional[int]:
+        """Benutzer eines Einsatzes (eigene db_session, vor dem Sperren)"""
+        return select(a.user.id for a in entities.Assignment if a.id == assignment_id).first()
+
+    @staticmethod
+    def _lock_assignment(assignment_id: int, user_id: int) -> Optional[entities.Assignment]:
+        """Sperrt den Benutzer und liest erst danach den Einsatz (erster Zugriff in der db_session)"""
+        lock_user(id=user_id)
+        assignment = entities.Assignment.get(id=assignment_id)
+        # Zwischen Ermitteln und Sperren gelöscht
+        if not assignment or assignment.user.id != user_id:
+            return None
+        return assignment
+
+    @staticmethod
+    def update_status(assignment_id: int, status: str) -> Optional[schemas.AssignmentResponse]:
+        """Ändert den Status eines Einsatzes.
+
+        Wie alle Schreibpfade wird zuerst der Benutzer gesperrt; dessen ID kommt
+        daher aus einer eigenen db_session.
+        """
+        if status not in ASSIGNMENT_STATUSES:
+            raise ValueError("Ungültiger Status")
+
+        user_id = AssignmentService._user_id(assignment_id)
+        if user_id is None:
+            return None
+        with db_session:
+            assignment = AssignmentService._lock_assignment(assignment_id, user_id)
+            if not assignment:
+                return None
+
+            UtilizationService.apply_assignment(assignment, sign=-1)
+            assignment.status = status
+            UtilizationService.apply_assignment(assignment)
+            assignment.flush()
+            OccupancyService.refresh(user_id, assignment.start_date, assignment.end_date)
+            response = AssignmentService._to_response(assignment)
+            commit()
+        mark_write(response.username)
+        schedule_snapshot.assignment_changed(response.id, user_id, response.project_id,
+                                             response.start_date, response.end_date, response.status)
+        return response
+
+    @staticmethod
+    def delete_assignment(assignment_id: int) -> bool:
+        """Löscht einen Einsatz (Sperre wie bei update_status)"""
+        user_id = AssignmentService._user_id(assignment_id)
+        if user_id is None:
+            return False
+        with db_session:
+            assignment = AssignmentService._lock_assignment(assignment_id, user_id)
+            if not assignment:
+                return False
+
+            username = assignment.user.username
+            UtilizationService.apply_assignment(assignment, sign=-1)
+            start_date, end_date = assignment.start_date, assignment.end_date
+            assignment.delete()
+            flush()
+            OccupancyService.refresh(user_id, start_date, end_date)
+            commit()
+        mark_write(username)
+        schedule_snapshot.assignments_removed([assignment_id])
+        return True
@@ -1,13 +1,98 @@
 
-from datetime import datetime, date
-from typing import List, Optional
+import json
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
 from pony.orm import db_session, select, commit, flush
+from pydantic_core import to_json
 
+from app.cache import cache
+from app.database import db
 from app.models import entities
 from app.models import schemas
+from app.replica import mark_write, read_entities
+from app.services.archive_service import archive_horizon, reaches_archive
+from app.services.occupancy_service import OccupancyService
+from app.services.schedule_service import schedule_snapshot
+from app.services.utilization_service import UtilizationService
+
+
+def availability_cache_namespace(username: str) -> str:
+    """Cache-Namensraum der Verfügbarkeiten eines Benutzers"""
+    return f"availabilities:{username}"
+
+
+def lock_user(**kwargs) -> Optional[entities.User]:
+    """Holt den Benutzer mit Schreibsperre (erster Zugriff in der db_session).
+
+    Alle Schreibpfade für Verfügbarkeiten und Einsätze sperren zuerst den
+    Benutzer. Damit laufen Überschneidungsprüfung und Einfügen eines Benutzers
+    nacheinander, während Schreibzugriffe verschiedener Benutzer parallel
+    bleiben: Postgres sperrt nur die Benutzerzeile (SELECT ... FOR UPDATE),
+    SQLite beginnt die Transaktion mit BEGIN IMMEDIATE und hat ohnehin nur
+    einen Schreiber.
+    """
+    return entities.User.get_for_update(**kwargs)
 
 
 class AvailabilityService:
+    @staticmethod
+    def _to_responses(availabilities, user: entities.User) -> List[schemas.AvailabilityResponse]:
+        """Baut Antwortobjekte für Verfügbarkeiten eines Benutzers.
+
+        Der Benutzer wird nur einmal validiert (inkl. E-Mail-Prüfung) und als fertiges
+        Objekt in alle Einträge übernommen statt pro Eintrag erneut.
+        """
+        user_response = schemas.UserResponse.model_validate(user)
+        return [
+            schemas.AvailabilityResponse.model_validate({
+                "id": a.id,
+                "name": a.name,
+                "start_time": a.start_time,
+                "end_time": a.end_time,
+                "user": user_response
+            }) for a in availabilities
+        ]
+
+    @staticmethod
+    def _from_cache(data: bytes) -> List[schemas.AvailabilityResponse]:
+        """Stellt zwischengespeicherte Antwortobjekte wieder her"""
+        items = json.loads(data)
+        if not items:
+            return []
+        user_response = schemas.UserResponse.model_validate(items[0]["user"])
+        return [
+            schemas.AvailabilityResponse.model_validate({**item, "user": user_response})
+            for item in items
+        ]
+
+    @staticmethod
+    def _overlaps(
+        user: entities.User,
+        start_time: datetime,
+        end_time: datetime,
+        exclude_id: Optional[int] = None
+    ) -> bool:
+        """Ob sich der Zeitraum mit einer Verfügbarkeit des Benutzers überschneidet.
+
+        Die Belegungs-Bitmaps schließen die meisten Fälle ohne Intervallabfrage
+        aus, genau geprüft wird nur bei belegten Slots oder fehlender Bitmap.
+        """
+        if not OccupancyService.may_overlap(user.id, start_time, end_time):
+            return False
+
+        query = select(a for a in entities.Availability
+                       if a.user == user and a.start_time < end_time and a.end_time > start_time)
+        if exclude_id:
+            query = query.filter(lambda a: a.id != exclude_id)
+
+        if not query and reaches_archive(archive_horizon.sync().availability, start_time):
+            query = select(a for a in entities.ArchivedAvailability
+                           if a.user == user and a.start_time < end_time and a.end_time > start_time)
+
+        return bool(query)
+
     @staticmethod
     @db_session
     def create_availability(
@@ -15,27 +100,14 @@ class AvailabilityService:
         availability_data: schemas.AvailabilityCreate
     ) -> schemas.AvailabilityResponse:
         """Erstellt eine neue Verfügbarkeit für einen Benutzer"""
-        user = entities.User.get(username=username)
+        user = lock_user(username=username)
         if not user:
             raise ValueError("Benutzer nicht gefunden")
             
         if availability_data.start_time >= availability_data.end_time:
             raise ValueError("Startzeit muss vor Endzeit liegen")
 
-        # Prüfen auf Überschneidungen
-        overlapping = select(a for a in entities.Availability
-                            if a.user == user and (
-                                (availability_data.start_time >= a.start_time and
-                                 availability_data.end_time <= a.end_time) or
-                                (availability_data.start_time <= a.start_time and
-                                 availability_data.end_time >= a.end_time) or
-                                (availability_data.start_time >= a.start_time and
-                                 availability_data.start_time < a.end_time) or
-                                (availability_data.end_time > a.start_time and
-                                 availability_data.end_time <= a.end_time)
-                            ))
-        
-        if overlapping:
+        if AvailabilityService._overlaps(user, availability_data.start_time, availability_data.end_time):
             raise ValueError("Zeitraum überschneidet sich mit existierender Verfügbarkeit")
 
         availability = entities.Availability(
@@ -44,11 +116,20 @@ class AvailabilityService:
             end_time=availability_data.end_time,
             user=user
         )
+        UtilizationService.apply_availability(availability)
 
         # Flush durchführen, damit die ID generiert wird
         flush()
+        OccupancyService.refresh(user.id, availability.start_time, availability.end_time)
+        response = schemas.AvailabilityResponse.model_validate(availability)
 
-        return schemas.AvailabilityResponse.model_validate(availability)
+        # Cache erst nach dem Commit invalidieren, damit kein Worker alte Daten neu einliest
+        commit()
+        # Eigene Lesezugriffe vorerst von der Primärdatenbank, bis das Replikat nachgezogen hat
+        mark_write(username)
+        cache.invalidate(availability_cache_namespace(username))
+        schedule_snapshot.availability_added(response.id, user.id, response.start_time, response.end_time)
+        return response
 
     @staticmethod
     @db_session
@@ -58,40 +139,209 @@ class AvailabilityService:
         end_date: Optional[date] = None
     ) -> List[schemas.AvailabilityResponse]:
         """Holt Verfügbarkeiten eines Benutzers mit optionaler Datumsbegrenzung"""
-        query = select(a for a in entities.Availability if a.user.username == username)
+        cache_key = cache.key(availability_cache_namespace(username), f"{start_date}:{end_date}")
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return AvailabilityService._from_cache(cached)
+
+        source = read_entities(username)
+        user = source.User.get(username=username)
+        if not user:
+            return []
+
+        start_datetime = datetime.combine(start_date, datetime.min.time()) if start_date else None
+        end_datetime = datetime.combine(end_date, datetime.max.time()) if end_date else None
 
-        if start_date:
-            start_datetime = datetime.combine(start_date, datetime.min.time())
-            query = query.filter(lambda a: a.start_time >= start_datetime)
+        # Das Archiv nur lesen, wenn der Zeitraum hineinreicht
+        sources = [source.Availability]
+        if reaches_archive(archive_horizon.sync().availability, start_datetime):
+            sources.insert(0, source.ArchivedAvailability)
 
-        if end_date:
-            end_datetime = datetime.combine(end_date, datetime.max.time())
-            query = query.filter(lambda a: a.end_time <= end_datetime)
+        availabilities = []
+        for entity in sources:
+            query = select(a for a in entity if a.user == user)
+            if start_datetime:
+                query = query.filter(lambda a: a.start_time >= start_datetime)
+            if end_datetime:
+                # Obergrenze auch auf start_time, damit der Index (user, start_time) den Bereich eingrenzt
+                query = query.filter(lambda a: a.start_time <= end_datetime and a.end_time <= end_datetime)
+            availabilities.extend(query)
 
-        return [schemas.AvailabilityResponse.model_validate(a) for a in query]
+        responses = AvailabilityService._to_responses(availabilities, user)
+        cache.set(cache_key, to_json(responses))
+        return responses
 
+    @staticmethod
+    def get_availabilities_by_day(
+        username: str,
+        start_date: date,
+        end_date: date
+    ) -> Dict[date, List[schemas.AvailabilityResponse]]:
+        """Verfügbarkeiten im Zeitraum nach Starttag gruppiert (eine Abfrage für den ganzen Zeitraum)"""
+        days: Dict[date, List[schemas.AvailabilityResponse]] = {}
+        availabilities = AvailabilityService.get_availabilities(username, start_date, end_date)
+        for availability in sorted(availabilities, key=lambda a: a.start_time):
+            days.setdefault(availability.start_time.date(), []).append(availability)
+        return days
 
     @staticmethod
     @db_session
     def delete_availability(availability_id: int, username: str) -> bool:
         """Löscht eine Verfügbarkeit, wenn sie dem Benutzer gehört"""
+        if not lock_user(username=username):
+            return False
         availability = entities.Availability.get(id=availability_id)
-        
+
         if not availability or availability.user.username != username:
             return False
             
+        UtilizationService.apply_availability(availability, sign=-1)
+        user_id, start_time, end_time = availability.user.id, availability.start_time, availability.end_time
         availability.delete()
+        flush()
+        OccupancyService.refresh(user_id, start_time, end_time)
+        commit()
+        mark_write(username)
+        cache.invalidate(availability_cache_namespace(username))
+        schedule_snapshot.availabilities_removed([availability_id])
         return True
 
+    @staticmethod
+    def _range_query(user: entities.User, start_date: date, end_date: date, name: Optional[str] = None):
+        """Verfügbarkeiten, die vollständig im Zeitraum liegen (Enddatum inklusive)"""
+        if start_date > end_date:
+            raise ValueError("Startdatum muss vor dem Enddatum liegen")
+
+        start_datetime = datetime.combine(start_date, datetime.min.time())
+        end_datetime = datetime.combine(end_date, datetime.max.time())
+        query = select(a for a in entities.Availability
+                       if a.user == user and a.start_time >= start_datetime and a.end_time <= end_datetime)
+        if name:
+            query = query.filter(lambda a: a.name == name)
+        return query
+
+    @staticmethod
+    @db_session
+    def delete_availabilities_in_range(
+        username: str,
+        start_date: date,
+        end_date: date,
+        name: Optional[str] = None
+    ) -> List[int]:
+        """Löscht alle Verfügbarkeiten im Zeitraum mit einer Anweisung und gibt deren IDs zurück"""
+        user = lock_user(username=username)
+        if not user:
+            raise ValueError("Benutzer nicht gefunden")
+
+        query = AvailabilityService._range_query(user, start_date, end_date, name)
+        rows = list(select((a.id, a.start_time, a.end_time) for a in query))
+        if not rows:
+            return []
+
+        UtilizationService.apply_availability_intervals(user.id, [(s, e) for _, s, e in rows], sign=-1)
+        query.delete(bulk=True)
+        OccupancyService.refresh(user.id, min(row[1] for row in rows), max(row[2] for row in rows))
+        commit()
+        mark_write(username)
+        cache.invalidate(availability_cache_namespace(username))
+        schedule_snapshot.availabilities_removed([row[0] for row in rows])
+        return sorted(row[0] for row in rows)
+
+    @staticmethod
+    @db_session
+    def shift_availabilities_in_range(
+        username: str,
+        start_date: date,
+        end_date: date,
+        days: int,
+        name: Optional[str] = None
+    ) -> List[int]:
+        """Verschiebt alle Verfügbarkeiten im Zeitraum um days Tage und gibt deren IDs zurück.
+
+        Die betroffenen Einträge behalten ihren Abstand zueinander, geprüft werden
+        nur Überschneidungen mit den übrigen Verfügbarkeiten des Benutzers.
+        """
+        user = lock_user(username=username)
+        if not user:
+            raise ValueError("Benutzer nicht gefunden")
+        if days == 0:
+            raise ValueError("Verschiebung um 0 Tage")
+
+        rows = list(select(
+            (a.id, a.start_time, a.end_time)
+            for a in AvailabilityService._range_query(user, start_date, end_date, name)
+        ))
+        if not rows:
+            return []
+
+        ids, starts, ends = (list(column) for column in zip(*rows))
+        delta = timedelta(days=days)
+        new_starts = [start + delta for start in starts]
+        new_ends = [end + delta for end in ends]
+
+        window_start, window_end = min(new_starts), max(new_ends)
+        others = list(select(
+            (a.start_time, a.end_time) for a in entities.Availability
+            if a.user == user and a.id not in ids
+            and a.start_time < window_end and a.end_time > window_start
+        ).without_distinct())
+        if reaches_archive(archive_horizon.sync().availability, window_start):
+            others.extend(select(
+                (a.start_time, a.end_time) for a in entities.ArchivedAvailability
+                if a.user == user and a.start_time < window_end and a.end_time > window_start
+            ).without_distinct())
+        others.sort()
+        if others:
+            # Je neuem Intervall: Hat ein früher beginnender Eintrag ein späteres Ende?
+            other_starts, other_ends = (np.array(column, dtype="datetime64[us]") for column in zip(*others))
+            reach = np.maximum.accumulate(other_ends)
+            index = np.searchsorted(other_starts, np.array(new_ends, dtype="datetime64[us]")) - 1
+            if np.any((index >= 0) & (reach[np.maximum(index, 0)] > np.array(new_starts, dtype="datetime64[us]"))):
+                raise ValueError("Zeitraum überschneidet sich mit existierender Verfügbarkeit")
+
+        id_list = ",".join(str(int(availability_id)) for availability_id in ids)
+        if db.provider_name == "sqlite":
+            # Zeitpunkte liegen als Text vor, die Mikrosekunden werden übernommen
+            modifier = f"{days:+d} days"
+            db.execute(f"""
+                UPDATE "Availability" SET
+                    start_time = strftime('%Y-%m-%d %H:%M:%S', start_time, $modifier) || substr(start_time, 20),
+                    end_time = strftime('%Y-%m-%d %H:%M:%S', end_time, $modifier) || substr(end_time, 20)
+                WHERE id IN ({id_list})
+            """)
+        else:
+            db.execute(f"""
+                UPDATE "availability" SET
+                    start_time = start_time + $days * INTERVAL '1 day',
+                    end_time = end_time + $days * INTERVAL '1 day'
+                WHERE id IN ({id_list})
+            """)
+
+        UtilizationService.apply_availability_intervals(user.id, list(zip(starts, ends)), sign=-1)
+        UtilizationService.apply_availability_intervals(user.id, list(zip(new_starts, new_ends)))
+        OccupancyService.refresh(user.id, min(starts), max(ends))
+        OccupancyService.refresh(user.id, min(new_starts), max(new_ends))
+        commit()
+        mark_write(username)
+        cache.invalidate(availability_cache_namespace(username))
+        schedule_snapshot.availabilities_changed(ids, user.id, new_starts, new_ends)
+        return sorted(ids)
+
     @staticmethod
     @db_session
     def get_upcoming_availabilities(username: str, limit: int = 3) -> List[schemas.AvailabilityResponse]:
         """Holt die nächsten Verfügbarkeiten eines Benutzers"""
+        source = read_entities(username)
+        user = source.User.get(username=username)
+        if not user:
+            return []
+
         now = datetime.now()
-        query = select(a for a in entities.Availability
-                       if a.user.username == username and a.start_time > now)
-        return [schemas.AvailabilityResponse.model_validate(a)
-                for a in query.order_by(entities.Availability.start_time)][:limit]
+        query = select(a for a in source.Availability
+                       if a.user == user and a.start_time > now)
+        return AvailabilityService._to_responses(
+            query.order_by(source.Availability.start_time)[:limit], user
+        )
 
     @staticmethod
     @db_session
@@ -106,23 +356,7 @@ class AvailabilityService:
         if not user:
             return False
 
-        query = select(a for a in entities.Availability
-                      if a.user == user and (
-                           # Fall 1: Neue Zeit liegt komplett innerhalb einer existierenden Zeit
-                           (start_time >= a.start_time and end_time <= a.end_time) or
-                           # Fall 2: Neue Zeit umschließt eine existierende Zeit
-                           (start_time <= a.start_time and end_time >= a.end_time) or
-                           # Fall 3: Neue Startzeit liegt in existierender Zeit
-                           (start_time >= a.start_time and start_time < a.end_time) or
-                           # Fall 4: Neue Endzeit liegt in existierender Zeit
-                           (end_time > a.start_time and end_time <= a.end_time)
-                       )
-                       )
-        
-        if exclude_id:
-            query = query.filter(lambda a: a.id != exclude_id)
-
-        return bool(query)
+        return AvailabilityService._overlaps(user, start_time, end_time, exclude_id)
 
     @staticmethod
     @db_session
@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select
+
+from app.models import entities
+from app.models import schemas
+from app.services.archive_service import archive_horizon, reaches_archive
+from app.services.schedule_service import schedule_snapshot
+from app.services.utilization_service import CANCELLED_STATUS, to_epoch
+
+# Fensterbreite je Auflösung in Sekunden
+RESOLUTIONS = {"hour": 3600, "day": 86400}
+
+# Obergrenze für die Anzahl der Zeitfenster pro Abfrage
+MAX_BUCKETS = 24 * 366
+
+
+def bucket_indices(values: np.ndarray, origin: int, step: int, buckets: int, round_up: bool) -> np.ndarray:
+    """Zeitpunkte (Epoch-Sekunden) auf Fensterindizes abbilden, begrenzt auf [0, buckets]"""
+    offsets = values - origin
+    indices = -(-offsets // step) if round_up else offsets // step
+    return np.clip(indices, 0, buckets)
+
+
+def merge_ranges(groups: np.ndarray, lows: np.ndarray,
+                 highs: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vereinigt je Gruppe überlappende oder aneinandergrenzende Bereiche [low, high).
+
+    highs muss nichtnegativ sein. Liefert Gruppe, Beginn und Ende der vereinigten Bereiche.
+    """
+    order = np.lexsort((lows, groups))
+    groups, lows, highs = groups[order], lows[order], highs[order]
+    # Laufendes Maximum der Enden je Gruppe (Gruppen durch einen Versatz getrennt)
+    offset = groups * (int(highs.max()) + 1)
+    reach = np.maximum.accumulate(offset + highs) - offset
+    new = np.ones(len(groups), dtype=bool)
+    new[1:] = (groups[1:] != groups[:-1]) | (lows[1:] > reach[:-1])
+    first = np.flatnonzero(new)
+    return groups[first], lows[first], np.maximum.reduceat(highs, first)
+
+
+class CoverageService:
+    @staticmethod
+    @db_session
+    def get_coverage(
+        start: datetime,
+        end: datetime,
+        resolution: str = "day",
+        project_ids: Optional[List[int]] = None
+    ) -> List[schemas.ProjectCoverage]:
+        """Besetzung je Projekt und Zeitfenster im Vergleich zum Bedarf.
+
+        Die Besetzung ist die Zahl der verschiedenen Benutzer mit einem Einsatz
+        im Fenster. Alle Einsätze des Zeitraums werden mit einer Abfrage geladen
+        und über Differenz-Arrays mit anschließender Präfixsumme auf die Fenster
+        verteilt.
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError("Ungültige Auflösung")
+        if start >= end:
+            raise ValueError("Startzeit muss vor Endzeit liegen")
+
+        step = RESOLUTIONS[resolution]
+        buckets = -(-int((end - start).total_seconds()) // step)
+        if buckets > MAX_BUCKETS:
+            raise ValueError("Zeitraum ist für diese Auflösung zu groß")
+
+        projects = select(p for p in entities.Project if p.start_date < end and p.end_date > start)
+        if project_ids is not None:
+            projects = projects.filter(lambda p: p.id in project_ids)
+        projects = list(projects.order_by(entities.Project.id))
+        if not projects:
+            return []
+
+        selected_ids = [p.id for p in projects]
+        origin = int(to_epoch([start])[0])
+
+        # Bedarf: benötigte Mitarbeiter innerhalb der Projektlaufzeit
+        required_diff = np.zeros((len(projects), buckets + 1), dtype=np.int64)
+        project_rows = np.arange(len(projects))
+        np.add.at(required_diff, (project_rows, bucket_indices(
+            to_epoch([p.start_date for p in projects]), origin, step, buckets, round_up=False
+        )), [p.required_staff for p in projects])
+        np.add.at(required_diff, (project_rows, bucket_indices(
+            to_epoch([p.end_date for p in projects]), origin, step, buckets, round_up=True
+        )), [-p.required_staff for p in projects])
+        required = np.cumsum(required_diff, axis=1)[:, :buckets]
+
+        # Besetzung: Einsätze aus dem Schedule-Snapshot, nur mit Archiv aus der Datenbank
+        if reaches_archive(archive_horizon.sync().assignment, start):
+            assignments = [row for entity in (entities.Assignment, entities.ArchivedAssignment) for row in select(
+                (a.project.id, a.user.id, a.start_date, a.end_date) for a in entity
+                if a.project.id in selected_ids and a.start_date < end and a.end_date > start
+                and a.status != CANCELLED_STATUS
+            ).without_distinct()]
+            assignment_projects = np.array([row[0] for row in assignments], dtype=np.int64)
+            assignment_users = np.array([row[1] for row in assignments], dtype=np.int64)
+            starts, ends = to_epoch([row[2] for row in assignments]), to_epoch([row[3] for row in assignments])
+        else:
+            assignment_projects, assignment_users, starts, ends = schedule_snapshot.sync().assigned_intervals(
+                selected_ids, start, end
+            )
+        assigned_diff = np.zeros((len(projects), buckets + 1), dtype=np.int64)
+        if len(assignment_projects):
+            # Gezählt werden Benutzer: mehrfache oder überlappende Einsätze desselben
+            # Benutzers im Projekt werden vorher auf Fensterebene vereinigt
+            users, user_index = np.unique(assignment_users, return_inverse=True)
+            # selected_ids ist nach ID sortiert
+            assignment_rows = np.searchsorted(np.array(selected_ids), assignment_projects)
+            groups, first_buckets, end_buckets = merge_ranges(
+                assignment_rows * len(users) + user_index.reshape(-1),
+                bucket_indices(starts, origin, step, buckets, round_up=False),
+                bucket_indices(ends, origin, step, buckets, round_up=True)
+            )
+            np.add.at(assigned_diff, (groups // len(users), first_buckets), 1)
+            np.add.at(assigned_diff, (groups // len(users), end_buckets), -1)
+        assigned = np.cumsum(assigned_diff, axis=1)[:, :buckets]
+
+        # Lücken: zusammenhängende Fenster mit Unterbesetzung
+        shortfall = np.maximum(required - assigned, 0)
+        uncovered = np.pad(shortfall > 0, ((0, 0), (1, 1)))
+        changes = np.diff(uncovered.astype(np.int8), axis=1)
+
+        coverage = []
+        for row, project in enumerate(projects):
+            gap_starts = np.flatnonzero(changes[row] == 1)
+            gap_ends = np.flatnonzero(changes[row] == -1)
+            coverage.append(schemas.ProjectCoverage(
+                project_id=project.id,
+                project_name=project.name,
+                required_staff=project.required_staff,
+                resolution=resolution,
+                start=start,
+                assigned=assigned[row].tolist(),
+                required=required[row].tolist(),
+                gaps=[
+                    schemas.CoverageGap(
+                        start=start + timedelta(seconds=int(gap_start) * step),
+                        end=min(start + timedelta(seconds=int(gap_end) * step), end),
+                        missing=int(shortfall[row, gap_start:gap_end].max())
+                    )
+                    for gap_start, gap_end in zip(gap_starts, gap_ends)
+                ]
+            ))
+        return coverage
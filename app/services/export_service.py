@@ -0,0 +1,238 @@
+import csv
+import io
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import IO, Callable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select, count
+
+from app.models import entities
+from app.services.archive_service import archive_horizon, reaches_archive
+from app.services.holiday_service import normalize_state, working_hours
+from app.services.utilization_service import CANCELLED_STATUS, to_epoch
+
+try:
+    from openpyxl import Workbook
+except ImportError:
+    Workbook = None
+
+# Export-Konfiguration
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 5000))
+# Längere Zeiträume laufen als Hintergrundauftrag, das Ergebnis liegt dann in EXPORT_DIR
+EXPORT_SYNC_MAX_DAYS = int(os.getenv("EXPORT_SYNC_MAX_DAYS", 31))
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "hcc_exports"))
+EXPORT_CSV_DELIMITER = os.getenv("EXPORT_CSV_DELIMITER", ";")
+EXPORT_KEEP = int(os.getenv("EXPORT_KEEP", 50))  # ältere Exportdateien werden gelöscht
+# Halbfertige Dateien abgebrochener Prozesse gelten nach dieser Zeit ohne Schreibzugriff als verwaist
+EXPORT_PART_MAX_AGE_SECONDS = 3600
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+EXPORT_COLUMNS = (
+    "einsatz_id", "benutzer", "name", "projekt_id", "projekt", "einsatzort", "plz", "ort",
+    "beginn", "ende", "status", "stunden", "arbeitsstunden",
+)
+
+
+def export_range(start_date: date, end_date: date) -> Tuple[datetime, datetime]:
+    """Zeitraum als halboffenes Intervall (Enddatum inklusive)"""
+    if start_date > end_date:
+        raise ValueError("Startdatum muss vor dem Enddatum liegen")
+    return (
+        datetime.combine(start_date, datetime.min.time()),
+        datetime.combine(end_date + timedelta(days=1), datetime.min.time()),
+    )
+
+
+def xlsx_available() -> bool:
+    return Workbook is not None
+
+
+def export_filename(start_date: date, end_date: date, export_format: str) -> str:
+    return f"einsaetze_{start_date:%Y%m%d}_{end_date:%Y%m%d}.{export_format}"
+
+
+class ExportService:
+    @staticmethod
+    def _sources(range_start: datetime) -> list:
+        sources = [entities.Assignment]
+        if reaches_archive(archive_horizon.sync().assignment, range_start):
+            sources.append(entities.ArchivedAssignment)
+        return sources
+
+    @staticmethod
+    @db_session
+    def count_assignments(start_date: date, end_date: date) -> int:
+        range_start, range_end = export_range(start_date, end_date)
+        return sum(
+            count(a for a in entity
+                  if a.start_date < range_end and a.end_date > range_start and a.status != CANCELLED_STATUS)
+            for entity in ExportService._sources(range_start)
+        )
+
+    @staticmethod
+    def iter_batches(start_date: date, end_date: date, state: Optional[str] = None,
+                     on_batch: Optional[Callable[[int], None]] = None) -> Iterator[List[tuple]]:
+        """Exportzeilen der nicht stornierten Einsätze im Zeitraum in Stapeln.
+
+        Jeder Stapel ist eine eigene kurze Abfrage (Keyset über die ID), es wird
+        weder eine Transaktion noch das ganze Ergebnis im Speicher gehalten.
+        Stunden werden auf den Zeitraum begrenzt, Arbeitsstunden ohne
+        Wochenenden und Feiertage (Bundesland state) berechnet. on_batch erhält
+        nach jedem Stapel die Anzahl der bisher gelieferten Zeilen.
+        """
+        range_start, range_end = export_range(start_date, end_date)
+        state = normalize_state(state)
+        with db_session:
+            sources = ExportService._sources(range_start)
+
+        written = 0
+        for entity in sources:
+            last_id = 0
+            while True:
+                with db_session:
+                    rows = select(
+                        (a.id, a.user.username, a.user.full_name, a.project.id, a.project.name,
+                         a.project.location.name, a.project.location.postal_code, a.project.location.city,
+                         a.start_date, a.end_date, a.status)
+                        for a in entity
+                        if a.id > last_id and a.start_date < range_end and a.end_date > range_start
+                        and a.status != CANCELLED_STATUS
+                    ).order_by(1).without_distinct()[:EXPORT_BATCH_SIZE]
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+
+                starts = np.maximum(to_epoch([row[8] for row in rows]), to_epoch([range_start])[0])
+                ends = np.minimum(to_epoch([row[9] for row in rows]), to_epoch([range_end])[0])
+                hours = np.round((ends - starts) / 3600, 2)
+                work = np.round(working_hours(starts.astype("datetime64[s]"), ends.astype("datetime64[s]"), state), 2)
+                yield [row + (h, w) for row, h, w in zip(rows, hours.tolist(), work.tolist())]
+
+                written += len(rows)
+                if on_batch:
+                    on_batch(written)
+                if len(rows) < EXPORT_BATCH_SIZE:
+                    break
+
+    @staticmethod
+    def iter_csv(start_date: date, end_date: date, state: Optional[str] = None,
+                 on_batch: Optional[Callable[[int], None]] = None) -> Iterator[bytes]:
+        """CSV als Folge von Byte-Blöcken (ein Block je Stapel)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=EXPORT_CSV_DELIMITER)
+        # BOM, damit Excel die Datei als UTF-8 erkennt
+        buffer.write("\ufeff")
+        writer.writerow(EXPORT_COLUMNS)
+        for batch in ExportService.iter_batches(start_date, end_date, state, on_batch):
+            writer.writerows(
+                row[:8] + (row[8].isoformat(sep=" "), row[9].isoformat(sep=" ")) + row[10:]
+                for row in batch
+            )
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    @staticmethod
+    def write_xlsx(target: IO[bytes], start_date: date, end_date: date, state: Optional[str] = None,
+                   on_batch: Optional[Callable[[int], None]] = None) -> None:
+        """Schreibt die Einsätze als XLSX (openpyxl im Write-only-Modus, konstanter Speicher)"""
+        if Workbook is None:
+            raise ValueError("XLSX-Export nicht verfügbar (openpyxl ist nicht installiert)")
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Einsätze")
+        sheet.append(EXPORT_COLUMNS)
+        for batch in ExportService.iter_batches(start_date, end_date, state, on_batch):
+            for row in batch:
+                sheet.append(row)
+        workbook.save(target)
+
+    @staticmethod
+    def iter_xlsx(start_date: date, end_date: date, state: Optional[str] = None) -> Iterator[bytes]:
+        """XLSX in Blöcken; die Datei entsteht in einer temporären Datei (ab 8 MB auf der Platte)"""
+        with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as target:
+            ExportService.write_xlsx(target, start_date, end_date, state)
+            target.seek(0)
+            while chunk := target.read(64 * 1024):
+                yield chunk
+
+    @staticmethod
+    def write_file(path: str, start_date: date, end_date: date, export_format: str,
+                   state: Optional[str] = None, on_batch: Optional[Callable[[int], None]] = None) -> None:
+        """Schreibt den Export im gewünschten Format in eine Datei"""
+        with open(path, "wb") as target:
+            if export_format == "xlsx":
+                ExportService.write_xlsx(target, start_date, end_date, state, on_batch)
+            else:
+                for chunk in ExportService.iter_csv(start_date, end_date, state, on_batch):
+                    target.write(chunk)
+
+
+def job_export_path(job_id: int, export_format: str) -> str:
+    return os.path.join(EXPORT_DIR, f"job_{job_id}.{export_format}")
+
+
+def prune_exports(keep: int = EXPORT_KEEP) -> None:
+    """Behält die neuesten keep Exportdateien und entfernt verwaiste halbfertige Dateien"""
+    now = time.time()
+    finished = []
+    for entry in os.scandir(EXPORT_DIR):
+        if not entry.name.startswith("job_"):
+            continue
+        modified = entry.stat().st_mtime
+        if entry.name.endswith(".part"):
+            if now - modified > EXPORT_PART_MAX_AGE_SECONDS:
+                _remove(entry.path)
+        else:
+            finished.append((modified, entry.path))
+    finished.sort()
+    for _, path in finished[:max(0, len(finished) - keep)]:
+        _remove(path)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def assignment_export_job(job) -> dict:
+    """Job-Funktion: Einsatz-Export in eine Datei (Parameter start_date, end_date, format, state)"""
+    params = job.params
+    start_date = date.fromisoformat(params["start_date"])
+    end_date = date.fromisoformat(params["end_date"])
+    export_format = params.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError("Unbekanntes Exportformat")
+
+    total = ExportService.count_assignments(start_date, end_date)
+    job.progress(0, f"{total} Einsätze werden exportiert")
+    written = [0]
+
+    def on_batch(rows: int) -> None:
+        written[0] = rows
+        job.progress(rows / total if total else 1, f"{rows} von {total} Einsätzen")
+
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = job_export_path(job.job_id, export_format)
+    # Erst nach vollständigem Schreiben umbenennen, damit nie eine halbe Datei ausgeliefert wird
+    partial = path + ".part"
+    try:
+        ExportService.write_file(partial, start_date, end_date, export_format, params.get("state"), on_batch)
+        os.replace(partial, path)
+    except BaseException:
+        _remove(partial)
+        raise
+    prune_exports()
+    return {
+        "rows": written[0],
+        "format": export_format,
+        "filename": export_filename(start_date, end_date, export_format),
+    }
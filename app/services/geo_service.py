@@ -0,0 +1,258 @@
+import csv
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select, commit, count
+
+from app.cache import cache
+from app.models import entities
+from app.models import schemas
+from app.services.schedule_service import ScheduleService, schedule_snapshot
+
+# Tabelle der Postleitzahl-Zentren (Präfix -> Koordinaten), ohne Netzwerkzugriff.
+# Die mitgelieferte Tabelle enthält die Leitregionen (zweistellige Präfixe); eine
+# feinere Tabelle im selben Format wird über den längsten Präfix automatisch genutzt.
+POSTAL_CODE_TABLE = os.getenv(
+    "POSTAL_CODE_TABLE",
+    os.path.join(os.path.dirname(__file__), "..", "data", "plz_regions.csv")
+)
+EARTH_RADIUS_KM = 6371.0
+GEO_CACHE_NAMESPACE = "geo"
+
+
+class PostalCodeTable:
+    """Zentren von Postleitzahlgebieten mit Suche über den längsten Präfix"""
+
+    def __init__(self, path: str):
+        self.centroids: Dict[str, Tuple[float, float]] = {}
+        with open(path, encoding="utf-8") as table_file:
+            for row in csv.DictReader(table_file):
+                self.centroids[row["prefix"]] = (float(row["latitude"]), float(row["longitude"]))
+        self.prefix_lengths = sorted({len(prefix) for prefix in self.centroids}, reverse=True)
+
+    def lookup(self, postal_code: Optional[str]) -> Optional[Tuple[float, float]]:
+        postal_code = (postal_code or "").strip()
+        for length in self.prefix_lengths:
+            centroid = self.centroids.get(postal_code[:length])
+            if centroid is not None and len(postal_code) >= length:
+                return centroid
+        return None
+
+    def radians(self, postal_codes: List[Optional[str]]) -> np.ndarray:
+        """Koordinaten in Bogenmaß als (n, 2)-Array, NaN für unbekannte Postleitzahlen"""
+        coords = [self.lookup(code) or (np.nan, np.nan) for code in postal_codes]
+        return np.radians(np.array(coords, dtype=np.float64).reshape(-1, 2))
+
+
+def haversine_km(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Großkreisentfernungen zwischen allen Punkten aus a (n, 2) und b (m, 2) in km"""
+    lat1, lon1 = a[:, 0:1], a[:, 1:2]
+    lat2, lon2 = b[:, 0], b[:, 1]
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))).astype(np.float32)
+
+
+class GeoIndex:
+    """Vorberechnete Entfernungsmatrizen zwischen Einsatzorten und Wohnorten.
+
+    Die Matrizen (float32) wachsen mit Reserve, neue Einsatzorte und Wohnorte
+    werden als einzelne Zeile/Spalte ergänzt. Abfragen für ein Paar sind reine
+    Array-Zugriffe. Über die Version des Cache-Namensraums erkennt jeder Worker
+    Änderungen anderer Worker und baut den Index dann neu auf.
+    """
+
+    def __init__(self, table: PostalCodeTable):
+        self.table = table
+        self.version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._reset(0, 0)
+
+    def _reset(self, location_capacity: int, user_capacity: int):
+        self.location_rows: Dict[int, int] = {}
+        self.user_rows: Dict[int, int] = {}
+        self.location_coords = np.full((location_capacity, 2), np.nan)
+        self.user_coords = np.full((user_capacity, 2), np.nan)
+        self.location_matrix = np.full((location_capacity, location_capacity), np.nan, dtype=np.float32)
+        self.user_matrix = np.full((user_capacity, location_capacity), np.nan, dtype=np.float32)
+
+    def build(self, version: int) -> None:
+        """Baut den Index vollständig aus der Datenbank auf"""
+        with db_session:
+            locations = list(select((l.id, l.postal_code) for l in entities.Location))
+            users = list(select((u.id, u.home_postal_code) for u in entities.User
+                                if u.home_postal_code is not None and u.home_postal_code != ""))
+
+        with self._lock:
+            self._reset(max(16, 2 * len(locations)), max(16, 2 * len(users)))
+            for row, (location_id, _) in enumerate(locations):
+                self.location_rows[location_id] = row
+            for row, (user_id, _) in enumerate(users):
+                self.user_rows[user_id] = row
+
+            location_coords = self.table.radians([code for _, code in locations])
+            user_coords = self.table.radians([code for _, code in users])
+            self.location_coords[:len(locations)] = location_coords
+            self.user_coords[:len(users)] = user_coords
+            self.location_matrix[:len(locations), :len(locations)] = haversine_km(location_coords, location_coords)
+            self.user_matrix[:len(users), :len(locations)] = haversine_km(user_coords, location_coords)
+            self.version = version
+
+    def sync(self) -> "GeoIndex":
+        """Stellt sicher, dass der Index dem Stand aller Worker entspricht"""
+        version = cache.version(GEO_CACHE_NAMESPACE)
+        if version != self.version:
+            self.build(version)
+        return self
+
+    def _grow(self, locations: int, users: int) -> None:
+        location_capacity = len(self.location_coords)
+        user_capacity = len(self.user_coords)
+        if locations <= location_capacity and users <= user_capacity:
+            return
+        new_location_capacity = max(location_capacity, 2 * locations)
+        new_user_capacity = max(user_capacity, 2 * users)
+
+        location_coords, user_coords = self.location_coords, self.user_coords
+        location_matrix, user_matrix = self.location_matrix, self.user_matrix
+        location_rows, user_rows = self.location_rows, self.user_rows
+        self._reset(new_location_capacity, new_user_capacity)
+        self.location_rows, self.user_rows = location_rows, user_rows
+        self.location_coords[:location_capacity] = location_coords
+        self.user_coords[:user_capacity] = user_coords
+        self.location_matrix[:location_capacity, :location_capacity] = location_matrix
+        self.user_matrix[:user_capacity, :location_capacity] = user_matrix
+
+    def _set_location(self, location_id: int, postal_code: str) -> None:
+        row = self.location_rows.get(location_id)
+        if row is None:
+            row = len(self.location_rows)
+            self._grow(row + 1, len(self.user_rows))
+            self.location_rows[location_id] = row
+        self.location_coords[row] = self.table.radians([postal_code])[0]
+        distances = haversine_km(self.location_coords[row:row + 1], self.location_coords)[0]
+        self.location_matrix[row, :] = distances
+        self.location_matrix[:, row] = distances
+        self.user_matrix[:, row] = haversine_km(self.user_coords, self.location_coords[row:row + 1])[:, 0]
+
+    def _set_user(self, user_id: int, postal_code: Optional[str]) -> None:
+        row = self.user_rows.get(user_id)
+        if row is None:
+            row = len(self.user_rows)
+            self._grow(len(self.location_rows), row + 1)
+            self.user_rows[user_id] = row
+        self.user_coords[row] = self.table.radians([postal_code])[0]
+        self.user_matrix[row, :] = haversine_km(self.user_coords[row:row + 1], self.location_coords)[0]
+
+    def _apply(self, update, *args) -> None:
+        """Übernimmt eine lokale Änderung (nach dem Commit) inkrementell"""
+        new_version = cache.invalidate(GEO_CACHE_NAMESPACE)
+        with self._lock:
+            # Nur inkrementell fortschreiben, wenn zwischenzeitlich kein anderer Worker geändert hat
+            if self.version is not None and new_version == self.version + 1:
+                update(*args)
+                self.version = new_version
+
+    def location_changed(self, location_id: int, postal_code: str) -> None:
+        self._apply(self._set_location, location_id, postal_code)
+
+    def user_changed(self, user_id: int, postal_code: Optional[str]) -> None:
+        self._apply(self._set_user, user_id, postal_code)
+
+    def location_distance_km(self, location_a: int, location_b: int) -> Optional[float]:
+        """Entfernung zwischen zwei Einsatzorten"""
+        row, column = self.location_rows.get(location_a), self.location_rows.get(location_b)
+        if row is None or column is None:
+            return None
+        distance = self.location_matrix[row, column]
+        return None if np.isnan(distance) else float(distance)
+
+    def user_distance_km(self, user_id: int, location_id: int) -> Optional[float]:
+        """Entfernung vom Wohnort eines Benutzers zu einem Einsatzort"""
+        row, column = self.user_rows.get(user_id), self.location_rows.get(location_id)
+        if row is None or column is None:
+            return None
+        distance = self.user_matrix[row, column]
+        return None if np.isnan(distance) else float(distance)
+
+    def nearest_users(self, location_id: int, user_ids: List[int], limit: int) -> List[Tuple[int, float]]:
+        """Die nächstgelegenen Benutzer aus user_ids zu einem Einsatzort"""
+        column = self.location_rows.get(location_id)
+        candidates = np.array([user_id for user_id in user_ids if user_id in self.user_rows], dtype=np.int64)
+        if column is None or not len(candidates):
+            return []
+
+        distances = self.user_matrix[[self.user_rows[user_id] for user_id in candidates.tolist()], column]
+        known = ~np.isnan(distances)
+        candidates, distances = candidates[known], distances[known]
+        if len(distances) > limit:
+            nearest = np.argpartition(distances, limit)[:limit]
+            candidates, distances = candidates[nearest], distances[nearest]
+        order = np.argsort(distances, kind="stable")
+        return list(zip(candidates[order].tolist(), distances[order].tolist()))
+
+
+geo_index = GeoIndex(PostalCodeTable(POSTAL_CODE_TABLE))
+
+
+class GeoService:
+    @staticmethod
+    def create_location(location_data: schemas.LocationCreate) -> schemas.LocationResponse:
+        """Legt einen Einsatzort an und ergänzt die Entfernungsmatrix"""
+        with db_session:
+            location = entities.Location(**location_data.model_dump())
+            location.flush()
+            response = schemas.LocationResponse.model_validate(location)
+            commit()
+
+        geo_index.location_changed(response.id, response.postal_code)
+        return response
+
+    @staticmethod
+    def get_nearest_eligible_users(
+        project_id: int,
+        limit: int = 10,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> Optional[List[schemas.NearestUserResponse]]:
+        """Aktive Benutzer mit allen geforderten Fähigkeiten, sortiert nach Anfahrtsentfernung.
+
+        Mit start/end nur Benutzer, die im ganzen Zeitraum verfügbar und nicht eingeplant sind.
+        """
+        if start is not None:
+            ScheduleService.check_range(start, end)
+        index = geo_index.sync()
+        with db_session:
+            project = entities.Project.get(id=project_id)
+            if not project:
+                return None
+
+            location_id = project.location.id
+            required_skill_ids = list(select(s.id for s in project.required_skills))
+            if required_skill_ids:
+                required_count = len(required_skill_ids)
+                user_ids = [
+                    user_id for user_id, skill_count in select(
+                        (u.id, count(s)) for u in entities.User for s in u.skills
+                        if u.is_active and s.id in required_skill_ids
+                    )
+                    if skill_count == required_count
+                ]
+            else:
+                user_ids = list(select(u.id for u in entities.User if u.is_active))
+            if start is not None:
+                user_ids = schedule_snapshot.sync().free_users(start, end, user_ids).tolist()
+
+            nearest = index.nearest_users(location_id, user_ids, limit)
+            nearest_ids = [user_id for user_id, _ in nearest]
+            users = {u.id: u for u in entities.User.select(lambda u: u.id in nearest_ids)}
+            return [
+                schemas.NearestUserResponse(
+                    username=users[user_id].username,
+                    full_name=users[user_id].full_name,
+                    distance_km=round(distance, 1)
+                )
+                for user_id, distance in nearest
+            ]
@@ -0,0 +1,141 @@
+import os
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+# Feiertags-Konfiguration
+# HOLIDAY_STATE: Kürzel des Bundeslands (z.B. "BY"), leer = nur bundesweite Feiertage
+HOLIDAY_STATE = os.getenv("HOLIDAY_STATE", "").upper()
+WORKDAY_START_HOUR = float(os.getenv("WORKDAY_START_HOUR", 8))
+WORKDAY_END_HOUR = float(os.getenv("WORKDAY_END_HOUR", 16))
+# Jahre, für die der Arbeitstagekalender vorberechnet wird (außerhalb zählen nur Wochenenden)
+CALENDAR_FIRST_YEAR = 1970
+CALENDAR_LAST_YEAR = 2100
+
+STATES = (
+    "BW", "BY", "BE", "BB", "HB", "HH", "HE", "MV",
+    "NI", "NW", "RP", "SL", "SN", "ST", "SH", "TH",
+)
+
+# Feste Feiertage (Monat, Tag, Name, Bundesländer; None = bundesweit, erstes Jahr)
+FIXED_HOLIDAYS = (
+    (1, 1, "Neujahr", None, 1900),
+    (1, 6, "Heilige Drei Könige", ("BW", "BY", "ST"), 1900),
+    (3, 8, "Internationaler Frauentag", ("BE",), 2019),
+    (3, 8, "Internationaler Frauentag", ("MV",), 2023),
+    (5, 1, "Tag der Arbeit", None, 1900),
+    (8, 15, "Mariä Himmelfahrt", ("SL",), 1900),
+    (9, 20, "Weltkindertag", ("TH",), 2019),
+    (10, 3, "Tag der Deutschen Einheit", None, 1990),
+    (10, 31, "Reformationstag", ("BB", "MV", "SN", "ST", "TH"), 1990),
+    (10, 31, "Reformationstag", ("HB", "HH", "NI", "SH"), 2018),
+    (11, 1, "Allerheiligen", ("BW", "BY", "NW", "RP", "SL"), 1900),
+    (12, 25, "1. Weihnachtstag", None, 1900),
+    (12, 26, "2. Weihnachtstag", None, 1900),
+)
+
+# Bewegliche Feiertage (Abstand zum Ostersonntag in Tagen, Name, Bundesländer)
+EASTER_HOLIDAYS = (
+    (-2, "Karfreitag", None),
+    (0, "Ostersonntag", ("BB",)),
+    (1, "Ostermontag", None),
+    (39, "Christi Himmelfahrt", None),
+    (49, "Pfingstsonntag", ("BB",)),
+    (50, "Pfingstmontag", None),
+    (60, "Fronleichnam", ("BW", "BY", "HE", "NW", "RP", "SL")),
+)
+
+
+def normalize_state(state: Optional[str]) -> str:
+    """Bundeslandkürzel in Großbuchstaben, Standard ist HOLIDAY_STATE"""
+    state = (state if state is not None else HOLIDAY_STATE).strip().upper()
+    if state and state not in STATES:
+        raise ValueError("Unbekanntes Bundesland")
+    return state
+
+
+def easter_sunday(year: int) -> date:
+    """Ostersonntag nach dem gregorianischen Kalender (anonymer Algorithmus)"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int, state: str = "") -> Dict[date, str]:
+    """Gesetzliche Feiertage eines Jahres im Bundesland (state bereits normalisiert)"""
+    result: Dict[date, str] = {}
+    for month, day, name, states, since in FIXED_HOLIDAYS:
+        if year >= since and (states is None or state in states):
+            result[date(year, month, day)] = name
+
+    easter = easter_sunday(year)
+    for offset, name, states in EASTER_HOLIDAYS:
+        if states is None or state in states:
+            result[easter + timedelta(days=offset)] = name
+
+    if year == 2017:
+        # 500 Jahre Reformation: einmalig bundesweit
+        result[date(2017, 10, 31)] = "Reformationstag"
+    if state == "SN":
+        # Buß- und Bettag: Mittwoch vor dem 23. November
+        november_22 = date(year, 11, 22)
+        result[november_22 - timedelta(days=(november_22.weekday() - 2) % 7)] = "Buß- und Bettag"
+    return dict(sorted(result.items()))
+
+
+@lru_cache(maxsize=None)
+def month_holidays(year: int, month: int, state: str = "") -> Dict[int, str]:
+    """Feiertage eines Monats als {Tag: Name} für die Kalenderansicht"""
+    return {day.day: name for day, name in holidays(year, state).items() if day.month == month}
+
+
+@lru_cache(maxsize=None)
+def working_calendar(state: str = "") -> np.busdaycalendar:
+    """Arbeitstage (Mo-Fr ohne Feiertage) für alle vorberechneten Jahre"""
+    days = [day for year in range(CALENDAR_FIRST_YEAR, CALENDAR_LAST_YEAR + 1) for day in holidays(year, state)]
+    return np.busdaycalendar(weekmask="1111100", holidays=np.array(days, dtype="datetime64[D]"))
+
+
+def _workday_window() -> Tuple[np.timedelta64, np.timedelta64]:
+    return (
+        np.timedelta64(int(WORKDAY_START_HOUR * 3600), "s"),
+        np.timedelta64(int(WORKDAY_END_HOUR * 3600), "s"),
+    )
+
+
+def working_hours(starts, ends, state: Optional[str] = None) -> np.ndarray:
+    """Arbeitsstunden zwischen starts[i] und ends[i] (vektorisiert).
+
+    Gezählt wird die Überschneidung mit der täglichen Arbeitszeit
+    (WORKDAY_START_HOUR bis WORKDAY_END_HOUR) an Arbeitstagen des Bundeslands.
+    Angeschnittene Tage am Rand werden einzeln berechnet, die vollen Tage
+    dazwischen über np.busday_count.
+    """
+    calendar = working_calendar(normalize_state(state))
+    window_start, window_end = _workday_window()
+
+    t1 = np.asarray(starts, dtype="datetime64[s]")
+    t2 = np.maximum(np.asarray(ends, dtype="datetime64[s]"), t1)
+    first_day = t1.astype("datetime64[D]")
+    last_day = t2.astype("datetime64[D]")
+
+    def overlap(day: np.ndarray) -> np.ndarray:
+        base = day.astype("datetime64[s]")
+        seconds = (np.minimum(t2, base + window_end) - np.maximum(t1, base + window_start)).astype(np.int64)
+        return np.where(np.is_busday(day, busdaycal=calendar), np.maximum(seconds, 0), 0)
+
+    seconds = overlap(first_day) + np.where(last_day > first_day, overlap(last_day), 0)
+    full_days = np.busday_count(first_day + 1, np.maximum(last_day, first_day + 1), busdaycal=calendar)
+    seconds = seconds + full_days * (window_end - window_start).astype(np.int64)
+    return seconds / 3600
@@ -0,0 +1,274 @@
+import asyncio
+import importlib
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pony.orm import db_session, select, commit, OptimisticCheckError, UnrepeatableReadError
+
+from app.models import entities
+from app.models import schemas
+
+# Job-Konfiguration
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", 1))  # gleichzeitige Aufträge je Web-Worker, 0 = keine
+JOB_PROCESSES = int(os.getenv("JOB_PROCESSES", 1))  # Prozesse im Pool je Web-Worker
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 60))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 3))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 2))
+
+JOB_QUEUED = "wartend"
+JOB_RUNNING = "läuft"
+JOB_DONE = "fertig"
+JOB_FAILED = "fehlgeschlagen"
+
+# Auftragsarten -> Job-Funktion ("modul:funktion"), wird erst im Pool-Prozess importiert
+JOB_KINDS: Dict[str, str] = {
+    "utilization_report": "app.services.utilization_service:utilization_report_job",
+    "rebuild_rollups": "app.services.utilization_service:rebuild_rollups_job",
+    "rebuild_occupancy": "app.services.occupancy_service:rebuild_occupancy_job",
+    "archive": "app.services.archive_service:archive_job",
+    "assignment_export": "app.services.export_service:assignment_export_job",
+}
+
+
+class JobContext:
+    """Wird an Job-Funktionen übergeben: Parameter, Auftraggeber und Fortschrittsmeldung"""
+
+    # Mindestabstand zwischen zwei Fortschrittsmeldungen in der Datenbank
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, job_id: int, token: str, username: str, params: Dict[str, Any]):
+        self.job_id = job_id
+        self.token = token
+        self.username = username
+        self.params = params
+        self._last_progress = 0.0
+
+    def progress(self, fraction: float, message: Optional[str] = None) -> None:
+        """Meldet den Fortschritt (0..1) und verlängert dabei das Lease"""
+        now = time.monotonic()
+        if fraction < 1 and now - self._last_progress < self.PROGRESS_INTERVAL:
+            return
+        self._last_progress = now
+        with db_session:
+            job = entities.Job.get(id=self.job_id)
+            if job and job.lease_token == self.token:
+                job.progress = max(0.0, min(1.0, fraction))
+                if message is not None:
+                    job.message = message
+                job.lease_expires_at = datetime.now() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+def resolve_job(kind: str) -> Callable[[JobContext], Any]:
+    module_name, function_name = JOB_KINDS[kind].split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+
+def _init_process() -> None:
+    """Initialisiert einen Pool-Prozess (eigene Datenbankverbindung)"""
+    from app.database import init_database
+    init_database(debug=os.getenv("DEBUG", "True").lower() in ("true", "1", "t"))
+
+
+def _finish(job_id: int, token: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+    """Schließt einen Auftrag ab, sofern das Lease noch diesem Lauf gehört"""
+    with db_session:
+        job = entities.Job.get(id=job_id)
+        if not job or job.lease_token != token:
+            return
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.now()
+        job.lease_token = None
+        job.lease_expires_at = None
+        if status == JOB_DONE:
+            job.progress = 1.0
+
+
+def execute_job(job_id: int, token: str) -> None:
+    """Führt einen übernommenen Auftrag aus (im Pool-Prozess)"""
+    with db_session:
+        job = entities.Job[job_id]
+        context = JobContext(job_id, token, job.user.username, dict(job.params))
+        kind = job.kind
+
+    try:
+        result = resolve_job(kind)(context)
+    except Exception as e:
+        _finish(job_id, token, JOB_FAILED, error=f"{type(e).__name__}: {e}")
+    else:
+        _finish(job_id, token, JOB_DONE, result=result)
+
+
+class JobService:
+    @staticmethod
+    def _to_response(job: entities.Job) -> schemas.JobResponse:
+        return schemas.JobResponse(
+            id=job.id,
+            kind=job.kind,
+            status=job.status,
+            progress=job.progress,
+            message=job.message,
+            result=job.result,
+            error=job.error,
+            created_at=job.created_at,
+            started_at=job.started_at,
+            finished_at=job.finished_at
+        )
+
+    @staticmethod
+    @db_session
+    def enqueue(username: str, job_data: schemas.JobCreate) -> schemas.JobResponse:
+        """Legt einen Auftrag in die Warteschlange"""
+        if job_data.kind not in JOB_KINDS:
+            raise ValueError("Unbekannte Auftragsart")
+
+        user = entities.User.get(username=username)
+        if not user:
+            raise ValueError("Benutzer nicht gefunden")
+
+        job = entities.Job(kind=job_data.kind, params=job_data.params, user=user)
+        job.flush()
+        response = JobService._to_response(job)
+        commit()
+        job_runner.notify()
+        return response
+
+    @staticmethod
+    @db_session
+    def get_job(job_id: int, username: str) -> Optional[schemas.JobResponse]:
+        """Holt einen Auftrag des Benutzers"""
+        job = entities.Job.get(id=job_id)
+        if not job or job.user.username != username:
+            return None
+        return JobService._to_response(job)
+
+    @staticmethod
+    def claim_next() -> Optional[Tuple[int, str]]:
+        """Übernimmt den ältesten wartenden Auftrag oder einen mit abgelaufenem Lease"""
+        token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        try:
+            with db_session:
+                now = datetime.now()
+                job = select(
+                    j for j in entities.Job
+                    if j.status == JOB_QUEUED or (j.status == JOB_RUNNING and j.lease_expires_at < now)
+                ).order_by(entities.Job.id).for_update(skip_locked=True).first()
+                if job is None:
+                    return None
+                # Gelesene Attribute prüft Pony beim Schreiben (optimistische Sperre)
+                if job.status == JOB_RUNNING and job.lease_token:
+                    print(f"Auftrag {job.id} wird nach abgelaufenem Lease erneut ausgeführt")
+
+                if job.attempts >= JOB_MAX_ATTEMPTS:
+                    job.status = JOB_FAILED
+                    job.error = f"Abgebrochen nach {job.attempts} Versuchen"
+                    job.finished_at = now
+                    job.lease_token = None
+                    job.lease_expires_at = None
+                    return None
+
+                job.status = JOB_RUNNING
+                job.attempts += 1
+                job.lease_token = token
+                job.lease_expires_at = now + timedelta(seconds=JOB_LEASE_SECONDS)
+                job.started_at = now
+                return job.id, token
+        except (OptimisticCheckError, UnrepeatableReadError):
+            # Ein anderer Worker war schneller (SQLite kennt kein SKIP LOCKED)
+            return None
+
+    @staticmethod
+    @db_session
+    def renew_lease(job_id: int, token: str) -> None:
+        job = entities.Job.get(id=job_id)
+        if job and job.lease_token == token:
+            job.lease_expires_at = datetime.now() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+class JobRunner:
+    """Arbeitet die Warteschlange im Event-Loop eines Web-Workers ab.
+
+    Die Aufträge selbst laufen in einem Prozess-Pool (spawn), damit rechenintensive
+    Arbeit den Web-Worker nicht blockiert. Der Runner verlängert die Leases,
+    solange ein Auftrag läuft.
+    """
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, processes: int = JOB_PROCESSES):
+        self.concurrency = concurrency
+        self.processes = processes
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process
+        )
+
+    def notify(self) -> None:
+        """Weckt den Runner nach dem Einstellen eines Auftrags (threadsicher)"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        slots = asyncio.Semaphore(self.concurrency)
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    claimed = await asyncio.to_thread(JobService.claim_next)
+                except Exception as e:
+                    print(f"Fehler beim Übernehmen eines Auftrags: {e}")
+                    claimed = None
+
+                if claimed is None:
+                    slots.release()
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), JOB_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                task = asyncio.create_task(self._run_job(*claimed))
+                task.add_done_callback(lambda _: slots.release())
+        finally:
+            self._loop = None
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
+
+    async def _run_job(self, job_id: int, token: str) -> None:
+        if self.pool is None:
+            self.pool = self._create_pool()
+        future = asyncio.get_running_loop().run_in_executor(self.pool, execute_job, job_id, token)
+
+        # Heartbeat: Lease verlängern, solange der Pool-Prozess arbeitet
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=JOB_LEASE_SECONDS / 3)
+            if done:
+                break
+            await asyncio.to_thread(JobService.renew_lease, job_id, token)
+
+        try:
+            future.result()
+        except BrokenProcessPool as e:
+            self.pool = None
+            await asyncio.to_thread(_finish, job_id, token, JOB_FAILED, None, f"Prozess abgebrochen: {e}")
+        except Exception as e:
+            await asyncio.to_thread(_finish, job_id, token, JOB_FAILED, None, f"{type(e).__name__}: {e}")
+
+
+job_runner = JobRunner()
@@ -0,0 +1,207 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select
+
+from app.database import db
+from app.models import entities
+from app.models import schemas
+from app.replica import read_entities
+from app.services.archive_service import archive_horizon, reaches_archive
+from app.services.utilization_service import CANCELLED_STATUS, month_start, next_month, to_epoch
+
+# Aufbau der Bitmaps (siehe entities.OccupancySlots)
+SLOT_MINUTES = 15
+SLOT_SECONDS = SLOT_MINUTES * 60
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+MONTH_SLOTS = 31 * SLOTS_PER_DAY
+OCCUPANCY_KINDS = ("availability", "assignments")
+
+Intervals = List[Tuple[datetime, datetime]]
+
+
+def slot_bitmap(month: datetime, intervals: Intervals) -> np.ndarray:
+    """Markiert alle Slots des Monats, die ein Intervall berührt (bool-Array mit MONTH_SLOTS Einträgen)"""
+    marks = np.zeros(MONTH_SLOTS + 1, dtype=np.int32)
+    if intervals:
+        month_end = ((next_month(month) - month).days) * SLOTS_PER_DAY
+        origin = to_epoch([month])[0]
+        starts, ends = zip(*intervals)
+        first = np.clip((to_epoch(starts) - origin) // SLOT_SECONDS, 0, month_end)
+        last = np.clip(-((origin - to_epoch(ends)) // SLOT_SECONDS), 0, month_end)  # aufgerundet
+        np.add.at(marks, first, 1)
+        np.add.at(marks, last, -1)
+    return np.cumsum(marks[:-1]) > 0
+
+
+def pack_slots(bits: np.ndarray) -> bytes:
+    return np.packbits(bits).tobytes()
+
+
+def unpack_slots(data: bytes) -> np.ndarray:
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8))[:MONTH_SLOTS].astype(bool)
+
+
+class OccupancyService:
+    @staticmethod
+    def _intervals(user_id: int, month: datetime, following: datetime) -> Tuple[Intervals, Intervals]:
+        """Verfügbarkeiten und nicht stornierte Einsätze des Benutzers, die den Monat berühren"""
+        horizon = archive_horizon.sync()
+        availability_sources = [entities.Availability]
+        if reaches_archive(horizon.availability, month):
+            availability_sources.append(entities.ArchivedAvailability)
+        assignment_sources = [entities.Assignment]
+        if reaches_archive(horizon.assignment, month):
+            assignment_sources.append(entities.ArchivedAssignment)
+
+        availability = [row for entity in availability_sources for row in select(
+            (a.start_time, a.end_time) for a in entity
+            if a.user.id == user_id and a.start_time < following and a.end_time > month
+        ).without_distinct()]
+        assignments = [row for entity in assignment_sources for row in select(
+            (a.start_date, a.end_date) for a in entity
+            if a.user.id == user_id and a.start_date < following and a.end_date > month
+            and a.status != CANCELLED_STATUS
+        ).without_distinct()]
+        return availability, assignments
+
+    @staticmethod
+    def _store(user_id: int, year: int, month: int, availability: bytes, assignments: bytes) -> None:
+        db.execute("""
+            INSERT INTO occupancy_slots (user_id, year, month, availability, assignments)
+            VALUES ($user_id, $year, $month, $availability, $assignments)
+            ON CONFLICT (user_id, year, month) DO UPDATE SET
+                availability = excluded.availability,
+                assignments = excluded.assignments
+        """)
+
+    @staticmethod
+    def refresh(user_id: int, start: datetime, end: datetime) -> None:
+        """Berechnet die Bitmaps aller vom Zeitraum berührten Monate neu.
+
+        Wird von den Schreibpfaden innerhalb ihrer db_session nach der Änderung
+        aufgerufen. Leer gewordene Monate behalten eine Zeile mit leeren Bitmaps,
+        damit may_overlap sie von noch nicht berechneten Monaten unterscheiden kann.
+        """
+        month = month_start(start)
+        while month < end:
+            following = next_month(month)
+            availability, assignments = OccupancyService._intervals(user_id, month, following)
+            OccupancyService._store(
+                user_id, month.year, month.month,
+                pack_slots(slot_bitmap(month, availability)),
+                pack_slots(slot_bitmap(month, assignments))
+            )
+            month = following
+
+    @staticmethod
+    def may_overlap(user_id: int, start: datetime, end: datetime, kind: str = "availability") -> bool:
+        """Schneller Vorabtest für Konfliktprüfungen (innerhalb der db_session).
+
+        False heißt sicher keine Überschneidung und setzt für jeden berührten
+        Monat eine Bitmap voraus. Fehlt eine (vor der ersten Berechnung oder ohne
+        Belegung in dem Monat), ist das Ergebnis unbekannt und wie bei einem
+        belegten Slot True; dann muss die genaue Abfrage klären, ob sich die
+        Zeiten tatsächlich überschneiden.
+        """
+        month = month_start(start)
+        while month < end:
+            row = select(
+                (o.availability, o.assignments) for o in entities.OccupancySlots
+                if o.user.id == user_id and o.year == month.year and o.month == month.month
+            ).first()
+            if row is None:
+                return True
+            occupied = unpack_slots(row[OCCUPANCY_KINDS.index(kind)])
+            if np.any(occupied & slot_bitmap(month, [(start, end)])):
+                return True
+            month = next_month(month)
+        return False
+
+    @staticmethod
+    @db_session
+    def rebuild() -> None:
+        """Berechnet alle Bitmaps neu aus den Rohdaten (Erstbefüllung oder Reparatur)"""
+        rows = []
+        for entity in (entities.Availability, entities.ArchivedAvailability):
+            rows.extend((0, *row) for row in select(
+                (a.user.id, a.start_time, a.end_time) for a in entity
+            ).without_distinct())
+        for entity in (entities.Assignment, entities.ArchivedAssignment):
+            rows.extend((1, *row) for row in select(
+                (a.user.id, a.start_date, a.end_date) for a in entity if a.status != CANCELLED_STATUS
+            ).without_distinct())
+
+        per_month: Dict[Tuple[int, datetime], Tuple[Intervals, Intervals]] = {}
+        for column, user_id, start, end in rows:
+            month = month_start(start)
+            while month < end:
+                per_month.setdefault((user_id, month), ([], []))[column].append((start, end))
+                month = next_month(month)
+
+        db.execute("DELETE FROM occupancy_slots")
+        for (user_id, month), (availability, assignments) in per_month.items():
+            OccupancyService._store(
+                user_id, month.year, month.month,
+                pack_slots(slot_bitmap(month, availability)),
+                pack_slots(slot_bitmap(month, assignments))
+            )
+
+    @staticmethod
+    @db_session
+    def get_heatmap(
+        year: int,
+        month: int,
+        kind: str = "assignments",
+        usernames: Optional[List[str]] = None,
+        project_id: Optional[int] = None,
+        viewer: Optional[str] = None
+    ) -> schemas.OccupancyHeatmap:
+        """Anzahl belegter Benutzer je 15-Minuten-Slot eines Monats.
+
+        Das Team sind die angegebenen Benutzer und/oder alle Benutzer mit
+        Einsätzen im Projekt, ohne Angabe alle Benutzer. Gelesen wird im Namen
+        von viewer (Lesereplikat außerhalb des Sticky-Fensters).
+        """
+        if kind not in OCCUPANCY_KINDS:
+            raise ValueError("Unbekannte Belegungsart")
+        if not (1 <= month <= 12 and 1900 <= year <= 2100):
+            raise ValueError("Ungültiges Datum")
+
+        source = read_entities(viewer)
+        query = select(o for o in source.OccupancySlots if o.year == year and o.month == month)
+        if usernames or project_id is not None:
+            team = set(select(u.id for u in source.User if u.username in (usernames or [])))
+            if project_id is not None:
+                team.update(select(a.user.id for a in source.Assignment if a.project.id == project_id))
+            team_ids = list(team)
+            team_size = len(team_ids)
+            query = query.filter(lambda o: o.user.id in team_ids)
+        else:
+            team_size = source.User.select().count()
+
+        column = 0 if kind == "availability" else 1
+        blobs = [row[column] for row in select((o.availability, o.assignments) for o in query).without_distinct()]
+        days = (next_month(datetime(year, month, 1)) - datetime(year, month, 1)).days
+        if blobs:
+            # Popcount je Slot über alle Benutzer des Teams
+            bits = np.unpackbits(np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), -1), axis=1)
+            counts = bits[:, :MONTH_SLOTS].sum(axis=0, dtype=np.int32)
+        else:
+            counts = np.zeros(MONTH_SLOTS, dtype=np.int32)
+
+        return schemas.OccupancyHeatmap(
+            year=year,
+            month=month,
+            kind=kind,
+            slot_minutes=SLOT_MINUTES,
+            users=team_size,
+            counts=counts[:days * SLOTS_PER_DAY].reshape(days, SLOTS_PER_DAY).tolist()
+        )
+
+
+def rebuild_occupancy_job(job) -> None:
+    """Job-Funktion: Belegungs-Bitmaps neu berechnen (siehe JobService)"""
+    job.progress(0, "Belegung wird neu berechnet")
+    OccupancyService.rebuild()
@@ -0,0 +1,383 @@
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select
+
+from app.cache import cache
+from app.database import db
+from app.models import entities
+from app.models import schemas
+from app.services.archive_service import ARCHIVE_CACHE_NAMESPACE, archive_horizon, reaches_archive
+from app.services.utilization_service import CANCELLED_STATUS, to_epoch
+
+SCHEDULE_CACHE_NAMESPACE = "schedule"
+# Zeilen je fetchmany beim Aufbau (begrenzt den Zwischenspeicher der Python-Tupel)
+SCHEDULE_FETCH_SIZE = int(os.getenv("SCHEDULE_FETCH_SIZE", 100000))
+# Mehr Änderungen seit dem letzten Stand werden nicht nachgespielt, sondern neu aufgebaut
+SCHEDULE_MAX_REPLAY = int(os.getenv("SCHEDULE_MAX_REPLAY", 1000))
+# Projekt-Spalte der Verfügbarkeiten
+NO_PROJECT = -1
+EPOCH = datetime(1970, 1, 1)
+
+# Epoch-Sekunden direkt in der Datenbank berechnen, ohne datetime-Objekte je Zeile
+SNAPSHOT_QUERIES = {
+    "sqlite": (
+        """SELECT id, "user", -1, CAST(strftime('%s', start_time) AS INTEGER),
+                  CAST(strftime('%s', end_time) AS INTEGER)
+           FROM "Availability" ORDER BY id""",
+        f"""SELECT id, "user", project, CAST(strftime('%s', start_date) AS INTEGER),
+                   CAST(strftime('%s', end_date) AS INTEGER)
+            FROM "Assignment" WHERE status != '{CANCELLED_STATUS}' ORDER BY id""",
+    ),
+    "postgres": (
+        """SELECT id, "user", -1, FLOOR(EXTRACT(EPOCH FROM start_time))::bigint,
+                  FLOOR(EXTRACT(EPOCH FROM end_time))::bigint
+           FROM "availability" ORDER BY id""",
+        f"""SELECT id, "user", project, FLOOR(EXTRACT(EPOCH FROM start_date))::bigint,
+                   FLOOR(EXTRACT(EPOCH FROM end_date))::bigint
+            FROM "assignment" WHERE status != '{CANCELLED_STATUS}' ORDER BY id""",
+    ),
+}
+
+
+def covering_count(starts: np.ndarray, ends: np.ndarray, points: np.ndarray) -> np.ndarray:
+    """Anzahl der halboffenen Intervalle [start, end), die jeden Zeitpunkt enthalten"""
+    return (np.searchsorted(np.sort(starts), points, side="right")
+            - np.searchsorted(np.sort(ends), points, side="right"))
+
+
+class IntervalColumns:
+    """Intervalle als parallele NumPy-Spalten (33 Byte je Intervall).
+
+    Die IDs sind aufsteigend sortiert, Zeilen werden per searchsorted gefunden.
+    Neue Einträge werden hinten angehängt (Reserve wie bei GeoIndex), gelöschte
+    nur als inaktiv markiert und beim nächsten Neuaufbau entfernt.
+    """
+
+    COLUMNS = (("ids", np.int64), ("starts", np.int64), ("ends", np.int64),
+               ("users", np.int32), ("projects", np.int32), ("live", bool))
+
+    def __init__(self, capacity: int = 0):
+        self.size = 0
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+
+    @classmethod
+    def from_cursor(cls, cursor) -> "IntervalColumns":
+        """Liest die Zeilen (id, user, project, start, end) eines nach ID sortierten Cursors"""
+        chunks = []
+        while rows := cursor.fetchmany(SCHEDULE_FETCH_SIZE):
+            chunks.append(np.array(rows, dtype=np.int64).reshape(-1, 5))
+        data = np.concatenate(chunks) if chunks else np.zeros((0, 5), dtype=np.int64)
+
+        columns = cls(max(16, len(data) + len(data) // 8))
+        columns.size = size = len(data)
+        columns.ids[:size] = data[:, 0]
+        columns.users[:size] = data[:, 1]
+        columns.projects[:size] = data[:, 2]
+        columns.starts[:size] = data[:, 3]
+        columns.ends[:size] = data[:, 4]
+        columns.live[:size] = True
+        return columns
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name, _ in self.COLUMNS)
+
+    def _grow(self, size: int) -> None:
+        if size <= len(self.ids):
+            return
+        capacity = max(16, 2 * size)
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def rows(self, ids: List[int]) -> np.ndarray:
+        """Zeilen der vorhandenen IDs"""
+        ids = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids[:self.size], ids)
+        found = positions < self.size
+        found[found] = self.ids[positions[found]] == ids[found]
+        return positions[found]
+
+    def upsert(self, interval_id: int, user_id: int, project_id: int, start: int, end: int) -> None:
+        """Fügt ein Intervall ein oder ersetzt es (aktiv)"""
+        row = self.rows([interval_id])
+        if len(row):
+            row = row[0]
+        else:
+            self._grow(self.size + 1)
+            # IDs kommen fast immer aufsteigend, nur parallele Transaktionen überholen sich
+            row = int(np.searchsorted(self.ids[:self.size], interval_id))
+            if row < self.size:
+                for name, _ in self.COLUMNS:
+                    column = getattr(self, name)
+                    column[row + 1:self.size + 1] = column[row:self.size]
+            self.size += 1
+        self.ids[row], self.users[row], self.projects[row] = interval_id, user_id, project_id
+        self.starts[row], self.ends[row], self.live[row] = start, end, True
+
+    def remove(self, ids: List[int]) -> None:
+        self.live[self.rows(ids)] = False
+
+    def remove_users(self, user_ids: List[int]) -> None:
+        """Markiert alle Intervalle der Benutzer als inaktiv"""
+        self.live[:self.size] &= ~np.isin(self.users[:self.size], np.asarray(user_ids, dtype=np.int32))
+
+    def overlapping(self, start: int, end: int, user_id: Optional[int] = None) -> np.ndarray:
+        """Zeilen aktiver Intervalle, die [start, end) schneiden"""
+        size = self.size
+        mask = self.live[:size] & (self.starts[:size] < end) & (self.ends[:size] > start)
+        if user_id is not None:
+            mask &= self.users[:size] == user_id
+        return np.flatnonzero(mask)
+
+
+class ScheduleSnapshot:
+    """Prozesslokale Kopie aller Verfügbarkeiten und nicht stornierten Einsätze.
+
+    Planungsabfragen (freie Zeiten, freie Benutzer, Besetzung) laufen als
+    Vektoroperationen auf den Spalten statt über Pony-Entitäten. Archivierte
+    Einträge sind nicht enthalten, Abfragen ins Archiv gehen weiter an die
+    Datenbank.
+
+    Die Schreibpfade veröffentlichen ihre Änderungen nach dem Commit im
+    Änderungsprotokoll des Cache-Namensraums, mit absoluten Werten (Zeilen
+    einfügen/ersetzen, IDs entfernen). Das Nachspielen ist dadurch auch über
+    einen Neuaufbau hinweg richtig, der eine Änderung schon enthält. Jeder
+    Worker spielt beim nächsten Zugriff nur die Änderungen seit seiner Version
+    nach. Neu aufgebaut wird nur bei einer Lücke im Protokoll oder nach einer
+    Archivierung, und zwar in einem Hintergrund-Thread, während Abfragen
+    weiter den bisherigen Stand sehen.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.archive_version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self.availabilities = IntervalColumns()
+        self.assignments = IntervalColumns()
+
+    def build(self, version: int, archive_version: int) -> None:
+        """Baut den Snapshot vollständig aus der Primärdatenbank auf.
+
+        Die Versionen müssen vor dem Lesen bestimmt sein, spätere Änderungen
+        spielt sync nach.
+        """
+        availability_query, assignment_query = SNAPSHOT_QUERIES[db.provider_name]
+        with db_session:
+            availabilities = IntervalColumns.from_cursor(db.execute(availability_query))
+            assignments = IntervalColumns.from_cursor(db.execute(assignment_query))
+
+        with self._lock:
+            self.availabilities, self.assignments = availabilities, assignments
+            self.version, self.archive_version = version, archive_version
+
+    def _rebuild(self) -> None:
+        try:
+            self.build(cache.version(SCHEDULE_CACHE_NAMESPACE), cache.version(ARCHIVE_CACHE_NAMESPACE))
+        except Exception as e:
+            # Der nächste Zugriff versucht es erneut
+            print(f"Fehler beim Aufbau des Schedule-Snapshots: {e}")
+        finally:
+            self._rebuilding = False
+
+    def _rebuild_in_background(self) -> None:
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name="schedule-snapshot", daemon=True).start()
+
+    def sync(self, wait: bool = False) -> "ScheduleSnapshot":
+        """Stellt sicher, dass der Snapshot dem Stand aller Worker entspricht.
+
+        Ist ein Neuaufbau nötig, liefert sync bis zu dessen Abschluss den
+        bisherigen Stand; nur beim ersten Aufbau oder mit wait wird gewartet.
+        """
+        version = cache.version(SCHEDULE_CACHE_NAMESPACE)
+        archive_version = cache.version(ARCHIVE_CACHE_NAMESPACE)
+        current = self.version
+        if version == current and archive_version == self.archive_version:
+            return self
+        if (current is not None and archive_version == self.archive_version
+                and 0 < version - current <= SCHEDULE_MAX_REPLAY):
+            changes = cache.changes(SCHEDULE_CACHE_NAMESPACE, current, version)
+            if changes is not None:
+                self._replay([json.loads(change) for change in changes], current, version)
+                return self
+        if current is None or wait:
+            self.build(version, archive_version)
+        else:
+            self._rebuild_in_background()
+        return self
+
+    @property
+    def nbytes(self) -> int:
+        return self.availabilities.nbytes + self.assignments.nbytes
+
+    def _apply_change(self, change: dict) -> None:
+        """Übernimmt eine Änderung aus dem Protokoll (unter dem Lock)"""
+        for name in ("availabilities", "assignments"):
+            columns, part = getattr(self, name), change.get(name, {})
+            for row in part.get("upsert", []):
+                columns.upsert(*row)
+            if part.get("remove"):
+                columns.remove(part["remove"])
+        if change.get("users_removed"):
+            self.availabilities.remove_users(change["users_removed"])
+            self.assignments.remove_users(change["users_removed"])
+
+    def _replay(self, changes: List[dict], after: int, version: int) -> None:
+        with self._lock:
+            # Ein anderer Thread hat inzwischen nachgespielt oder neu aufgebaut
+            if self.version != after:
+                return
+            for change in changes:
+                self._apply_change(change)
+            self.version = version
+
+    def _publish(self, change: dict) -> None:
+        """Veröffentlicht eine lokale Änderung (nach dem Commit) und übernimmt sie direkt"""
+        new_version = cache.publish(SCHEDULE_CACHE_NAMESPACE, json.dumps(change).encode())
+        with self._lock:
+            # Sonst fehlen ältere Änderungen anderer Worker, sync spielt alles der Reihe nach
+            if self.version is not None and new_version == self.version + 1:
+                self._apply_change(change)
+                self.version = new_version
+
+    @staticmethod
+    def _rows(ids: List[int], user_id: int, project_id: int,
+              starts: List[datetime], ends: List[datetime]) -> List[List[int]]:
+        return [[int(interval_id), user_id, project_id, start, end]
+                for interval_id, start, end in zip(ids, to_epoch(starts).tolist(), to_epoch(ends).tolist())]
+
+    def availability_added(self, availability_id: int, user_id: int, start: datetime, end: datetime) -> None:
+        self.availabilities_changed([availability_id], user_id, [start], [end])
+
+    def availabilities_changed(self, availability_ids: List[int], user_id: int,
+                               starts: List[datetime], ends: List[datetime]) -> None:
+        """Neue oder verschobene Verfügbarkeiten eines Benutzers mit ihren neuen Zeiten"""
+        self._publish({"availabilities": {"upsert": self._rows(availability_ids, user_id, NO_PROJECT, starts, ends)}})
+
+    def availabilities_removed(self, availability_ids: List[int]) -> None:
+        self._publish({"availabilities": {"remove": [int(i) for i in availability_ids]}})
+
+    def assignment_changed(self, assignment_id: int, user_id: int, project_id: int,
+                           start: datetime, end: datetime, status: str) -> None:
+        """Neuer oder geänderter Einsatz; stornierte Einsätze fallen heraus"""
+        if status == CANCELLED_STATUS:
+            self.assignments_removed([assignment_id])
+        else:
+            self._publish({"assignments": {"upsert": self._rows([assignment_id], user_id, project_id, [start], [end])}})
+
+    def assignments_removed(self, assignment_ids: List[int]) -> None:
+        self._publish({"assignments": {"remove": [int(i) for i in assignment_ids]}})
+
+    def user_removed(self, user_id: int) -> None:
+        """Gelöschter Benutzer, seine Verfügbarkeiten und Einsätze sind mit gelöscht"""
+        self._publish({"users_removed": [user_id]})
+
+    def free_slots(self, user_id: int, start: datetime, end: datetime) -> List[Tuple[int, int]]:
+        """Zeiten im Zeitraum, in denen der Benutzer verfügbar und nicht eingeplant ist (Epoch-Sekunden)"""
+        start_epoch, end_epoch = to_epoch([start, end]).tolist()
+        with self._lock:
+            available = self.availabilities.overlapping(start_epoch, end_epoch, user_id)
+            assigned = self.assignments.overlapping(start_epoch, end_epoch, user_id)
+            available_starts = self.availabilities.starts[available]
+            available_ends = self.availabilities.ends[available]
+            assigned_starts = self.assignments.starts[assigned]
+            assigned_ends = self.assignments.ends[assigned]
+        if not len(available):
+            return []
+
+        # Elementarabschnitte zwischen allen Intervallgrenzen im Zeitraum
+        points = np.unique(np.clip(np.concatenate([
+            available_starts, available_ends, assigned_starts, assigned_ends, [start_epoch, end_epoch]
+        ]), start_epoch, end_epoch))
+        free = ((covering_count(available_starts, available_ends, points[:-1]) > 0)
+                & (covering_count(assigned_starts, assigned_ends, points[:-1]) == 0))
+        changes = np.diff(np.pad(free, 1).astype(np.int8))
+        return list(zip(points[np.flatnonzero(changes == 1)].tolist(),
+                        points[np.flatnonzero(changes == -1)].tolist()))
+
+    def free_users(self, start: datetime, end: datetime, user_ids: Optional[List[int]] = None) -> np.ndarray:
+        """IDs der Benutzer, die den ganzen Zeitraum verfügbar und nicht eingeplant sind.
+
+        Verfügbarkeiten eines Benutzers überschneiden sich nicht, der Zeitraum
+        ist also abgedeckt, wenn die Summe der angeschnittenen Dauern passt.
+        """
+        start_epoch, end_epoch = to_epoch([start, end]).tolist()
+        with self._lock:
+            available = self.availabilities.overlapping(start_epoch, end_epoch)
+            users = self.availabilities.users[available]
+            covered = (np.minimum(self.availabilities.ends[available], end_epoch)
+                       - np.maximum(self.availabilities.starts[available], start_epoch))
+            assigned = np.unique(self.assignments.users[self.assignments.overlapping(start_epoch, end_epoch)])
+
+        candidates, inverse = np.unique(users, return_inverse=True)
+        totals = np.bincount(inverse, weights=covered, minlength=len(candidates))
+        free = np.setdiff1d(candidates[totals >= end_epoch - start_epoch], assigned, assume_unique=True)
+        if user_ids is not None:
+            free = free[np.isin(free, np.asarray(user_ids, dtype=np.int64))]
+        return free
+
+    def assigned_intervals(self, project_ids: List[int], start: datetime,
+                           end: datetime) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Projekt, Benutzer, Beginn und Ende (Epoch-Sekunden) der Einsätze der Projekte im Zeitraum"""
+        start_epoch, end_epoch = to_epoch([start, end]).tolist()
+        with self._lock:
+            rows = self.assignments.overlapping(start_epoch, end_epoch)
+            rows = rows[np.isin(self.assignments.projects[rows], np.asarray(project_ids, dtype=np.int32))]
+            return (self.assignments.projects[rows], self.assignments.users[rows],
+                    self.assignments.starts[rows], self.assignments.ends[rows])
+
+
+schedule_snapshot = ScheduleSnapshot()
+
+
+def from_epoch(value: int) -> datetime:
+    """Gegenstück zu to_epoch (naiver Zeitpunkt)"""
+    return EPOCH + timedelta(seconds=value)
+
+
+class ScheduleService:
+    @staticmethod
+    def check_range(start: datetime, end: datetime) -> None:
+        if start >= end:
+            raise ValueError("Startzeit muss vor Endzeit liegen")
+        horizon = archive_horizon.sync()
+        if reaches_archive(horizon.availability, start) or reaches_archive(horizon.assignment, start):
+            raise ValueError("Zeitraum reicht in das Archiv")
+
+    @staticmethod
+    def get_free_slots(username: str, start: datetime, end: datetime) -> Optional[List[schemas.FreeSlot]]:
+        """Freie Zeiten eines Benutzers: Verfügbarkeiten ohne Einsätze, begrenzt auf den Zeitraum"""
+        ScheduleService.check_range(start, end)
+        with db_session:
+            user = entities.User.get(username=username)
+            if not user:
+                return None
+            user_id = user.id
+
+        return [
+            schemas.FreeSlot(start=from_epoch(slot_start), end=from_epoch(slot_end))
+            for slot_start, slot_end in schedule_snapshot.sync().free_slots(user_id, start, end)
+        ]
+
+    @staticmethod
+    def get_free_users(start: datetime, end: datetime, skill: Optional[str] = None) -> List[schemas.UserResponse]:
+        """Aktive Benutzer, die im ganzen Zeitraum verfügbar und nicht eingeplant sind"""
+        ScheduleService.check_range(start, end)
+        free_ids = schedule_snapshot.sync().free_users(start, end).tolist()
+        with db_session:
+            users = select(u for u in entities.User if u.id in free_ids and u.is_active)
+            if skill:
+                users = users.filter(lambda u: skill in u.skills.name)
+            return [schemas.UserResponse.model_validate(u) for u in users.order_by(entities.User.username)]
@@ -0,0 +1,285 @@
+import bisect
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select
+
+from app.cache import cache
+from app.models import entities
+from app.models import schemas
+
+USER_INDEX_NAMESPACE = "users"
+# Mehr Änderungen seit dem letzten Stand werden nicht nachgespielt, sondern neu aufgebaut
+USER_INDEX_MAX_REPLAY = 1000
+EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def words_of(haystack: str) -> set:
+    return set(haystack.replace("@", " ").replace(".", " ").split())
+
+
+def _insert(array: np.ndarray, value: int) -> np.ndarray:
+    """Fügt value in ein sortiertes Array ein"""
+    return np.insert(array, np.searchsorted(array, value), value)
+
+
+def _remove(array: np.ndarray, value: int) -> np.ndarray:
+    """Entfernt value aus einem sortierten Array"""
+    return np.delete(array, np.searchsorted(array, value))
+
+
+class UserSearchIndex:
+    """Suchindex über Benutzername, vollständigen Namen und E-Mail.
+
+    Jeder Benutzer belegt einen festen Slot, Posting-Listen enthalten Slots.
+    rank ordnet jedem Slot seine Position in der Sortierung nach Benutzername
+    zu, order enthält die Slots in dieser Reihenfolge. Treffer werden nach rank
+    sortiert, der Cursor ist ein einfacher Positionsvergleich. Suchbegriffe ab
+    drei Zeichen laufen über Trigramm-Posting-Listen (Teilzeichenfolgen),
+    kürzere über eine sortierte Wortliste (Wortanfänge).
+
+    Änderungen an Benutzern veröffentlicht user_changed im Änderungsprotokoll
+    des Cache-Namensraums. Jeder Worker liest beim nächsten Zugriff nur die
+    geänderten Benutzer nach und baut den Index nur bei einer Lücke im
+    Protokoll neu auf.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self._lock = threading.Lock()
+        self.slots: Dict[int, int] = {}  # Benutzer-ID -> Slot
+        self.records: List[Optional[Tuple[str, str, str, bool]]] = []  # je Slot, None wenn gelöscht
+        self.haystacks: List[str] = []
+        self.user_skills: List[List[str]] = []
+        self.active = np.zeros(0, dtype=bool)
+        self.rank = np.zeros(0, dtype=np.int64)
+        self.usernames: List[str] = []  # sortiert
+        self.order = EMPTY
+        self.postings: Dict[str, np.ndarray] = {}
+        self.words: List[str] = []
+        self.word_rows: List[int] = []
+        self.skill_rows: Dict[str, np.ndarray] = {}
+
+    @staticmethod
+    def _load(user_ids: Optional[List[int]] = None):
+        """Benutzer und Fähigkeiten aus der Primärdatenbank (alle oder nur user_ids)"""
+        with db_session:
+            if user_ids is None:
+                users = select((u.id, u.username, u.email, u.full_name, u.is_active) for u in entities.User)
+                memberships = select((u.id, s.name) for u in entities.User for s in u.skills)
+            else:
+                users = select((u.id, u.username, u.email, u.full_name, u.is_active)
+                               for u in entities.User if u.id in user_ids)
+                memberships = select((u.id, s.name) for u in entities.User for s in u.skills if u.id in user_ids)
+            skills: Dict[int, List[str]] = {}
+            for user_id, skill_name in memberships.without_distinct():
+                skills.setdefault(user_id, []).append(skill_name.lower())
+            return list(users), skills
+
+    def build(self, version: int) -> None:
+        """Baut den Index vollständig aus der Primärdatenbank auf"""
+        users, skills = self._load()
+        # In Python sortieren, damit die Reihenfolge zu bisect passt (unabhängig von der DB-Collation)
+        users.sort(key=lambda user: user[1])
+
+        postings: Dict[str, List[int]] = {}
+        words: List[Tuple[str, int]] = []
+        skill_rows: Dict[str, List[int]] = {}
+        haystacks = []
+        for row, (user_id, username, email, full_name, _) in enumerate(users):
+            haystack = f"{username} {full_name} {email}".lower()
+            haystacks.append(haystack)
+            for gram in trigrams(haystack):
+                postings.setdefault(gram, []).append(row)
+            for word in words_of(haystack):
+                words.append((word, row))
+            for skill_name in skills.get(user_id, []):
+                skill_rows.setdefault(skill_name, []).append(row)
+        words.sort()
+
+        with self._lock:
+            if self.version is not None and version < self.version:
+                return
+            # Anfangs entspricht der Slot der Position in der Sortierung
+            self.slots = {user[0]: row for row, user in enumerate(users)}
+            self.records = [record[1:] for record in users]
+            self.haystacks = haystacks
+            self.user_skills = [skills.get(user[0], []) for user in users]
+            self.active = np.array([is_active for *_, is_active in users], dtype=bool)
+            self.rank = np.arange(len(users), dtype=np.int64)
+            self.usernames = [username for _, username, _, _, _ in users]
+            self.order = np.arange(len(users), dtype=np.int32)
+            self.postings = {gram: np.array(row_list, dtype=np.int32) for gram, row_list in postings.items()}
+            self.words = [word for word, _ in words]
+            self.word_rows = [row for _, row in words]
+            self.skill_rows = {name: np.unique(np.array(r, dtype=np.int32)) for name, r in skill_rows.items()}
+            self.version = version
+
+    def _index(self, slot: int) -> None:
+        """Nimmt einen Slot in Sortierung, Posting-Listen, Wortliste und Fähigkeiten auf"""
+        username = self.records[slot][0]
+        position = bisect.bisect_left(self.usernames, username)
+        self.usernames.insert(position, username)
+        self.rank[self.rank >= position] += 1
+        self.rank[slot] = position
+        self.order = np.insert(self.order, position, slot)
+
+        haystack = self.haystacks[slot]
+        for gram in trigrams(haystack):
+            self.postings[gram] = _insert(self.postings.get(gram, EMPTY), slot)
+        for word in words_of(haystack):
+            position = bisect.bisect_right(self.words, word)
+            self.words.insert(position, word)
+            self.word_rows.insert(position, slot)
+        for skill_name in self.user_skills[slot]:
+            self.skill_rows[skill_name] = _insert(self.skill_rows.get(skill_name, EMPTY), slot)
+
+    def _unindex(self, slot: int) -> None:
+        """Entfernt einen Slot aus allen Strukturen (Gegenstück zu _index)"""
+        position = int(self.rank[slot])
+        del self.usernames[position]
+        self.order = np.delete(self.order, position)
+        self.rank[self.rank > position] -= 1
+        self.rank[slot] = -1
+
+        haystack = self.haystacks[slot]
+        for gram in trigrams(haystack):
+            self.postings[gram] = _remove(self.postings[gram], slot)
+        for word in words_of(haystack):
+            position = bisect.bisect_left(self.words, word)
+            while self.word_rows[position] != slot:
+                position += 1
+            del self.words[position]
+            del self.word_rows[position]
+        for skill_name in self.user_skills[slot]:
+            self.skill_rows[skill_name] = _remove(self.skill_rows[skill_name], slot)
+
+    def _set_user(self, user_id: int, record: Optional[Tuple[str, str, str, bool]], skills: List[str]) -> None:
+        """Übernimmt den aktuellen Stand eines Benutzers (None: gelöscht)"""
+        slot = self.slots.get(user_id)
+        if slot is not None:
+            self._unindex(slot)
+        if record is None:
+            if slot is not None:
+                del self.slots[user_id]
+                self.records[slot] = None
+                self.active[slot] = False
+            return
+        if slot is None:
+            slot = self.slots[user_id] = len(self.records)
+            self.records.append(None)
+            self.haystacks.append("")
+            self.user_skills.append([])
+            self.active = np.append(self.active, False)
+            self.rank = np.append(self.rank, -1)
+
+        username, email, full_name, is_active = record
+        self.records[slot] = record
+        self.haystacks[slot] = f"{username} {full_name} {email}".lower()
+        self.user_skills[slot] = skills
+        self.active[slot] = is_active
+        self._index(slot)
+
+    def _replay(self, changes: List[bytes], version: int) -> None:
+        """Liest die geänderten Benutzer nach und übernimmt sie in den Index"""
+        user_ids = sorted({int(change) for change in changes})
+        users, skills = self._load(user_ids)
+        records = {user_id: record for user_id, *record in users}
+        with self._lock:
+            if self.version is None or version <= self.version:
+                return
+            # Der aktuelle Stand aus der Datenbank ist auch bei mehrfacher Anwendung richtig
+            for user_id in user_ids:
+                record = records.get(user_id)
+                self._set_user(user_id, tuple(record) if record else None, skills.get(user_id, []))
+            self.version = version
+
+    def sync(self) -> "UserSearchIndex":
+        """Stellt sicher, dass der Index dem Stand aller Worker entspricht"""
+        version = cache.version(USER_INDEX_NAMESPACE)
+        if version == self.version:
+            return self
+        changes = None
+        if self.version is not None and 0 < version - self.version <= USER_INDEX_MAX_REPLAY:
+            changes = cache.changes(USER_INDEX_NAMESPACE, self.version, version)
+        if changes is None:
+            self.build(version)
+        else:
+            self._replay(changes, version)
+        return self
+
+    def user_changed(self, user_id: int) -> None:
+        """Meldet einen angelegten, geänderten oder gelöschten Benutzer (nach dem Commit)"""
+        cache.publish(USER_INDEX_NAMESPACE, str(user_id).encode())
+
+    def _candidates(self, term: str) -> np.ndarray:
+        if len(term) < 3:
+            # Kurze Eingaben: Wortanfänge über die sortierte Wortliste
+            start = bisect.bisect_left(self.words, term)
+            end = bisect.bisect_left(self.words, term + "\uffff")
+            return np.unique(np.array(self.word_rows[start:end], dtype=np.int32))
+
+        # Zeilen, die alle Trigramme enthalten (kleinste Liste zuerst)
+        lists = sorted((self.postings.get(gram, EMPTY) for gram in trigrams(term)), key=len)
+        candidates = lists[0]
+        for posting in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        return candidates
+
+    def search(
+        self,
+        q: Optional[str] = None,
+        skills: Optional[List[str]] = None,
+        active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> Tuple[List[schemas.UserResponse], Optional[str]]:
+        """Treffer nach Benutzername sortiert und der Cursor für die nächste Seite"""
+        with self._lock:
+            rows: Optional[np.ndarray] = None
+            terms = (q or "").lower().split()
+            for term in terms:
+                matched = self._candidates(term)
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            for skill in skills or []:
+                matched = self.skill_rows.get(skill.lower(), EMPTY)
+                rows = matched if rows is None else np.intersect1d(rows, matched, assume_unique=True)
+            first = bisect.bisect_right(self.usernames, cursor) if cursor else 0
+            if rows is None:
+                rows = self.order[first:]
+            else:
+                # Slots in die Reihenfolge nach Benutzername bringen
+                ranks = self.rank[rows]
+                after_cursor = ranks >= first
+                rows = rows[after_cursor][np.argsort(ranks[after_cursor])]
+            if active is not None:
+                rows = rows[self.active[rows] == active]
+
+            # Trigramme können verstreut vorkommen: Teilzeichenfolgen nur so weit
+            # prüfen, bis die Seite (plus ein Eintrag für den Cursor) gefüllt ist
+            long_terms = [term for term in terms if len(term) >= 3]
+            page = []
+            for row in rows.tolist():
+                if all(term in self.haystacks[row] for term in long_terms):
+                    page.append(row)
+                    if len(page) > limit:
+                        break
+
+            next_cursor = self.records[page[limit - 1]][0] if len(page) > limit else None
+            # Daten sind beim Schreiben validiert, daher ohne erneute Prüfung aufbauen
+            return [
+                schemas.UserResponse.model_construct(
+                    username=username, email=email, full_name=full_name, is_active=is_active
+                )
+                for username, email, full_name, is_active in (self.records[row] for row in page[:limit])
+            ], next_cursor
+
+
+user_search_index = UserSearchIndex()
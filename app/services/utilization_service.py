@@ -0,0 +1,248 @@
+from datetime import datetime, date, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pony.orm import db_session, select
+
+from app.database import db
+from app.models import entities
+from app.models import schemas
+from app.replica import read_entities
+from app.services.archive_service import archive_horizon, reaches_archive
+from app.services.holiday_service import working_hours
+
+# Einsätze mit diesem Status zählen nicht zur Auslastung
+CANCELLED_STATUS = "storniert"
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+
+def split_by_month(start: datetime, end: datetime) -> Iterator[Tuple[int, int, int]]:
+    """Zerlegt ein Intervall in (Jahr, Monat, Sekunden) je Kalendermonat"""
+    current = start
+    while current < end:
+        boundary = min(next_month(current), end)
+        yield current.year, current.month, int((boundary - current).total_seconds())
+        current = boundary
+
+
+def to_epoch(values) -> np.ndarray:
+    """Wandelt naive Zeitpunkte in Sekunden seit Epoch (int64) um"""
+    return np.array(values, dtype="datetime64[s]").astype(np.int64)
+
+
+class UtilizationService:
+    @staticmethod
+    def _add_month(user_id: int, project_id: int, year: int, month: int,
+                   availability_seconds: int = 0, assigned_seconds: int = 0) -> None:
+        """Addiert Sekunden auf ein Monats-Rollup (innerhalb der laufenden db_session)"""
+        # Upsert in einer Anweisung, damit parallele Schreiber keine Updates verlieren
+        db.execute("""
+            INSERT INTO utilization_rollup
+                (user_id, project_id, year, month, availability_seconds, assigned_seconds)
+            VALUES ($user_id, $project_id, $year, $month, $availability_seconds, $assigned_seconds)
+            ON CONFLICT (user_id, project_id, year, month) DO UPDATE SET
+                availability_seconds = utilization_rollup.availability_seconds + excluded.availability_seconds,
+                assigned_seconds = utilization_rollup.assigned_seconds + excluded.assigned_seconds
+        """)
+
+    @staticmethod
+    def _add(user_id: int, project_id: int, start: datetime, end: datetime,
+             availability_sign: int = 0, assigned_sign: int = 0) -> None:
+        """Bucht ein Intervall in die Monats-Rollups"""
+        for year, month, seconds in split_by_month(start, end):
+            UtilizationService._add_month(
+                user_id, project_id, year, month,
+                availability_seconds=availability_sign * seconds,
+                assigned_seconds=assigned_sign * seconds
+            )
+
+    @staticmethod
+    def apply_availability_intervals(user_id: int, intervals: List[Tuple[datetime, datetime]], sign: int = 1) -> None:
+        """Bucht viele Verfügbarkeiten eines Benutzers mit einer Anweisung je Monat"""
+        per_month: Dict[Tuple[int, int], int] = {}
+        for start, end in intervals:
+            for year, month, seconds in split_by_month(start, end):
+                per_month[year, month] = per_month.get((year, month), 0) + seconds
+        for (year, month), seconds in per_month.items():
+            UtilizationService._add_month(user_id, 0, year, month, availability_seconds=sign * seconds)
+
+    @staticmethod
+    def apply_availability(availability: entities.Availability, sign: int = 1) -> None:
+        """Bucht eine Verfügbarkeit ein (sign=1) oder aus (sign=-1)"""
+        UtilizationService._add(
+            availability.user.id, 0, availability.start_time, availability.end_time,
+            availability_sign=sign
+        )
+
+    @staticmethod
+    def apply_assignment(assignment: entities.Assignment, sign: int = 1) -> None:
+        """Bucht einen Einsatz ein (sign=1) oder aus (sign=-1); stornierte Einsätze zählen nicht"""
+        if assignment.status == CANCELLED_STATUS:
+            return
+        UtilizationService._add(
+            assignment.user.id, assignment.project.id, assignment.start_date, assignment.end_date,
+            assigned_sign=sign
+        )
+
+    @staticmethod
+    @db_session
+    def rebuild_rollups() -> None:
+        """Berechnet alle Rollups neu aus den Rohdaten (Erstbefüllung oder Reparatur)"""
+        db.execute("DELETE FROM utilization_rollup")
+        for entity in (entities.Availability, entities.ArchivedAvailability):
+            for availability in select(a for a in entity):
+                UtilizationService.apply_availability(availability)
+        for entity in (entities.Assignment, entities.ArchivedAssignment):
+            for assignment in select(a for a in entity):
+                UtilizationService.apply_assignment(assignment)
+
+    @staticmethod
+    def _aggregate_raw(
+        source,
+        totals: Dict[Tuple[int, int], np.ndarray],
+        range_start: datetime,
+        range_end: datetime,
+        user_id: Optional[int],
+        project_id: Optional[int]
+    ) -> None:
+        """Summiert angeschnittene Monate direkt aus den Intervallen (vektorisiert)"""
+        horizon = archive_horizon.sync()
+        rows = []
+        if project_id in (None, 0):
+            availability_sources = [source.Availability]
+            if reaches_archive(horizon.availability, range_start):
+                availability_sources.append(source.ArchivedAvailability)
+            rows.append((
+                [row for entity in availability_sources for row in select(
+                    (a.user.id, 0, a.start_time, a.end_time) for a in entity
+                    if a.start_time < range_end and a.end_time > range_start
+                    and (user_id is None or a.user.id == user_id)
+                ).without_distinct()],
+                0
+            ))
+        if project_id != 0:
+            assignment_sources = [source.Assignment]
+            if reaches_archive(horizon.assignment, range_start):
+                assignment_sources.append(source.ArchivedAssignment)
+            rows.append((
+                [row for entity in assignment_sources for row in select(
+                    (a.user.id, a.project.id, a.start_date, a.end_date) for a in entity
+                    if a.start_date < range_end and a.end_date > range_start
+                    and a.status != CANCELLED_STATUS
+                    and (user_id is None or a.user.id == user_id)
+                    and (project_id is None or a.project.id == project_id)
+                ).without_distinct()],
+                1
+            ))
+
+        lower, upper = to_epoch([range_start, range_end])
+        for intervals, column in rows:
+            if not intervals:
+                continue
+            user_ids, project_ids, starts, ends = zip(*intervals)
+            durations = np.clip(to_epoch(ends), lower, upper) - np.clip(to_epoch(starts), lower, upper)
+
+            keys = np.array(user_ids, dtype=np.int64) << 32 | np.array(project_ids, dtype=np.int64)
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            sums = np.bincount(inverse, weights=durations)
+            for key, seconds in zip(unique_keys.tolist(), sums.tolist()):
+                totals.setdefault((key >> 32, key & 0xFFFFFFFF), np.zeros(2))[column] += seconds
+
+    @staticmethod
+    @db_session
+    def get_report(
+        start_date: date,
+        end_date: date,
+        username: Optional[str] = None,
+        project_id: Optional[int] = None,
+        viewer: Optional[str] = None,
+        state: Optional[str] = None
+    ) -> List[schemas.UtilizationReportRow]:
+        """Auslastung je Benutzer und Projekt im Zeitraum (Enddatum inklusive).
+
+        Vollständig enthaltene Monate kommen aus den Rollups, nur angeschnittene
+        Monate am Rand werden aus den Rohdaten berechnet. Gelesen wird im Namen
+        von viewer (Lesereplikat außerhalb des Sticky-Fensters). Die Kapazität
+        sind die Arbeitsstunden im Zeitraum nach dem Feiertagskalender von state.
+        """
+        source = read_entities(viewer)
+        range_start = datetime.combine(start_date, datetime.min.time())
+        range_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time())
+        capacity_hours = round(float(working_hours([range_start], [range_end], state)[0]), 2)
+
+        user_id = None
+        if username:
+            user = source.User.get(username=username)
+            if not user:
+                return []
+            user_id = user.id
+
+        first_full = range_start if range_start.day == 1 else next_month(range_start)
+        last_full_end = month_start(range_end)
+
+        totals: Dict[Tuple[int, int], np.ndarray] = {}
+        if first_full < last_full_end:
+            first_index = first_full.year * 12 + first_full.month - 1
+            end_index = last_full_end.year * 12 + last_full_end.month - 1
+            rollups = select(
+                (r.user.id, r.project_id, sum(r.availability_seconds), sum(r.assigned_seconds))
+                for r in source.UtilizationRollup
+                if r.year * 12 + r.month - 1 >= first_index and r.year * 12 + r.month - 1 < end_index
+                and (user_id is None or r.user.id == user_id)
+                and (project_id is None or r.project_id == project_id)
+            )
+            for rollup_user_id, rollup_project_id, availability_seconds, assigned_seconds in rollups:
+                totals.setdefault((rollup_user_id, rollup_project_id), np.zeros(2))[:] += (
+                    availability_seconds, assigned_seconds
+                )
+
+            edges = [(range_start, first_full), (last_full_end, range_end)]
+        else:
+            edges = [(range_start, range_end)]
+
+        for edge_start, edge_end in edges:
+            if edge_start < edge_end:
+                UtilizationService._aggregate_raw(source, totals, edge_start, edge_end, user_id, project_id)
+
+        user_ids = list({key[0] for key in totals})
+        usernames = dict(select((u.id, u.username) for u in source.User if u.id in user_ids))
+        return [
+            schemas.UtilizationReportRow(
+                username=usernames[report_user_id],
+                project_id=report_project_id or None,
+                availability_hours=round(seconds[0] / 3600, 2),
+                assigned_hours=round(seconds[1] / 3600, 2),
+                capacity_hours=capacity_hours
+            )
+            for (report_user_id, report_project_id), seconds in sorted(totals.items())
+            if seconds.any()
+        ]
+
+
+def utilization_report_job(job) -> List[dict]:
+    """Job-Funktion: Auslastungsbericht im Hintergrund (siehe JobService)"""
+    params = job.params
+    rows = UtilizationService.get_report(
+        start_date=date.fromisoformat(params["start_date"]),
+        end_date=date.fromisoformat(params["end_date"]),
+        username=params.get("username"),
+        project_id=params.get("project_id"),
+        viewer=job.username,
+        state=params.get("state")
+    )
+    return [row.model_dump() for row in rows]
+
+
+def rebuild_rollups_job(job) -> None:
+    """Job-Funktion: Rollups neu berechnen (siehe JobService)"""
+    job.progress(0, "Rollups werden neu berechnet")
+    UtilizationService.rebuild_rollups()
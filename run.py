@@ -1,8 +1,12 @@
 #!/usr/bin/env python
 """
 Hauptskript zum Starten der Anwendung
+
+Im Produktionsmodus (RUN_MODE=production oder --production) startet ein
+Prefork-Server mit mehreren Workern, siehe app/server.py.
 """
 import os
+import sys
 import uvicorn
 
 if __name__ == "__main__":
@@ -12,5 +16,13 @@ if __name__ == "__main__":
     # Port
     port = int(os.getenv("PORT", 8000))
 
-    # Anwendung starten
-    uvicorn.run("app.main:app", reload=debug)
\ No newline at end of file
+    # Produktionsmodus
+    production = os.getenv("RUN_MODE", "development") == "production" or "--production" in sys.argv
+
+    if production:
+        from app.server import PreforkServer
+
+        PreforkServer("app.main:app", host=os.getenv("HOST", "0.0.0.0"), port=port).run()
+    else:
+        # Anwendung starten
+        uvicorn.run("app.main:app", port=port, reload=debug)
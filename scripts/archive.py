@@ -0,0 +1,27 @@
+#!/usr/bin/env python
+"""
+Skript zum Archivieren alter Verfügbarkeiten und abgeschlossener Einsätze
+
+Verschiebt alle Einträge, die vor dem Stichtag geendet haben, in die
+Archivtabellen. Ohne Angabe gilt ARCHIVE_AFTER_DAYS (siehe archive_service.py).
+
+Aufruf: python scripts/archive.py [JJJJ-MM-TT]
+"""
+import os
+import sys
+from datetime import datetime
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import init_database
+from app.models import entities  # noqa: F401 - Entitäten für das Mapping registrieren
+from app.services.archive_service import ArchiveService, archive_cutoff
+
+
+if __name__ == "__main__":
+    init_database(debug=os.getenv("DEBUG", "True").lower() in ("true", "1", "t"))
+    cutoff = datetime.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else archive_cutoff()
+    moved = ArchiveService.compact(cutoff)
+    print(f"Stichtag {cutoff:%Y-%m-%d}: {moved['availabilities']} Verfügbarkeiten "
+          f"und {moved['assignments']} Einsätze archiviert")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+"""
+Skript zum Messen der Team-Heatmap und der Konfliktprüfung (Belegungs-Bitmaps)
+
+Legt eine temporäre SQLite-Datenbank mit vielen Benutzern, Verfügbarkeiten und
+Einsätzen in einem Monat an, berechnet die Bitmaps und misst die Heatmap für
+das ganze Team sowie check_availability_conflict.
+
+Aufruf: python scripts/bench_heatmap.py [Benutzer] [Wiederholungen]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Temporäre Datenbank verwenden, bevor die Anwendung importiert wird
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pony.orm import db_session
+
+from app.database import init_database
+from app.models.entities import User, Location, Project, Availability, Assignment
+from app.services.availability_service import AvailabilityService
+from app.services.occupancy_service import OccupancyService
+
+MONTH = datetime(2024, 3, 1)
+
+
+@db_session
+def create_bench_data(count):
+    rng = random.Random(1)
+    location = Location(name="Halle", address="Messeplatz 1", city="München", postal_code="81823")
+    project = Project(name="Messe", location=location, start_date=MONTH, end_date=MONTH + timedelta(days=31),
+                      required_staff=count // 2)
+    for i in range(count):
+        user = User(username=f"user{i}", email=f"user{i}@example.com", full_name=f"User {i}", hashed_password="-")
+        for day in range(0, 31, 2):
+            start = MONTH + timedelta(days=day, hours=rng.randint(6, 12), minutes=15 * rng.randint(0, 3))
+            Availability(name="Frei", start_time=start, end_time=start + timedelta(hours=rng.randint(2, 8)), user=user)
+        for day in range(1, 31, 3):
+            start = MONTH + timedelta(days=day, hours=rng.randint(6, 14))
+            Assignment(user=user, project=project, start_date=start, end_date=start + timedelta(hours=8))
+    return project.id
+
+
+def measure(rounds, function, *args, **kwargs):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function(*args, **kwargs)
+    return (time.perf_counter() - started) / rounds
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    init_database()
+    project_id = create_bench_data(count)
+
+    started = time.perf_counter()
+    OccupancyService.rebuild()
+    print(f"Bitmaps für {count} Benutzer berechnet: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for kind in ("availability", "assignments"):
+        seconds = measure(rounds, OccupancyService.get_heatmap, MONTH.year, MONTH.month, kind=kind)
+        print(f"Heatmap {kind:<13} (alle Benutzer)    {seconds * 1000:8.2f} ms")
+    seconds = measure(rounds, OccupancyService.get_heatmap, MONTH.year, MONTH.month, project_id=project_id)
+    print(f"Heatmap assignments   (Projektteam)      {seconds * 1000:8.2f} ms")
+
+    free = (MONTH + timedelta(days=1, hours=20), MONTH + timedelta(days=1, hours=22))
+    busy = (MONTH + timedelta(days=2, hours=12), MONTH + timedelta(days=2, hours=13))
+    for label, (start, end) in (("frei", free), ("belegt", busy)):
+        seconds = measure(rounds * 10, AvailabilityService.check_availability_conflict, "user0", start, end)
+        print(f"Konfliktprüfung ({label:<6})                {seconds * 1000:8.2f} ms")
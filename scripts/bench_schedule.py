@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+"""
+Skript zum Messen des Schedule-Snapshots (Planungsabfragen)
+
+Legt eine temporäre SQLite-Datenbank mit vielen Verfügbarkeiten und Einsätzen
+an, baut den Snapshot auf und misst Speicherbedarf, Aufbauzeit, inkrementelle
+Änderungen, das Nachspielen des Änderungsprotokolls sowie freie Zeiten, freie
+Benutzer und Besetzung im Vergleich zur bisherigen Abfrage über Pony-Entitäten.
+
+Aufruf: python scripts/bench_schedule.py [Intervalle] [Benutzer] [Wiederholungen]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Temporäre Datenbank verwenden, bevor die Anwendung importiert wird
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pony.orm import db_session, select
+
+from app.database import db, init_database
+from app.models.entities import User, Location, Project, Availability, Assignment
+from app.services.coverage_service import CoverageService
+from app.services.schedule_service import schedule_snapshot
+from app.services.utilization_service import CANCELLED_STATUS
+
+BASE = datetime(2030, 1, 1)
+DAYS = 730
+
+
+def create_bench_data(intervals, users):
+    """Verfügbarkeiten und Einsätze (je etwa die Hälfte) über raw SQL, ohne Entitäten je Zeile"""
+    rng = random.Random(1)
+    with db_session:
+        location = Location(name="Halle", address="Messeplatz 1", city="München", postal_code="81823")
+        projects = [Project(name=f"Messe {i}", location=location, start_date=BASE,
+                            end_date=BASE + timedelta(days=DAYS), required_staff=20) for i in range(50)]
+        user_list = [User(username=f"user{i}", email=f"user{i}@example.com", full_name=f"User {i}",
+                          hashed_password="-") for i in range(users)]
+        db.flush()
+        project_ids = [p.id for p in projects]
+        user_ids = [u.id for u in user_list]
+
+    # Je Benutzer und Tag höchstens eine Verfügbarkeit und ein Einsatz
+    per_user = intervals // (2 * users)
+    now = datetime.now()
+    availability_rows, assignment_rows = [], []
+    for user_id in user_ids:
+        for day in sorted(rng.sample(range(DAYS), min(per_user, DAYS))):
+            start = BASE + timedelta(days=day, hours=rng.randint(6, 10))
+            availability_rows.append(("Frei", start, start + timedelta(hours=rng.randint(4, 10)), now, user_id))
+            start = BASE + timedelta(days=day, hours=rng.randint(8, 14))
+            assignment_rows.append((start, start + timedelta(hours=rng.randint(2, 8)), "geplant", "", now,
+                                    user_id, rng.choice(project_ids)))
+    with db_session:
+        connection = db.get_connection()
+        connection.executemany(
+            'INSERT INTO "Availability" (name, start_time, end_time, created_at, "user") VALUES (?, ?, ?, ?, ?)',
+            availability_rows)
+        connection.executemany(
+            'INSERT INTO "Assignment" (start_date, end_date, status, notes, created_at, "user", project) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)', assignment_rows)
+    return len(availability_rows) + len(assignment_rows)
+
+
+@db_session
+def free_users_with_pony(start, end):
+    """Bisheriger Weg: Verfügbarkeiten und Einsätze des Zeitraums über Pony laden"""
+    available = set(select(
+        a.user.id for a in Availability if a.start_time <= start and a.end_time >= end
+    ))
+    assigned = set(select(
+        a.user.id for a in Assignment
+        if a.start_date < end and a.end_date > start and a.status != CANCELLED_STATUS
+    ))
+    return available - assigned
+
+
+def measure(rounds, function, *args, **kwargs):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        function(*args, **kwargs)
+    return (time.perf_counter() - started) / rounds
+
+
+if __name__ == "__main__":
+    intervals = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    users = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    init_database()
+    started = time.perf_counter()
+    created = create_bench_data(intervals, users)
+    print(f"{created} Intervalle für {users} Benutzer angelegt: {time.perf_counter() - started:.1f} s")
+
+    started = time.perf_counter()
+    snapshot = schedule_snapshot.sync()
+    print(f"Snapshot aufgebaut: {time.perf_counter() - started:.2f} s, "
+          f"{snapshot.nbytes / 1024 / 1024:.1f} MB ({snapshot.nbytes / created:.0f} Byte je Intervall)")
+
+    seconds = measure(rounds * 50, snapshot.availability_added, 10 ** 12, 1, BASE, BASE + timedelta(hours=1))
+    print(f"Inkrementelle Änderung                      {seconds * 1000:8.3f} ms")
+
+    # Ein anderer Worker hat geändert: nur das Änderungsprotokoll nachspielen
+    version = snapshot.version
+    for offset in range(100):
+        snapshot.availability_added(10 ** 12 + offset, 1, BASE, BASE + timedelta(hours=1))
+    snapshot.version = version
+    started = time.perf_counter()
+    snapshot.sync()
+    print(f"100 Änderungen nachgespielt                 {(time.perf_counter() - started) * 1000:8.2f} ms")
+
+    start, end = BASE + timedelta(days=200, hours=12), BASE + timedelta(days=200, hours=14)
+    with db_session:
+        user_id = User.get(username="user0").id
+    seconds = measure(rounds, snapshot.free_slots, user_id, BASE, BASE + timedelta(days=31))
+    print(f"Freie Zeiten eines Benutzers (Monat)        {seconds * 1000:8.2f} ms")
+    seconds = measure(rounds, snapshot.free_users, start, end)
+    print(f"Freie Benutzer (Snapshot)                   {seconds * 1000:8.2f} ms")
+    seconds = measure(rounds, free_users_with_pony, start, end)
+    print(f"Freie Benutzer (Pony)                       {seconds * 1000:8.2f} ms")
+    seconds = measure(rounds, CoverageService.get_coverage, BASE, BASE + timedelta(days=31), "hour")
+    print(f"Besetzung aller Projekte (Monat, Stunden)   {seconds * 1000:8.2f} ms")
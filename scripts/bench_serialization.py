@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""
+Skript zum Messen der JSON-Serialisierung von GET /api/availability/
+
+Vergleicht die Standardantwort (Validierung gegen response_model + Encoding durch
+FastAPI) mit dem schnellen Antwortmodus (FAST_JSON_RESPONSES) auf einer temporären
+SQLite-Datenbank mit vielen Verfügbarkeiten.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Temporäre Datenbank verwenden, bevor die Anwendung importiert wird
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi.testclient import TestClient
+from pony.orm import db_session
+
+from app import responses
+from app.main import app
+from app.models.entities import User, Availability
+from app.auth.oauth2 import create_access_token
+
+
+@db_session
+def create_bench_data(username, count):
+    user = User(
+        username=username,
+        email=f"{username}@example.com",
+        full_name="Bench Benutzer",
+        hashed_password="-"
+    )
+    start = datetime(2020, 1, 1, 8)
+    for i in range(count):
+        Availability(
+            name=f"Eintrag {i}",
+            start_time=start + timedelta(hours=3 * i),
+            end_time=start + timedelta(hours=3 * i + 2),
+            user=user
+        )
+
+
+def measure(client, headers, fast, rounds):
+    responses.FAST_JSON_RESPONSES = fast
+    client.get("/api/availability/", headers=headers)  # Aufwärmen
+    started = time.perf_counter()
+    for _ in range(rounds):
+        response = client.get("/api/availability/", headers=headers)
+        response.raise_for_status()
+    return (time.perf_counter() - started) / rounds, len(response.content)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    create_bench_data("benchuser", count)
+    token = create_access_token(data={"sub": "benchuser"})
+    headers = {"Authorization": f"Bearer {token}"}
+
+    with TestClient(app) as client:
+        default_time, size = measure(client, headers, False, rounds)
+        fast_time, _ = measure(client, headers, True, rounds)
+
+    print(f"{count} Verfügbarkeiten, {size / 1024:.0f} KiB pro Antwort")
+    print(f"Standard:  {default_time * 1000:8.1f} ms")
+    print(f"Schnell:   {fast_time * 1000:8.1f} ms ({default_time / fast_time:.2f}x)")
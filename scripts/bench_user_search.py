@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+"""
+Skript zum Messen der Benutzersuche (UserSearchIndex hinter GET /api/users/)
+
+Legt eine temporäre SQLite-Datenbank mit vielen Benutzern und Fähigkeiten an und
+misst den Indexaufbau, typische Typeahead-Abfragen direkt am Index und das
+Nachspielen einer Änderung.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+# Temporäre Datenbank verwenden, bevor die Anwendung importiert wird
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "bench.sqlite"))
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from pony.orm import db_session, select
+
+from app.cache import cache
+from app.database import init_database
+from app.models.entities import User, Skill
+from app.services.user_search_service import USER_INDEX_NAMESPACE, UserSearchIndex
+
+FIRST_NAMES = ["Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hannes", "Ida", "Jonas",
+               "Karla", "Lukas", "Mia", "Noah", "Olga", "Paul", "Rosa", "Simon", "Tina", "Uwe"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer", "Wagner", "Becker",
+              "Schulz", "Hoffmann", "Koch", "Richter", "Klein", "Wolf", "Neumann", "Schwarz"]
+SKILLS = ["Pflege", "Erste Hilfe", "Führerschein", "Englisch", "Betreuung", "Nachtdienst"]
+
+
+@db_session
+def create_bench_data(count):
+    rng = random.Random(1)
+    skills = [Skill(name=name) for name in SKILLS]
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        User(
+            username=f"{first.lower()}.{last.lower()}{i}",
+            email=f"{first.lower()}{i}@example.com",
+            full_name=f"{first} {last}",
+            hashed_password="-",
+            is_active=rng.random() > 0.1,
+            skills=rng.sample(skills, 2)
+        )
+
+
+def measure(index, rounds, **query):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        users, _ = index.search(**query)
+    return (time.perf_counter() - started) / rounds, len(users)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    init_database()
+    create_bench_data(count)
+
+    index = UserSearchIndex()
+    started = time.perf_counter()
+    index.build(0)
+    print(f"Indexaufbau für {count} Benutzer: {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    queries = [
+        {"q": "a"},
+        {"q": "an"},
+        {"q": "schmi"},
+        {"q": "anna müll"},
+        {"q": "weber", "skills": ["Pflege"], "active": True},
+        {"skills": ["Nachtdienst", "Englisch"]},
+        {"q": "example", "cursor": "m"},
+    ]
+    for query in queries:
+        seconds, hits = measure(index, rounds, **query)
+        print(f"{str(query):60s} {seconds * 1000:6.2f} ms  ({hits} Treffer auf der Seite)")
+
+    # Änderung eines Benutzers: Nachlesen aus dem Änderungsprotokoll statt Neuaufbau
+    with db_session:
+        user_id = select(u.id for u in User).first()
+    index.version = cache.version(USER_INDEX_NAMESPACE)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        index.user_changed(user_id)
+        index.sync()
+    print(f"Änderung eines Benutzers nachspielen: {(time.perf_counter() - started) / rounds * 1000:.2f} ms")
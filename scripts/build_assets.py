@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Skript zum Erzeugen gehashter und vorkomprimierter statischer Dateien
+
+Schreibt für jede Datei unter app/static eine Kopie mit Inhalts-Hash im Dateinamen
+nach app/static/dist, dazu .gz- und (wenn das Paket brotli installiert ist)
+.br-Varianten sowie ein manifest.json, über das die Templates die Dateien finden.
+"""
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.assets import DIST_DIR, MANIFEST_PATH, STATIC_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Nur textbasierte Formate lohnen eine Vorkomprimierung
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".json", ".html", ".txt", ".map"}
+
+
+def write_compressed(path, data):
+    """Schreibt .gz- und .br-Varianten, sofern sie kleiner als das Original sind"""
+    gzipped = gzip.compress(data, compresslevel=9, mtime=0)
+    if len(gzipped) < len(data):
+        with open(path + ".gz", "wb") as target:
+            target.write(gzipped)
+
+    if brotli is not None:
+        compressed = brotli.compress(data, quality=11)
+        if len(compressed) < len(data):
+            with open(path + ".br", "wb") as target:
+                target.write(compressed)
+
+
+def build_assets():
+    dist_root = os.path.join(STATIC_DIR, DIST_DIR)
+    shutil.rmtree(dist_root, ignore_errors=True)
+
+    manifest = {}
+    for directory, subdirectories, filenames in os.walk(STATIC_DIR):
+        # Das Ausgabeverzeichnis selbst nicht erneut verarbeiten
+        subdirectories[:] = [d for d in subdirectories if os.path.join(directory, d) != dist_root]
+
+        for filename in sorted(filenames):
+            source = os.path.join(directory, filename)
+            relative = os.path.relpath(source, STATIC_DIR).replace(os.sep, "/")
+            with open(source, "rb") as source_file:
+                data = source_file.read()
+
+            stem, extension = os.path.splitext(relative)
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            hashed = f"{DIST_DIR}/{stem}.{digest}{extension}"
+
+            target = os.path.join(STATIC_DIR, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as target_file:
+                target_file.write(data)
+            if extension in COMPRESSIBLE_EXTENSIONS:
+                write_compressed(target, data)
+
+            manifest[relative] = hashed
+            print(f"{relative} -> {hashed}")
+
+    with open(MANIFEST_PATH, "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+
+    if brotli is None:
+        print("Hinweis: brotli ist nicht installiert, es wurden nur .gz-Varianten erzeugt")
+
+
+if __name__ == "__main__":
+    # Relativ zum Projektverzeichnis arbeiten, wie die Anwendung selbst
+    os.chdir(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+    build_assets()
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+"""
+Skript zum Neuberechnen der Auslastungs-Rollups und Belegungs-Bitmaps aus
+Verfügbarkeiten und Einsätzen
+
+Nötig nach der Einführung für bestehende Daten oder wenn Daten
+an den Services vorbei geändert wurden (z.B. durch init_db.py).
+"""
+import os
+import sys
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import init_database
+from app.models import entities  # noqa: F401 - Entitäten für das Mapping registrieren
+from app.services.occupancy_service import OccupancyService
+from app.services.utilization_service import UtilizationService
+
+
+if __name__ == "__main__":
+    init_database(debug=os.getenv("DEBUG", "True").lower() in ("true", "1", "t"))
+    UtilizationService.rebuild_rollups()
+    print("Auslastungs-Rollups wurden neu berechnet")
+    OccupancyService.rebuild()
+    print("Belegungs-Bitmaps wurden neu berechnet")
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+"""
+Skript zum Abarbeiten der Hintergrundaufträge in einem eigenen Prozess
+
+Alternative zum Runner in den Web-Workern: dort JOB_CONCURRENCY=0 setzen und
+dieses Skript getrennt starten. Aufträge laufen wie dort im Prozess-Pool.
+"""
+import asyncio
+import os
+import sys
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database import init_database
+from app.models import entities  # noqa: F401 - Entitäten für das Mapping registrieren
+from app.services.job_service import JOB_CONCURRENCY, JobRunner
+
+
+if __name__ == "__main__":
+    init_database(debug=os.getenv("DEBUG", "True").lower() in ("true", "1", "t"))
+    try:
+        asyncio.run(JobRunner(concurrency=max(1, JOB_CONCURRENCY)).run())
+    except KeyboardInterrupt:
+        pass
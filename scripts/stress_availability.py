@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+"""
+Lasttest für parallele Schreibzugriffe auf Verfügbarkeiten
+
+Mehrere Prozesse legen gleichzeitig Verfügbarkeiten an. Je Benutzer und Slot
+versuchen alle Prozesse ein leicht versetztes, sich überschneidendes
+Intervall einzutragen - genau einer darf gewinnen. Am Ende wird geprüft, dass
+kein Benutzer überlappende Verfügbarkeiten hat und jeder Slot genau einmal
+belegt ist. Ausgegeben wird der Durchsatz.
+
+Ohne DB_PATH läuft der Test auf einer temporären SQLite-Datenbank, mit
+DEBUG=False gegen die konfigurierte Postgres-Datenbank (die Testbenutzer
+stress-* werden vorher gelöscht).
+
+Aufruf: python scripts/stress_availability.py [--processes 8] [--users 20] [--slots 25] [--no-lock]
+--no-lock schaltet die Benutzersperre ab, um das Rennen sichtbar zu machen.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Temporäre Datenbank verwenden, bevor die Anwendung importiert wird
+os.environ.setdefault("DB_PATH", os.path.join(tempfile.mkdtemp(), "stress.sqlite"))
+
+# Füge das Hauptverzeichnis zum Pfad hinzu
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+BASE = datetime(2030, 1, 1, 8)
+
+
+def init():
+    from app.database import init_database
+    from app.models import entities  # noqa: F401 - Entitäten für das Mapping registrieren
+    init_database(debug=os.getenv("DEBUG", "True").lower() in ("true", "1", "t"))
+
+
+def worker(process: int, users: int, slots: int, no_lock: bool, start_event, results) -> None:
+    init()
+    from app.models import entities, schemas
+    from app.services import availability_service
+    from app.services.availability_service import AvailabilityService
+
+    if no_lock:
+        availability_service.lock_user = lambda **kwargs: entities.User.get(**kwargs)
+
+    created = conflicts = errors = 0
+    start_event.wait()
+    for slot in range(slots):
+        for user in range(users):
+            # Alle Prozesse zielen auf denselben Slot, jeweils um einige Minuten versetzt
+            start = BASE + timedelta(hours=2 * slot, minutes=process % 30)
+            try:
+                AvailabilityService.create_availability(f"stress-{user}", schemas.AvailabilityCreate(
+                    name=f"p{process}", start_time=start, end_time=start + timedelta(hours=1)
+                ))
+                created += 1
+            except ValueError:
+                conflicts += 1
+            except Exception as e:
+                errors += 1
+                if errors <= 3:
+                    print(f"Prozess {process}: {type(e).__name__}: {e}")
+    results.put((created, conflicts, errors))
+
+
+def prepare(users: int) -> None:
+    from pony.orm import db_session, select
+    from app.models import entities
+    with db_session:
+        for user in select(u for u in entities.User if u.username.startswith("stress-")):
+            user.availabilities.clear()
+            user.delete()
+    with db_session:
+        for user in range(users):
+            entities.User(username=f"stress-{user}", email=f"stress-{user}@example.com",
+                          full_name=f"Stress {user}", hashed_password="-")
+
+
+def verify(users: int, slots: int):
+    """Anzahl Überschneidungen und falsch belegter Slots"""
+    from pony.orm import db_session, select
+    from app.models import entities
+    overlaps = wrong_slots = 0
+    with db_session:
+        for user in range(users):
+            rows = sorted(select(
+                (a.start_time, a.end_time) for a in entities.Availability if a.user.username == f"stress-{user}"
+            ).without_distinct())
+            overlaps += sum(1 for previous, current in zip(rows, rows[1:]) if current[0] < previous[1])
+            wrong_slots += abs(len(rows) - slots)
+    return overlaps, wrong_slots
+
+
+def run(processes: int, users: int, slots: int, no_lock: bool) -> None:
+    prepare(users)
+    context = multiprocessing.get_context("spawn")
+    start_event = context.Event()
+    results = context.Queue()
+    workers = [
+        context.Process(target=worker, args=(process, users, slots, no_lock, start_event, results))
+        for process in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    time.sleep(2)  # Prozesse initialisieren lassen
+
+    started = time.perf_counter()
+    start_event.set()
+    totals = [0, 0, 0]
+    for _ in workers:
+        for index, value in enumerate(results.get()):
+            totals[index] += value
+    elapsed = time.perf_counter() - started
+    for process in workers:
+        process.join()
+
+    created, conflicts, errors = totals
+    attempts = created + conflicts + errors
+    overlaps, wrong_slots = verify(users, slots)
+    print(f"{processes} Prozesse, {users} Benutzer, {slots} Slots{' (ohne Sperre)' if no_lock else ''}: "
+          f"{attempts} Versuche in {elapsed:.2f} s ({attempts / elapsed:.0f}/s), "
+          f"{created} angelegt, {conflicts} Konflikte, {errors} Fehler")
+    print(f"  Überschneidungen: {overlaps}, falsch belegte Slots: {wrong_slots} -> "
+          f"{'OK' if overlaps == 0 and wrong_slots == 0 else 'FEHLER'}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--slots", type=int, default=25)
+    parser.add_argument("--no-lock", action="store_true")
+    args = parser.parse_args()
+
+    init()
+    run(args.processes, args.users, args.slots, args.no_lock)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+"""
+Skript zum Spiegeln der SQLite-Primärdatenbank in das Lesereplikat
+
+Für die lokale Entwicklung ohne echte Replikation: kopiert DB_PATH nach
+REPLICA_DB_PATH (konsistente Kopie über die SQLite-Backup-API). Mit
+--interval SEKUNDEN wird wiederholt gespiegelt, um eine Replikation mit
+Verzögerung nachzustellen.
+
+Aufruf: REPLICA_DB_PATH=/tmp/replica.sqlite python scripts/sync_replica.py [--interval 2]
+"""
+import os
+import sqlite3
+import sys
+import time
+
+APP_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+
+def resolve(path: str) -> str:
+    # Pony löst relative Pfade relativ zu app/ auf
+    return path if os.path.isabs(path) else os.path.join(APP_DIR, path)
+
+
+def sync(primary_path: str, replica_path: str) -> None:
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+
+
+if __name__ == "__main__":
+    primary = resolve(os.getenv("DB_PATH", "hcc_plan_db.sqlite"))
+    replica = os.getenv("REPLICA_DB_PATH")
+    if not replica:
+        sys.exit("REPLICA_DB_PATH ist nicht gesetzt")
+    replica = resolve(replica)
+
+    interval = float(sys.argv[sys.argv.index("--interval") + 1]) if "--interval" in sys.argv else 0
+    while True:
+        sync(primary, replica)
+        print(f"{primary} -> {replica} gespiegelt")
+        if not interval:
+            break
+        time.sleep(interval)
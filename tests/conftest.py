@@ -0,0 +1,94 @@
+import os
+import tempfile
+from datetime import datetime
+
+# Eigene Datenbank und prozesslokaler Cache, bevor die Anwendung importiert wird
+_TEST_DIR = tempfile.mkdtemp(prefix="hcc_plan_tests_")
+os.environ["DB_PATH"] = os.path.join(_TEST_DIR, "test.sqlite")
+os.environ["CACHE_BACKEND"] = "memory"
+os.environ["ARCHIVE_INTERVAL_HOURS"] = "0"
+os.environ["JOB_CONCURRENCY"] = "0"
+os.environ["EXPORT_DIR"] = os.path.join(_TEST_DIR, "exports")
+os.environ["PROFILE_DIR"] = os.path.join(_TEST_DIR, "profiles")
+
+import pytest
+from fastapi.testclient import TestClient
+from pony.orm import db_session
+
+from app.cache import cache
+from app.database import db
+from app.main import app
+from app.auth.oauth2 import get_current_user
+from app.models.entities import User, Location, Project
+from app.services.archive_service import ARCHIVE_CACHE_NAMESPACE
+from app.services.geo_service import GEO_CACHE_NAMESPACE
+from app.services.schedule_service import SCHEDULE_CACHE_NAMESPACE, schedule_snapshot
+from app.services.user_search_service import USER_INDEX_NAMESPACE
+
+
+@pytest.fixture(autouse=True)
+def clean_database():
+    """Leert nach jedem Test alle Tabellen und verwirft den Cache"""
+    yield
+    with db_session:
+        for table in reversed(db.schema.order_tables_to_create()):
+            db.execute(f'DELETE FROM "{table.name}"')
+    cache.backend._data.clear()
+    for namespace in (ARCHIVE_CACHE_NAMESPACE, GEO_CACHE_NAMESPACE, SCHEDULE_CACHE_NAMESPACE, USER_INDEX_NAMESPACE):
+        cache.invalidate(namespace)
+    # Nicht im Hintergrund neu aufbauen, sonst sieht der nächste Test den alten Stand
+    schedule_snapshot.sync(wait=True)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def make_user():
+    def make(username: str, **kwargs) -> int:
+        with db_session:
+            user = User(username=username, email=f"{username}@example.com", full_name=username.title(),
+                        hashed_password="-", **kwargs)
+            user.flush()
+            return user.id
+    return make
+
+
+@pytest.fixture
+def make_project():
+    def make(name: str = "Messe", required_staff: int = 1,
+             start_date: datetime = datetime(2030, 1, 1), end_date: datetime = datetime(2030, 12, 31)) -> int:
+        with db_session:
+            location = Location.get(name="Halle") or Location(
+                name="Halle", address="Messeplatz 1", city="München", postal_code="81823"
+            )
+            project = Project(name=name, location=location, start_date=start_date, end_date=end_date,
+                              required_staff=required_staff)
+            project.flush()
+            return project.id
+    return make
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def login():
+    """Meldet einen Benutzer für alle folgenden Anfragen an (ohne Token)"""
+    def log_in(username: str) -> None:
+        with db_session:
+            user_data = User.get(username=username).to_dict()
+        app.dependency_overrides[get_current_user] = lambda: user_data
+    return log_in
+
+
+@pytest.fixture
+def render_templates(monkeypatch):
+    """Rendert Templates mit dem bisherigen Aufruf TemplateResponse(name, context, status_code)"""
+    from fastapi.responses import HTMLResponse
+    from app.templating import templates
+
+    def template_response(name, context, status_code=200, **kwargs):
+        return HTMLResponse(templates.env.get_template(name).render(context), status_code=status_code)
+
+    monkeypatch.setattr(templates, "TemplateResponse", template_response)
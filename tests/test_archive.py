@@ -0,0 +1,117 @@
+from datetime import date, datetime
+
+import pytest
+from pony.orm import db_session, select
+
+from app.database import db
+from app.models import entities
+from app.models import schemas
+from app.services import archive_service
+from app.services.archive_service import ArchiveService, archive_horizon
+from app.services.assignment_service import AssignmentService
+from app.services.availability_service import AvailabilityService
+
+CUTOFF = datetime(2029, 6, 1)
+
+
+def add_availability(username, month, day=4):
+    return AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+        name="Frei", start_time=datetime(2029, month, day, 8), end_time=datetime(2029, month, day, 12)
+    )).id
+
+
+def add_assignment(username, project_id, month, status):
+    return AssignmentService.create_assignment(username, schemas.AssignmentCreate(
+        project_id=project_id, start_date=datetime(2029, month, 4, 8), end_date=datetime(2029, month, 4, 12),
+        status=status
+    )).id
+
+
+def ids(entity):
+    with db_session:
+        return sorted(select(row.id for row in entity))
+
+
+@pytest.fixture
+def anna(make_user):
+    make_user("anna")
+    return "anna"
+
+
+def test_compact_moves_only_rows_before_the_cutoff(anna):
+    old = [add_availability(anna, 1), add_availability(anna, 5)]
+    recent = add_availability(anna, 7)
+
+    moved = ArchiveService.compact(CUTOFF)
+
+    assert moved == {"availabilities": 2, "assignments": 0}
+    assert ids(entities.Availability) == [recent]
+    assert ids(entities.ArchivedAvailability) == old
+    with db_session:
+        archived = entities.ArchivedAvailability[old[0]]
+        assert (archived.user.username, archived.start_time) == (anna, datetime(2029, 1, 4, 8))
+
+
+def test_compact_moves_only_finished_assignments(anna, make_project):
+    project_id = make_project(start_date=datetime(2029, 1, 1))
+    finished = add_assignment(anna, project_id, 1, "abgeschlossen")
+    cancelled = add_assignment(anna, project_id, 2, "storniert")
+    planned = add_assignment(anna, project_id, 3, "geplant")
+    confirmed = add_assignment(anna, project_id, 4, "bestätigt")
+    recent = add_assignment(anna, project_id, 7, "abgeschlossen")
+
+    moved = ArchiveService.compact(CUTOFF)
+
+    assert moved["assignments"] == 2
+    assert ids(entities.ArchivedAssignment) == [finished, cancelled]
+    assert ids(entities.Assignment) == [planned, confirmed, recent]
+
+
+def test_compact_is_idempotent(anna, monkeypatch):
+    monkeypatch.setattr(archive_service, "ARCHIVE_BATCH_SIZE", 2)
+    availability_ids = [add_availability(anna, 1, day) for day in range(1, 6)]
+    # Ein paralleler Lauf hat eine Zeile schon kopiert, aber noch nicht gelöscht
+    with db_session:
+        db.execute(f"""
+            INSERT INTO "availability_archive" (id, name, start_time, end_time, created_at, "user")
+            SELECT id, name, start_time, end_time, created_at, "user" FROM "Availability"
+            WHERE id = {availability_ids[0]}
+        """)
+
+    first = ArchiveService.compact(CUTOFF)
+    second = ArchiveService.compact(CUTOFF)
+
+    assert first == {"availabilities": 5, "assignments": 0}
+    assert second == {"availabilities": 0, "assignments": 0}
+    assert ids(entities.ArchivedAvailability) == availability_ids
+    assert ids(entities.Availability) == []
+
+
+def test_archived_availabilities_are_still_read(anna):
+    archived = add_availability(anna, 1)
+    recent = add_availability(anna, 7)
+    # Vorher einlesen, damit auch der Cache-Eintrag und der Horizont geprüft werden
+    assert [a.id for a in AvailabilityService.get_availabilities(anna, date(2029, 1, 1), date(2029, 12, 31))] \
+        == [archived, recent]
+
+    ArchiveService.compact(CUTOFF)
+
+    assert archive_horizon.sync().availability == datetime(2029, 1, 4, 12)
+    assert sorted(a.id for a in AvailabilityService.get_availabilities(anna, date(2029, 1, 1), date(2029, 12, 31))) \
+        == [archived, recent]
+    assert sorted(a.id for a in AvailabilityService.get_availabilities(anna)) == [archived, recent]
+    assert [a.id for a in AvailabilityService.get_availabilities(anna, date(2029, 2, 1), date(2029, 12, 31))] \
+        == [recent]
+
+
+def test_overlap_with_archived_availability_is_rejected(anna):
+    add_availability(anna, 1)
+    ArchiveService.compact(CUTOFF)
+
+    with pytest.raises(ValueError, match="überschneidet"):
+        AvailabilityService.create_availability(anna, schemas.AvailabilityCreate(
+            name="Neu", start_time=datetime(2029, 1, 4, 11), end_time=datetime(2029, 1, 4, 14)
+        ))
+    AvailabilityService.create_availability(anna, schemas.AvailabilityCreate(
+        name="Neu", start_time=datetime(2029, 1, 4, 12), end_time=datetime(2029, 1, 4, 14)
+    ))
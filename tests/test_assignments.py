@@ -0,0 +1,53 @@
+from datetime import datetime, date
+
+from app.models import schemas
+from app.models import entities
+from app.services import assignment_service
+from app.services.assignment_service import AssignmentService
+from app.services.utilization_service import UtilizationService
+
+
+def plan(username, project_id):
+    return AssignmentService.create_assignment(username, schemas.AssignmentCreate(
+        project_id=project_id, start_date=datetime(2030, 3, 4, 8), end_date=datetime(2030, 3, 4, 12)
+    )).id
+
+
+def assigned_hours():
+    return [row.assigned_hours for row in UtilizationService.get_report(date(2030, 3, 1), date(2030, 3, 31))]
+
+
+def test_status_change_updates_rollups(make_user, make_project):
+    make_user("anna")
+    assignment_id = plan("anna", make_project())
+
+    response = AssignmentService.update_status(assignment_id, "storniert")
+
+    assert response.status == "storniert"
+    assert assigned_hours() == []
+    AssignmentService.update_status(assignment_id, "bestätigt")
+    assert assigned_hours() == [4.0]
+
+
+def test_delete_assignment(make_user, make_project):
+    make_user("anna")
+    assignment_id = plan("anna", make_project())
+
+    assert AssignmentService.delete_assignment(assignment_id) is True
+    assert AssignmentService.delete_assignment(assignment_id) is False
+    assert AssignmentService.update_status(assignment_id, "bestätigt") is None
+    assert assigned_hours() == []
+
+
+def test_user_is_locked_before_the_assignment_is_read(make_user, make_project, monkeypatch):
+    make_user("anna")
+    assignment_id = plan("anna", make_project())
+    calls = []
+    lock_user, get = assignment_service.lock_user, entities.Assignment.get
+    monkeypatch.setattr(assignment_service, "lock_user", lambda **kwargs: calls.append("lock") or lock_user(**kwargs))
+    monkeypatch.setattr(entities.Assignment, "get", lambda **kwargs: calls.append("get") or get(**kwargs))
+
+    AssignmentService.update_status(assignment_id, "bestätigt")
+    AssignmentService.delete_assignment(assignment_id)
+
+    assert calls == ["lock", "get", "lock", "get"]
@@ -0,0 +1,108 @@
+from datetime import datetime
+
+import pytest
+
+from app.models import schemas
+from app.services.availability_service import AvailabilityService
+
+
+def add(username, day, start_hour=8, end_hour=12, name="Frei"):
+    return AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+        name=name, start_time=datetime(2030, 3, day, start_hour), end_time=datetime(2030, 3, day, end_hour)
+    )).id
+
+
+def days_of(username):
+    return sorted(a.start_time.day for a in AvailabilityService.get_availabilities(username))
+
+
+@pytest.fixture
+def anna(make_user, login):
+    make_user("anna")
+    login("anna")
+    return "anna"
+
+
+def test_delete_range(client, anna):
+    ids = [add(anna, 3), add(anna, 4, name="Sperre"), add(anna, 10)]
+
+    response = client.delete("/api/availability/", params={"from": "2030-03-01", "to": "2030-03-05"})
+
+    assert response.status_code == 200
+    assert response.json() == {"ids": ids[:2], "count": 2}
+    assert days_of(anna) == [10]
+
+
+def test_delete_range_by_name(client, anna):
+    add(anna, 3)
+    sperre = add(anna, 4, name="Sperre")
+
+    response = client.delete("/api/availability/", params={"from": "2030-03-01", "to": "2030-03-05", "name": "Sperre"})
+
+    assert response.json() == {"ids": [sperre], "count": 1}
+    assert days_of(anna) == [3]
+
+
+def test_delete_range_rejects_reversed_dates(client, anna):
+    response = client.delete("/api/availability/", params={"from": "2030-03-05", "to": "2030-03-01"})
+
+    assert response.status_code == 400
+
+
+def test_shift_range(client, anna):
+    ids = [add(anna, 3), add(anna, 4), add(anna, 20)]
+
+    response = client.post("/api/availability/shift",
+                           params={"from": "2030-03-01", "to": "2030-03-05", "days": 7})
+
+    assert response.status_code == 200
+    assert response.json() == {"ids": ids[:2], "count": 2}
+    assert days_of(anna) == [10, 11, 20]
+    # Die Schedule-Abfragen sehen die verschobenen Zeiten
+    slots = client.get("/api/availability/free-slots", params={"from": "2030-03-10T00:00", "to": "2030-03-12T00:00"})
+    assert [slot["start"] for slot in slots.json()] == ["2030-03-10T08:00:00", "2030-03-11T08:00:00"]
+
+
+def test_shift_range_rejects_overlap(client, anna):
+    add(anna, 3)
+    add(anna, 10, start_hour=10, end_hour=14)
+
+    response = client.post("/api/availability/shift",
+                           params={"from": "2030-03-01", "to": "2030-03-05", "days": 7})
+
+    assert response.status_code == 400
+    assert days_of(anna) == [3, 10]
+
+
+def test_range_htmx_shift_renders_calendar(client, anna, render_templates):
+    add(anna, 3)
+
+    response = client.post("/api/availability/range-htmx", data={"from": "2030-03-01", "to": "2030-03-05", "days": "31"})
+
+    assert response.status_code == 200
+    assert [a.start_time for a in AvailabilityService.get_availabilities(anna)] == [datetime(2030, 4, 3, 8)]
+
+
+def test_range_htmx_delete_with_query_parameters(client, anna, render_templates):
+    add(anna, 3)
+
+    response = client.delete("/api/availability/range-htmx", params={"from": "2030-03-01", "to": "2030-03-05"})
+
+    assert response.status_code == 200
+    assert days_of(anna) == []
+
+
+@pytest.mark.parametrize("form, message", [
+    ({"from": "2030-03-01"}, "Ungültiger Zeitraum"),
+    ({"from": "2030-03-01", "to": "2030-03-05", "days": "0"}, "Verschiebung um 0 Tage"),
+    ({"from": "2030-03-01", "to": "2030-03-05", "days": "7"}, "überschneidet sich"),
+])
+def test_range_htmx_errors_are_client_errors(client, anna, render_templates, form, message):
+    add(anna, 3)
+    add(anna, 10)
+
+    response = client.post("/api/availability/range-htmx", data=form)
+
+    assert response.status_code == 400
+    assert message in response.text
+    assert days_of(anna) == [3, 10]
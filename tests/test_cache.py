@@ -0,0 +1,128 @@
+import time
+
+import pytest
+
+from app import cache as cache_module
+from app.cache import Cache, MemoryCache, SQLiteCache
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCache()
+    return SQLiteCache(str(tmp_path / "cache.sqlite"))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Feste Uhrzeit für die Ablaufzeiten, über now[0] verstellbar"""
+    now = [time.time()]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_set_get_delete(backend):
+    backend.set("a", b"1")
+
+    assert backend.get("a") == b"1"
+    backend.delete("a")
+    assert backend.get("a") is None
+
+
+def test_ttl_expiry(backend, clock):
+    backend.set("kurz", b"1", ttl=10)
+    backend.set("dauerhaft", b"2")
+
+    clock[0] += 9
+    assert backend.get("kurz") == b"1"
+    clock[0] += 2
+    assert backend.get("kurz") is None
+    assert backend.get("dauerhaft") == b"2"
+
+
+def test_memory_cache_evicts_least_recently_used():
+    backend = MemoryCache(max_entries=3)
+    for key in "abc":
+        backend.set(key, key.encode())
+    backend.get("a")
+
+    backend.set("d", b"d")
+
+    assert [backend.get(key) for key in "abcd"] == [b"a", None, b"c", b"d"]
+
+
+def test_memory_cache_never_evicts_counters():
+    backend = MemoryCache(max_entries=2)
+    backend.incr("version:x")
+    for key in "abcde":
+        backend.set(key, b"-")
+
+    assert backend.incr("version:x") == 2
+
+
+def test_memory_cache_purges_expired_entries(clock):
+    backend = MemoryCache()
+    backend.set("alt", b"1", ttl=1)
+    clock[0] += 2
+    for index in range(MemoryCache.PURGE_EVERY):
+        backend.set(f"neu{index}", b"-")
+
+    assert "alt" not in backend._data
+
+
+def test_invalidate_makes_old_keys_unreachable(backend):
+    cache = Cache(backend)
+    old_key = cache.key("users", "anna")
+    cache.set(old_key, b"alt")
+
+    assert cache.invalidate("users") == cache.version("users") == 1
+    new_key = cache.key("users", "anna")
+    assert new_key != old_key
+    assert cache.get(new_key) is None
+    # Andere Namensräume bleiben erhalten
+    assert cache.version("geo") == 0
+
+
+def test_changes_are_returned_in_order(backend):
+    cache = Cache(backend)
+    versions = [cache.publish("schedule", change) for change in (b"a", b"b", b"c")]
+
+    assert versions == [1, 2, 3]
+    assert cache.changes("schedule", 0, 3) == [b"a", b"b", b"c"]
+    assert cache.changes("schedule", 1, 3) == [b"b", b"c"]
+    assert cache.changes("schedule", 3, 3) == []
+
+
+def test_changes_report_gaps(backend):
+    cache = Cache(backend)
+    cache.publish("schedule", b"a")
+    # Invalidierung ohne Änderung, z. B. nach einer Archivierung
+    cache.invalidate("schedule")
+    cache.publish("schedule", b"c")
+
+    assert cache.changes("schedule", 0, 3) is None
+    assert cache.changes("schedule", 2, 3) == [b"c"]
+
+
+def test_expired_changes_are_a_gap(backend, clock):
+    cache = Cache(backend)
+    cache.publish("schedule", b"a")
+    clock[0] += cache_module.CACHE_CHANGE_TTL + 1
+
+    assert cache.changes("schedule", 0, 1) is None
+
+
+def test_sqlite_instances_share_one_file(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first, second = Cache(SQLiteCache(path)), Cache(SQLiteCache(path))
+
+    first.set(first.key("users", "anna"), b"1")
+    assert second.get(second.key("users", "anna")) == b"1"
+
+    second.invalidate("users")
+    assert first.version("users") == 1
+    assert first.get(first.key("users", "anna")) is None
+
+    first.publish("schedule", b"a")
+    second.publish("schedule", b"b")
+    assert second.changes("schedule", 0, 2) == first.changes("schedule", 0, 2) == [b"a", b"b"]
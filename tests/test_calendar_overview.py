@@ -0,0 +1,112 @@
+import json
+import re
+from datetime import datetime
+
+import pytest
+
+from app.models import schemas
+from app.services.availability_service import AvailabilityService
+
+
+def add(username, year, month, day, start_hour=8, end_hour=12, name="Frei"):
+    return AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+        name=name, start_time=datetime(year, month, day, start_hour), end_time=datetime(year, month, day, end_hour)
+    )).id
+
+
+def overview(client, **params):
+    response = client.get("/api/availability/overview", params=params)
+    assert response.status_code == 200
+    return response.text
+
+
+def month_titles(html):
+    return [" ".join(title.split()) for title in re.findall(r'class="overview-month-title"[^>]*>([^<]+)<', html)]
+
+
+def next_vals(html):
+    """hx-vals des Platzhalters, der den nächsten Abschnitt nachlädt (None ohne Platzhalter)"""
+    match = re.search(r'class="overview-month overview-loading".*?hx-vals=\'([^\']+)\'', html, re.S)
+    return json.loads(match.group(1)) if match else None
+
+
+def busy_days(html):
+    """(Monatstitel, Tag, Anzahl) für alle Tage mit Verfügbarkeiten"""
+    result = []
+    for block in re.split(r'(?=<div class="overview-month">)', html)[1:]:
+        title = month_titles(block)[0]
+        pattern = r'class="overview-day [^"]*\bbusy\b[^"]*"[^>]*>\s*(\d+)\s*(?:<sup>(\d+)</sup>)?'
+        for day, count in re.findall(pattern, block):
+            result.append((title, int(day), int(count or 1)))
+    return result
+
+
+@pytest.fixture
+def anna(make_user, login):
+    make_user("anna")
+    login("anna")
+    return "anna"
+
+
+def test_first_chunk_rolls_over_the_year(client, anna, render_templates):
+    html = overview(client, year=2030, month=11, months=12, chunk=3, state="BY")
+
+    assert month_titles(html) == ["November 2030", "December 2030", "January 2031"]
+    assert next_vals(html) == {"year": 2031, "month": 2, "months": 9, "chunk": 3, "state": "BY", "continued": True}
+    assert "Übersicht ab 11/2030" in html
+
+
+def test_following_chunks_count_down_the_remaining_months(client, anna, render_templates):
+    vals = {"year": 2030, "month": 11, "months": 12, "chunk": 5}
+    chunks = []
+    while vals:
+        html = overview(client, **vals)
+        chunks.append(month_titles(html))
+        if vals.get("continued"):
+            # Nachgeladene Abschnitte ersetzen nur den Platzhalter, ohne eigenen Rahmen
+            assert 'class="calendar-container"' not in html and "Übersicht ab" not in html
+        vals = next_vals(html)
+        assert vals is None or vals["months"] == 12 - sum(len(titles) for titles in chunks)
+
+    assert [len(titles) for titles in chunks] == [5, 5, 2]
+    assert chunks[1][0] == "April 2031"
+    assert chunks[-1] == ["September 2031", "October 2031"]
+
+
+@pytest.mark.parametrize("params, titles", [
+    ({"year": 2030, "month": 3, "months": 2, "chunk": 3}, ["March 2030", "April 2030"]),
+    ({"year": 2030, "month": 12, "months": 1}, ["December 2030"]),
+    ({"year": 2100, "month": 12, "months": 6, "chunk": 1}, ["December 2100"]),
+])
+def test_last_chunk_has_no_placeholder(client, anna, render_templates, params, titles):
+    html = overview(client, **params)
+
+    assert month_titles(html) == titles
+    assert next_vals(html) is None
+
+
+def test_availabilities_are_placed_on_their_days(client, anna, make_user, render_templates):
+    add(anna, 2030, 11, 30)
+    add(anna, 2030, 12, 24, 8, 10, name="Früh")
+    add(anna, 2030, 12, 24, 14, 18, name="Spät")
+    add(anna, 2031, 1, 31, 20, 23)
+    add(anna, 2031, 2, 1)
+    add(anna, 2030, 10, 31)
+    make_user("ben")
+    add("ben", 2030, 12, 5)
+
+    html = overview(client, year=2030, month=11, months=12, chunk=3)
+
+    assert busy_days(html) == [("November 2030", 30, 1), ("December 2030", 24, 2), ("January 2031", 31, 1)]
+    assert "08:00-10:00 Früh&#10;14:00-18:00 Spät&#10;" in html
+
+
+@pytest.mark.parametrize("params, status", [
+    ({"year": 2030, "month": 13}, 400),
+    ({"year": 2101, "month": 1}, 400),
+    ({"year": 2030, "month": 1, "state": "XY"}, 400),
+    ({"year": 2030, "month": 1, "chunk": 0}, 422),
+    ({"year": 2030, "month": 1, "months": 25}, 422),
+])
+def test_invalid_parameters_are_rejected(client, anna, render_templates, params, status):
+    assert client.get("/api/availability/overview", params=params).status_code == status
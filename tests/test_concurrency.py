@@ -0,0 +1,61 @@
+import threading
+from datetime import datetime, timedelta
+
+from pony.orm import db_session, select
+
+from app.models import entities
+from app.models import schemas
+from app.services.availability_service import AvailabilityService
+
+BASE = datetime(2030, 1, 1, 8)
+THREADS = 8
+SLOTS = 5
+
+
+def race(usernames):
+    """Alle Threads tragen gleichzeitig je Benutzer und Slot ein leicht versetztes Intervall ein"""
+    barrier = threading.Barrier(THREADS)
+    outcomes = []
+
+    def worker(number):
+        barrier.wait()
+        for slot in range(SLOTS):
+            for username in usernames:
+                start = BASE + timedelta(hours=2 * slot, minutes=number)
+                try:
+                    AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+                        name=f"t{number}", start_time=start, end_time=start + timedelta(hours=1)
+                    ))
+                    outcomes.append("angelegt")
+                except ValueError:
+                    outcomes.append("Konflikt")
+                except Exception as e:
+                    outcomes.append(f"{type(e).__name__}: {e}")
+
+    threads = [threading.Thread(target=worker, args=(number,)) for number in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def overlaps(username):
+    with db_session:
+        rows = sorted(select(
+            (a.start_time, a.end_time) for a in entities.Availability if a.user.username == username
+        ).without_distinct())
+    return len(rows), sum(1 for previous, current in zip(rows, rows[1:]) if current[0] < previous[1])
+
+
+def test_concurrent_writes_never_overlap(make_user):
+    usernames = ["anna", "ben", "carla"]
+    for username in usernames:
+        make_user(username)
+
+    outcomes = race(usernames)
+
+    # Ohne Benutzersperre entstehen hier je Benutzer Dutzende Überschneidungen
+    assert [overlaps(username) for username in usernames] == [(SLOTS, 0)] * len(usernames)
+    assert sorted(set(outcomes)) == ["Konflikt", "angelegt"]
+    assert outcomes.count("angelegt") == SLOTS * len(usernames)
@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app.models import schemas
+from app.services import coverage_service
+from app.services.assignment_service import AssignmentService
+from app.services.coverage_service import CoverageService, merge_ranges
+
+DAY = datetime(2030, 3, 4)
+
+
+def plan(username, project_id, start_hour, end_hour, status="geplant"):
+    AssignmentService.create_assignment(username, schemas.AssignmentCreate(
+        project_id=project_id, start_date=DAY.replace(hour=start_hour), end_date=DAY.replace(hour=end_hour),
+        status=status
+    ))
+
+
+@pytest.fixture(params=["snapshot", "database"])
+def source(request, monkeypatch):
+    """Besetzung aus dem Schedule-Snapshot oder (wie bei Zeiträumen im Archiv) aus der Datenbank"""
+    if request.param == "database":
+        monkeypatch.setattr(coverage_service, "reaches_archive", lambda horizon, start: True)
+    return request.param
+
+
+def test_coverage_counts_each_user_once(source, make_user, make_project):
+    make_user("anna")
+    make_user("ben")
+    project_id = make_project(required_staff=3)
+    # Zwei identische Einsätze desselben Benutzers und ein gleicher eines anderen
+    plan("anna", project_id, 8, 12)
+    plan("anna", project_id, 8, 12)
+    plan("ben", project_id, 8, 12)
+    plan("ben", project_id, 10, 12, status="storniert")
+
+    coverage, = CoverageService.get_coverage(DAY.replace(hour=6), DAY.replace(hour=14), "hour")
+
+    assert coverage.assigned == [0, 0, 2, 2, 2, 2, 0, 0]
+    assert coverage.required == [3] * 8
+    assert [(gap.start.hour, gap.end.hour, gap.missing) for gap in coverage.gaps] == [(6, 14, 3)]
+    # Während der Einsätze fehlt genau eine Person
+    booked, = CoverageService.get_coverage(DAY.replace(hour=8), DAY.replace(hour=12), "hour")
+    assert [(gap.start.hour, gap.end.hour, gap.missing) for gap in booked.gaps] == [(8, 12, 1)]
+
+
+def test_overlapping_assignments_of_one_user(source, make_user, make_project):
+    make_user("anna")
+    project_id = make_project(required_staff=1)
+    plan("anna", project_id, 8, 11)
+    plan("anna", project_id, 10, 12)
+    plan("anna", project_id, 12, 13)
+    plan("anna", project_id, 15, 16)
+
+    hourly, = CoverageService.get_coverage(DAY.replace(hour=8), DAY.replace(hour=16), "hour")
+    daily, = CoverageService.get_coverage(DAY, DAY.replace(day=5), "day")
+
+    assert hourly.assigned == [1, 1, 1, 1, 1, 0, 0, 1]
+    assert [(gap.start.hour, gap.end.hour) for gap in hourly.gaps] == [(13, 15)]
+    assert daily.assigned == [1]
+
+
+def test_merge_ranges_matches_counting_users():
+    rng = np.random.default_rng(3)
+    groups = rng.integers(0, 4, 200)
+    lows = rng.integers(0, 40, 200)
+    highs = lows + rng.integers(1, 6, 200)
+
+    merged_groups, merged_lows, merged_highs = merge_ranges(groups, lows, highs)
+
+    for group in range(4):
+        covered = np.zeros(50, dtype=int)
+        for low, high in zip(merged_lows[merged_groups == group], merged_highs[merged_groups == group]):
+            covered[low:high] += 1
+        expected = np.zeros(50, dtype=int)
+        for low, high in zip(lows[groups == group], highs[groups == group]):
+            expected[low:high] = 1
+        assert (covered == expected).all()
+
+
+def test_coverage_of_selected_projects(source, make_user, make_project):
+    make_user("anna")
+    first = make_project("Messe A", required_staff=1)
+    second = make_project("Messe B", required_staff=2)
+    plan("anna", second, 9, 11)
+    plan("anna", second, 9, 11)
+
+    coverage = CoverageService.get_coverage(DAY.replace(hour=8), DAY.replace(hour=12), "hour", project_ids=[second])
+
+    assert [c.project_id for c in coverage] == [second]
+    assert coverage[0].assigned == [0, 1, 1, 0]
+    assert first not in [c.project_id for c in coverage]
@@ -0,0 +1,101 @@
+import os
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from app.auth import oauth2
+from app.models import schemas
+from app.services import export_service
+from app.services.assignment_service import AssignmentService
+from app.services.export_service import ExportService, assignment_export_job, job_export_path, prune_exports
+
+
+@pytest.fixture
+def payroll(monkeypatch, make_user, login):
+    make_user("lohn")
+    monkeypatch.setattr(oauth2, "PAYROLL_USERNAMES", {"lohn"})
+    login("lohn")
+
+
+@pytest.fixture
+def assignment(make_user, make_project):
+    make_user("anna")
+    AssignmentService.create_assignment("anna", schemas.AssignmentCreate(
+        project_id=make_project(), start_date=datetime(2030, 3, 4, 8), end_date=datetime(2030, 3, 4, 12)
+    ))
+
+
+def export_job(job_id=1, **params):
+    return SimpleNamespace(job_id=job_id, progress=lambda *args: None, params={
+        "start_date": "2030-03-01", "end_date": "2030-03-31", "format": "csv", **params
+    })
+
+
+def test_export_requires_payroll(client, make_user, login):
+    make_user("anna")
+    login("anna")
+
+    response = client.get("/api/exports/assignments", params={"start_date": "2030-03-01", "end_date": "2030-03-31"})
+    job = client.post("/api/jobs/", json={"kind": "assignment_export", "params": {}})
+
+    assert response.status_code == 403
+    assert job.status_code == 403
+
+
+def test_export_for_payroll(client, payroll, assignment):
+    response = client.get("/api/exports/assignments", params={"start_date": "2030-03-01", "end_date": "2030-03-31"})
+
+    assert response.status_code == 200
+    header, row = response.content.decode("utf-8-sig").splitlines()
+    assert header.startswith("einsatz_id;benutzer")
+    assert row.split(";")[1:3] == ["anna", "Anna"]
+
+
+def test_inactive_payroll_user_is_rejected(client, payroll):
+    oauth2_user = client.app.dependency_overrides[oauth2.get_current_user]()
+    client.app.dependency_overrides[oauth2.get_current_user] = lambda: {**oauth2_user, "is_active": False}
+
+    response = client.get("/api/exports/assignments", params={"start_date": "2030-03-01", "end_date": "2030-03-31"})
+
+    assert response.status_code == 403
+
+
+def test_export_job_writes_file(assignment):
+    result = assignment_export_job(export_job())
+
+    assert result["rows"] == 1
+    assert os.path.exists(job_export_path(1, "csv"))
+    assert not os.path.exists(job_export_path(1, "csv") + ".part")
+
+
+def test_failed_export_job_removes_partial_file(assignment, monkeypatch):
+    def failing_write(path, *args, **kwargs):
+        with open(path, "wb") as target:
+            target.write(b"halb")
+        raise RuntimeError("Abbruch")
+
+    monkeypatch.setattr(ExportService, "write_file", failing_write)
+
+    with pytest.raises(RuntimeError):
+        assignment_export_job(export_job(job_id=2))
+    assert not os.path.exists(job_export_path(2, "csv") + ".part")
+    assert not os.path.exists(job_export_path(2, "csv"))
+
+
+def test_prune_keeps_newest_exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_service, "EXPORT_DIR", str(tmp_path))
+    now = time.time()
+    for job_id in range(5):
+        path = tmp_path / f"job_{job_id}.csv"
+        path.write_bytes(b"x")
+        os.utime(path, (now - 100 + job_id, now - 100 + job_id))
+    orphan = tmp_path / "job_9.csv.part"
+    orphan.write_bytes(b"x")
+    os.utime(orphan, (now - 2 * 3600, now - 2 * 3600))
+    (tmp_path / "job_10.csv.part").write_bytes(b"x")
+
+    prune_exports(keep=2)
+
+    assert sorted(os.listdir(tmp_path)) == ["job_10.csv.part", "job_3.csv", "job_4.csv"]
@@ -0,0 +1,149 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+from pony.orm import db_session
+
+from app.models import schemas
+from app.models.entities import Location, Project, Skill, User
+from app.services.availability_service import AvailabilityService
+from app.services.geo_service import GeoIndex, GeoService, PostalCodeTable, POSTAL_CODE_TABLE, geo_index
+
+DRESDEN_LEIPZIG_KM = 100.35
+
+
+@pytest.fixture
+def table():
+    return PostalCodeTable(POSTAL_CODE_TABLE)
+
+
+def add_location(name, postal_code):
+    return GeoService.create_location(schemas.LocationCreate(
+        name=name, address="Straße 1", city=name, postal_code=postal_code
+    )).id
+
+
+def set_home(user_id, postal_code):
+    with db_session:
+        User[user_id].home_postal_code = postal_code
+    geo_index.user_changed(user_id, postal_code)
+
+
+def rebuilt(version):
+    index = GeoIndex(geo_index.table)
+    index.build(version)
+    return index
+
+
+@pytest.mark.parametrize("postal_code, region", [
+    ("01067", "01"), (" 04109 ", "04"), ("0", None), ("", None), (None, None), ("00000", None),
+])
+def test_postal_code_lookup(table, postal_code, region):
+    expected = table.centroids[region] if region else None
+
+    assert table.lookup(postal_code) == expected
+
+
+def test_longest_prefix_wins(tmp_path):
+    path = tmp_path / "plz.csv"
+    path.write_text("prefix,latitude,longitude,name\n80,48.0,11.0,Region\n803,48.5,11.5,Innenstadt\n")
+    table = PostalCodeTable(str(path))
+
+    assert table.lookup("80331") == (48.5, 11.5)
+    assert table.lookup("80999") == (48.0, 11.0)
+    assert np.isnan(table.radians(["12345"])).all()
+
+
+def test_distance_matrices(make_user):
+    dresden, leipzig = add_location("Dresden", "01067"), add_location("Leipzig", "04109")
+    unknown = add_location("Irgendwo", "00000")
+    anna = make_user("anna", home_postal_code="04109")
+    index = geo_index.sync()
+
+    assert index.location_distance_km(dresden, leipzig) == pytest.approx(DRESDEN_LEIPZIG_KM, abs=0.1)
+    assert index.location_distance_km(leipzig, dresden) == index.location_distance_km(dresden, leipzig)
+    assert index.location_distance_km(dresden, dresden) == 0
+    assert index.location_distance_km(dresden, unknown) is None
+    assert index.user_distance_km(anna, dresden) == pytest.approx(DRESDEN_LEIPZIG_KM, abs=0.1)
+    assert index.user_distance_km(anna, leipzig) == 0
+
+
+def test_changes_are_applied_incrementally(make_user, monkeypatch):
+    dresden = add_location("Dresden", "01067")
+    users = [make_user(f"user{index}") for index in range(20)]
+    index = geo_index.sync()
+
+    monkeypatch.setattr(GeoIndex, "build", lambda self, version: pytest.fail("Neuaufbau"))
+    # Mehr Einträge als die anfängliche Reserve, damit die Matrizen wachsen
+    locations = [add_location(f"Ort{number}", "04109") for number in range(20)]
+    for user_id in users:
+        set_home(user_id, "10115")
+    set_home(users[0], "")
+    index.sync()
+    monkeypatch.undo()
+
+    fresh = rebuilt(index.version)
+    for location_id in [dresden] + locations:
+        assert index.location_distance_km(dresden, location_id) == fresh.location_distance_km(dresden, location_id)
+        for user_id in users:
+            assert index.user_distance_km(user_id, location_id) == fresh.user_distance_km(user_id, location_id)
+    assert index.user_distance_km(users[0], dresden) is None
+
+
+def test_change_by_another_worker_rebuilds(make_user):
+    other = GeoIndex(geo_index.table)
+    other.sync()
+    dresden = add_location("Dresden", "01067")
+
+    assert other.location_distance_km(dresden, dresden) is None
+    assert other.sync().location_distance_km(dresden, dresden) == 0
+
+
+@pytest.fixture
+def project():
+    """Projekt in Leipzig, das Kasse und Aufbau verlangt"""
+    with db_session:
+        location = Location(name="Messe", address="Messeallee 1", city="Leipzig", postal_code="04356")
+        project = Project(name="Buchmesse", location=location, start_date=datetime(2030, 1, 1),
+                          end_date=datetime(2030, 12, 31))
+        project.required_skills = [Skill(name="Kasse"), Skill(name="Aufbau")]
+        project.flush()
+        return project.id
+
+
+def add_user(make_user, username, postal_code, skills, **kwargs):
+    user_id = make_user(username, home_postal_code=postal_code, **kwargs)
+    with db_session:
+        User[user_id].skills = [Skill.get(name=name) or Skill(name=name) for name in skills]
+    return user_id
+
+
+def nearest(project_id, **kwargs):
+    return [(user.username, user.distance_km) for user in GeoService.get_nearest_eligible_users(project_id, **kwargs)]
+
+
+def test_nearest_users_need_all_skills(make_user, project):
+    add_user(make_user, "berlin", "10115", ["Kasse", "Aufbau", "Einlass"])
+    add_user(make_user, "dresden", "01067", ["Kasse", "Aufbau"])
+    add_user(make_user, "leipzig", "04109", ["Kasse"])
+    add_user(make_user, "inaktiv", "04109", ["Kasse", "Aufbau"], is_active=False)
+    add_user(make_user, "ohne_plz", "", ["Kasse", "Aufbau"])
+
+    result = nearest(project)
+
+    assert [username for username, _ in result] == ["dresden", "berlin"]
+    assert result[0][1] < result[1][1]
+    assert [username for username, _ in nearest(project, limit=1)] == ["dresden"]
+    assert GeoService.get_nearest_eligible_users(10 ** 6) is None
+
+
+def test_nearest_users_in_a_free_range(make_user, project):
+    add_user(make_user, "berlin", "10115", ["Kasse", "Aufbau"])
+    add_user(make_user, "dresden", "01067", ["Kasse", "Aufbau"])
+    AvailabilityService.create_availability("berlin", schemas.AvailabilityCreate(
+        name="Frei", start_time=datetime(2030, 3, 4, 8), end_time=datetime(2030, 3, 4, 18)
+    ))
+
+    result = nearest(project, start=datetime(2030, 3, 4, 9), end=datetime(2030, 3, 4, 17))
+
+    assert [username for username, _ in result] == ["berlin"]
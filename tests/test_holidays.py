@@ -0,0 +1,160 @@
+import re
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from app.services import holiday_service
+from app.services.holiday_service import easter_sunday, holidays, month_holidays, normalize_state, working_hours
+
+
+def hours(start, end, state=""):
+    return working_hours([start], [end], state)[0]
+
+
+def marked_days(html, css_class):
+    """Tage, deren Element im Kalender die CSS-Klasse css_class trägt"""
+    pattern = rf'class="(?:calendar|overview)-day [^"]*\b{css_class}\b[^"]*"[^>]*>\s*(?:<div[^>]*>\s*<span[^>]*>)?(\d+)'
+    return [int(day) for day in re.findall(pattern, html)]
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2000, date(2000, 4, 23)),
+    (2019, date(2019, 4, 21)),
+    (2024, date(2024, 3, 31)),
+    (2025, date(2025, 4, 20)),
+    (2026, date(2026, 4, 5)),
+    (2038, date(2038, 4, 25)),
+])
+def test_easter_sunday(year, expected):
+    assert easter_sunday(year) == expected
+
+
+def test_nationwide_holidays():
+    assert holidays(2026) == {
+        date(2026, 1, 1): "Neujahr",
+        date(2026, 4, 3): "Karfreitag",
+        date(2026, 4, 6): "Ostermontag",
+        date(2026, 5, 1): "Tag der Arbeit",
+        date(2026, 5, 14): "Christi Himmelfahrt",
+        date(2026, 5, 25): "Pfingstmontag",
+        date(2026, 10, 3): "Tag der Deutschen Einheit",
+        date(2026, 12, 25): "1. Weihnachtstag",
+        date(2026, 12, 26): "2. Weihnachtstag",
+    }
+
+
+@pytest.mark.parametrize("year, expected", [
+    (2024, date(2024, 11, 20)),
+    (2025, date(2025, 11, 19)),
+    (2026, date(2026, 11, 18)),
+    (2028, date(2028, 11, 22)),
+])
+def test_buss_und_bettag_only_in_saxony(year, expected):
+    assert holidays(year, "SN")[expected] == "Buß- und Bettag"
+    assert expected not in holidays(year, "BY")
+
+
+def test_state_specific_holidays():
+    corpus_christi = date(2026, 6, 4)
+
+    assert holidays(2026, "BY")[corpus_christi] == "Fronleichnam"
+    assert corpus_christi not in holidays(2026, "BE")
+    assert holidays(2026, "BE")[date(2026, 3, 8)] == "Internationaler Frauentag"
+    assert date(2018, 3, 8) not in holidays(2018, "BE")
+    assert date(2016, 10, 31) not in holidays(2016, "BY")
+    assert holidays(2017, "BY")[date(2017, 10, 31)] == "Reformationstag"
+
+
+def test_normalize_state(monkeypatch):
+    monkeypatch.setattr(holiday_service, "HOLIDAY_STATE", "SN")
+
+    assert normalize_state(" by ") == "BY"
+    assert normalize_state("") == ""
+    assert normalize_state(None) == "SN"
+    with pytest.raises(ValueError, match="Unbekanntes Bundesland"):
+        normalize_state("XY")
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    # Ganzer Arbeitstag, Teile davon und Zeiten außerhalb der Arbeitszeit
+    (datetime(2026, 5, 4), datetime(2026, 5, 5), 8),
+    (datetime(2026, 5, 4, 10), datetime(2026, 5, 4, 20), 6),
+    (datetime(2026, 5, 4, 17), datetime(2026, 5, 5, 7), 0),
+    (datetime(2026, 5, 4, 12), datetime(2026, 5, 4, 12), 0),
+    (datetime(2026, 5, 5), datetime(2026, 5, 4), 0),
+    # Mehrere Tage mit angeschnittenem erstem und letztem Tag
+    (datetime(2026, 5, 4, 12), datetime(2026, 5, 6, 10), 4 + 8 + 2),
+    # Feiertag (Fr), Wochenende, danach Mo-Do
+    (datetime(2026, 5, 1), datetime(2026, 5, 8), 32),
+    (datetime(2026, 5, 1, 8), datetime(2026, 5, 1, 16), 0),
+    (datetime(2026, 5, 2, 8), datetime(2026, 5, 3, 16), 0),
+    # Fronleichnam in Bayern
+    (datetime(2026, 6, 1), datetime(2026, 6, 8), 32),
+])
+def test_working_hours_in_bavaria(start, end, expected):
+    assert hours(start, end, "BY") == expected
+
+
+def test_working_hours_depend_on_the_state():
+    start, end = datetime(2026, 6, 4, 8), datetime(2026, 6, 4, 16)
+
+    assert hours(start, end, "BY") == 0
+    assert hours(start, end, "BE") == 8
+    assert hours(datetime(2026, 11, 18), datetime(2026, 11, 19), "SN") == 0
+    assert hours(datetime(2026, 11, 18), datetime(2026, 11, 19), "BY") == 8
+
+
+def test_working_hours_match_a_day_by_day_count():
+    starts = np.array(["2026-01-01T09:30", "2026-03-30T15:00", "2026-12-20T00:00"], dtype="datetime64[s]")
+    ends = np.array(["2026-02-15T11:00", "2026-04-14T08:30", "2027-01-10T12:00"], dtype="datetime64[s]")
+
+    expected = []
+    for start, end in zip(starts.astype(datetime), ends.astype(datetime)):
+        total = 0
+        for ordinal in range(start.toordinal(), end.toordinal() + 1):
+            day = date.fromordinal(ordinal)
+            if day.weekday() < 5 and day not in holidays(day.year, "NW"):
+                midnight = datetime.combine(day, datetime.min.time())
+                window_start, window_end = midnight.replace(hour=8), midnight.replace(hour=16)
+                total += max((min(end, window_end) - max(start, window_start)).total_seconds(), 0) / 3600
+        expected.append(total)
+
+    assert working_hours(starts, ends, "NW").tolist() == expected
+
+
+def test_month_holidays():
+    assert month_holidays(2026, 5, "BY") == {1: "Tag der Arbeit", 14: "Christi Himmelfahrt", 25: "Pfingstmontag"}
+    assert month_holidays(2026, 11, "SN") == {18: "Buß- und Bettag"}
+    assert month_holidays(2026, 11, "BE") == {}
+
+
+@pytest.fixture
+def anna(make_user, login):
+    make_user("anna")
+    login("anna")
+    return "anna"
+
+
+def test_calendar_marks_holidays_of_the_state(client, anna, render_templates):
+    html = client.get("/api/availability/calendar", params={"year": 2026, "month": 6, "state": "by"}).text
+
+    assert marked_days(html, "holiday") == [4]
+    assert "Fronleichnam" in html
+    assert marked_days(client.get("/api/availability/calendar",
+                                  params={"year": 2026, "month": 6, "state": "BE"}).text, "holiday") == []
+
+
+def test_calendar_rejects_unknown_state(client, anna, render_templates):
+    response = client.get("/api/availability/calendar", params={"year": 2026, "month": 6, "state": "XY"})
+
+    assert response.status_code == 400
+    assert "Unbekanntes Bundesland" in response.text
+
+
+def test_overview_marks_holidays_of_the_state(client, anna, render_templates):
+    html = client.get("/api/availability/overview",
+                      params={"year": 2026, "month": 11, "months": 1, "chunk": 1, "state": "SN"}).text
+
+    assert marked_days(html, "holiday") == [18]
+    assert 'title="Buß- und Bettag' in html
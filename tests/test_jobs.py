@@ -0,0 +1,184 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from pony.orm import db_session
+
+from app.models import schemas
+from app.models.entities import Job
+from app.services import job_service
+from app.services.job_service import (
+    JOB_DONE, JOB_FAILED, JOB_MAX_ATTEMPTS, JOB_QUEUED, JOB_RUNNING,
+    JobContext, JobRunner, JobService, _finish, execute_job,
+)
+
+
+def enqueue(username="anna", kind="archive", **params):
+    return JobService.enqueue(username, schemas.JobCreate(kind=kind, params=params)).id
+
+
+def job(job_id):
+    with db_session:
+        return Job[job_id].to_dict()
+
+
+def expire_lease(job_id):
+    with db_session:
+        Job[job_id].lease_expires_at = datetime.now() - timedelta(seconds=1)
+
+
+@pytest.fixture
+def anna(make_user):
+    make_user("anna")
+    return "anna"
+
+
+def test_enqueue_claim_progress_finish(anna, monkeypatch):
+    job_id = enqueue(cutoff="2000-01-01")
+    assert job(job_id)["status"] == JOB_QUEUED
+
+    claimed_id, token = JobService.claim_next()
+    claimed = job(job_id)
+    assert claimed_id == job_id
+    assert (claimed["status"], claimed["attempts"], claimed["lease_token"]) == (JOB_RUNNING, 1, token)
+
+    def sample_job(context: JobContext):
+        context.progress(0.5, "Halbzeit")
+        seen.append(job(context.job_id))
+        return {"params": context.params, "username": context.username}
+
+    seen = []
+    monkeypatch.setattr(job_service, "resolve_job", lambda kind: sample_job)
+    execute_job(job_id, token)
+
+    assert (seen[0]["progress"], seen[0]["message"]) == (0.5, "Halbzeit")
+    assert seen[0]["lease_expires_at"] > claimed["lease_expires_at"]
+    finished = job(job_id)
+    assert (finished["status"], finished["progress"], finished["lease_token"]) == (JOB_DONE, 1.0, None)
+    assert finished["result"] == {"params": {"cutoff": "2000-01-01"}, "username": "anna"}
+    assert JobService.claim_next() is None
+
+
+def test_failing_job_records_the_error(anna, monkeypatch):
+    job_id = enqueue()
+    _, token = JobService.claim_next()
+
+    def failing_job(context):
+        raise RuntimeError("kaputt")
+
+    monkeypatch.setattr(job_service, "resolve_job", lambda kind: failing_job)
+    execute_job(job_id, token)
+
+    assert (job(job_id)["status"], job(job_id)["error"]) == (JOB_FAILED, "RuntimeError: kaputt")
+
+
+def test_claimed_job_is_not_claimed_twice(anna):
+    first = enqueue()
+    second = enqueue()
+
+    assert JobService.claim_next()[0] == first
+    assert JobService.claim_next()[0] == second
+    assert JobService.claim_next() is None
+
+
+def test_concurrent_claims_hand_out_a_job_once(anna):
+    job_id = enqueue()
+    barrier = threading.Barrier(8)
+    claims = []
+
+    def claim():
+        barrier.wait()
+        claims.append(JobService.claim_next())
+
+    threads = [threading.Thread(target=claim) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [c[0] for c in claims if c is not None] == [job_id]
+    assert job(job_id)["attempts"] == 1
+
+
+def test_expired_lease_is_reclaimed(anna):
+    job_id = enqueue()
+    _, old_token = JobService.claim_next()
+    JobService.renew_lease(job_id, old_token)
+    assert JobService.claim_next() is None
+
+    expire_lease(job_id)
+    claimed_id, new_token = JobService.claim_next()
+
+    assert (claimed_id, job(job_id)["attempts"]) == (job_id, 2)
+    assert new_token != old_token
+    # Der abgelöste Lauf kann weder Fortschritt melden noch abschließen
+    JobContext(job_id, old_token, "anna", {}).progress(1.0, "alt")
+    _finish(job_id, old_token, JOB_FAILED, error="alt")
+    JobService.renew_lease(job_id, old_token)
+    assert (job(job_id)["status"], job(job_id)["message"], job(job_id)["lease_token"]) == (JOB_RUNNING, None, new_token)
+
+
+def test_job_fails_after_max_attempts(anna):
+    job_id = enqueue()
+    for _ in range(JOB_MAX_ATTEMPTS):
+        assert JobService.claim_next()[0] == job_id
+        expire_lease(job_id)
+
+    assert JobService.claim_next() is None
+    failed = job(job_id)
+    assert (failed["status"], failed["attempts"], failed["lease_token"]) == (JOB_FAILED, JOB_MAX_ATTEMPTS, None)
+    assert failed["error"] == f"Abgebrochen nach {JOB_MAX_ATTEMPTS} Versuchen"
+    assert JobService.claim_next() is None
+
+
+def test_jobs_are_only_visible_to_their_owner(client, anna, make_user, login, render_templates):
+    make_user("ben")
+    login(anna)
+    job_id = client.post("/api/jobs/", json={"kind": "archive", "params": {}}).json()["id"]
+
+    assert client.get(f"/api/jobs/{job_id}").json()["status"] == JOB_QUEUED
+    assert 'hx-get="/api/jobs/%d/progress-htmx"' % job_id in client.get(f"/api/jobs/{job_id}/progress-htmx").text
+    login("ben")
+    assert client.get(f"/api/jobs/{job_id}").status_code == 404
+    assert "Auftrag nicht gefunden" in client.get(f"/api/jobs/{job_id}/progress-htmx").text
+
+
+def test_progress_partial_stops_polling_when_finished(client, anna, login, render_templates):
+    login(anna)
+    job_id = enqueue()
+    _, token = JobService.claim_next()
+    _finish(job_id, token, JOB_FAILED, error="kaputt")
+
+    html = client.get(f"/api/jobs/{job_id}/progress-htmx").text
+
+    assert "hx-get" not in html
+    assert "kaputt" in html
+
+
+def test_unknown_kind_is_rejected(client, anna, login):
+    login(anna)
+
+    assert client.post("/api/jobs/", json={"kind": "unbekannt", "params": {}}).status_code == 400
+
+
+def test_runner_executes_jobs_in_the_pool(anna):
+    job_id = enqueue(cutoff="2000-01-01")
+
+    async def run():
+        runner = JobRunner(concurrency=1, processes=1)
+        task = asyncio.create_task(runner.run())
+        try:
+            for _ in range(600):
+                if job(job_id)["status"] in (JOB_DONE, JOB_FAILED):
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+
+    finished = job(job_id)
+    assert finished["status"] == JOB_DONE, finished["error"]
+    assert finished["result"] == {"availabilities": 0, "assignments": 0}
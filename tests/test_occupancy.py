@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+from pony.orm import db_session
+
+from app.models import schemas
+from app.models.entities import User, Availability, OccupancySlots
+from app.services.availability_service import AvailabilityService
+from app.services.occupancy_service import OccupancyService
+
+
+def add(username, start, end):
+    return AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+        name="Frei", start_time=start, end_time=end
+    )).id
+
+
+def may_overlap(user_id, start, end):
+    with db_session:
+        return OccupancyService.may_overlap(user_id, start, end)
+
+
+def test_overlap_check_with_bitmaps(make_user):
+    user_id = make_user("anna")
+    add("anna", datetime(2030, 3, 4, 8), datetime(2030, 3, 4, 12))
+
+    assert may_overlap(user_id, datetime(2030, 3, 4, 14), datetime(2030, 3, 4, 16)) is False
+    assert may_overlap(user_id, datetime(2030, 3, 4, 11), datetime(2030, 3, 4, 13)) is True
+    with pytest.raises(ValueError, match="überschneidet"):
+        add("anna", datetime(2030, 3, 4, 11), datetime(2030, 3, 4, 13))
+    # Angrenzende Zeiten berühren denselben Slot, die genaue Prüfung lässt sie zu
+    add("anna", datetime(2030, 3, 4, 12), datetime(2030, 3, 4, 14))
+
+
+def test_overlap_check_without_bitmaps(make_user):
+    user_id = make_user("anna")
+    # Bestand aus der Zeit vor den Bitmaps: Verfügbarkeit ohne Belegungszeile
+    with db_session:
+        Availability(name="Frei", user=User[user_id],
+                     start_time=datetime(2030, 3, 4, 8), end_time=datetime(2030, 3, 4, 12))
+
+    assert may_overlap(user_id, datetime(2030, 3, 4, 14), datetime(2030, 3, 4, 16)) is True
+    with pytest.raises(ValueError, match="überschneidet"):
+        add("anna", datetime(2030, 3, 4, 11), datetime(2030, 3, 4, 13))
+    add("anna", datetime(2030, 3, 4, 14), datetime(2030, 3, 4, 16))
+
+
+def test_overlap_check_with_bitmap_missing_for_one_month(make_user):
+    user_id = make_user("anna")
+    add("anna", datetime(2030, 3, 4, 8), datetime(2030, 3, 4, 12))
+    with db_session:
+        Availability(name="Frei", user=User[user_id],
+                     start_time=datetime(2030, 4, 1, 8), end_time=datetime(2030, 4, 1, 12))
+
+    # März ist frei, der April hat keine Bitmap
+    assert may_overlap(user_id, datetime(2030, 3, 31, 20), datetime(2030, 4, 1, 10)) is True
+    with pytest.raises(ValueError, match="überschneidet"):
+        add("anna", datetime(2030, 3, 31, 20), datetime(2030, 4, 1, 10))
+
+
+def test_emptied_month_keeps_an_empty_bitmap(make_user):
+    user_id = make_user("anna")
+    availability_id = add("anna", datetime(2030, 3, 4, 8), datetime(2030, 3, 4, 12))
+
+    AvailabilityService.delete_availability(availability_id, "anna")
+
+    with db_session:
+        assert OccupancySlots.get(user=User[user_id], year=2030, month=3) is not None
+    assert may_overlap(user_id, datetime(2030, 3, 4, 8), datetime(2030, 3, 4, 12)) is False
+    add("anna", datetime(2030, 3, 4, 8), datetime(2030, 3, 4, 12))
@@ -0,0 +1,131 @@
+import asyncio
+import json
+
+import pytest
+from pony.orm import db_session
+
+from app import overload
+from app.database import db
+from app.overload import OverloadMiddleware, check_deadline, statement_timeout_ms
+
+# Zählt ohne Ende, bis SQLite die Abfrage über den Progress-Handler abbricht
+ENDLESS_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+async def call(app, path="/api/test"):
+    """Führt eine Anfrage gegen eine ASGI-Anwendung aus: (Status, Header, Body)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "method": "GET", "path": path, "headers": []}, receive, send)
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return start["status"], dict(start["headers"]), body
+
+
+async def ok(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture
+def short_deadline(monkeypatch):
+    monkeypatch.setattr(overload, "REQUEST_DEADLINE_SECONDS", 0.05)
+    monkeypatch.setattr(overload, "REQUEST_DEADLINES", [])
+
+
+def test_request_within_limits_passes():
+    status, _, body = asyncio.run(call(OverloadMiddleware(ok)))
+
+    assert (status, body) == (200, b"ok")
+
+
+def test_sqlite_query_over_deadline_returns_504(short_deadline):
+    async def slow_query(scope, receive, send):
+        with db_session:
+            db.execute(ENDLESS_QUERY)
+        await ok(scope, receive, send)
+
+    before = overload.metrics.statement_timeouts
+    status, _, body = asyncio.run(call(OverloadMiddleware(slow_query)))
+
+    assert status == 504
+    assert json.loads(body) == {"detail": "Zeitlimit der Anfrage überschritten"}
+    assert overload.metrics.statement_timeouts == before + 1
+
+
+def test_python_loop_over_deadline_returns_504(short_deadline):
+    async def slow_loop(scope, receive, send):
+        while True:
+            check_deadline()
+            await asyncio.sleep(0.01)
+
+    status, _, _ = asyncio.run(call(OverloadMiddleware(slow_loop)))
+
+    assert status == 504
+
+
+def test_errors_within_deadline_are_not_masked(short_deadline):
+    async def failing(scope, receive, send):
+        raise RuntimeError("Fehler")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(call(OverloadMiddleware(failing)))
+
+
+def test_deadline_after_response_start_is_not_replaced(short_deadline):
+    async def streaming(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await asyncio.sleep(0.1)
+        check_deadline()
+
+    with pytest.raises(overload.DeadlineExceeded):
+        asyncio.run(call(OverloadMiddleware(streaming)))
+
+
+def test_requests_over_the_limit_are_shed_with_503(monkeypatch):
+    monkeypatch.setattr(overload, "CONCURRENCY_LIMITS", [("/api/slow", 1)])
+    monkeypatch.setattr(overload, "QUEUE_WAIT_SECONDS", 0.05)
+
+    async def run():
+        release = asyncio.Event()
+
+        async def slow(scope, receive, send):
+            await release.wait()
+            await ok(scope, receive, send)
+
+        middleware = OverloadMiddleware(slow)
+        first = asyncio.create_task(call(middleware, "/api/slow"))
+        await asyncio.sleep(0)
+        second = await call(middleware, "/api/slow")
+        release.set()
+        return await first, second
+
+    (first_status, _, _), (status, headers, body) = asyncio.run(run())
+
+    assert first_status == 200
+    assert status == 503
+    assert headers[b"retry-after"] == str(overload.SHED_RETRY_AFTER_SECONDS).encode()
+    assert json.loads(body)["detail"].startswith("Server ausgelastet")
+
+
+def test_statement_timeout_follows_remaining_time():
+    assert statement_timeout_ms() == 0
+
+    async def run():
+        seen = []
+
+        async def record(scope, receive, send):
+            seen.append(statement_timeout_ms())
+            await ok(scope, receive, send)
+
+        await call(OverloadMiddleware(record))
+        return seen
+
+    timeout, = asyncio.run(run())
+    assert 0 < timeout <= overload.REQUEST_DEADLINE_SECONDS * 1000
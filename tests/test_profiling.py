@@ -0,0 +1,91 @@
+import pytest
+from pony.orm import db_session
+
+from app import profiling
+from app.auth import oauth2
+from app.auth.oauth2 import create_access_token
+from app.cache import SQLiteCache, cache
+from app.models.entities import User
+from app.profiling import ProfilingMiddleware, sampling_settings
+from app.server import PreforkServer
+
+
+def headers(username, **extra):
+    return {"Authorization": f"Bearer {create_access_token({'sub': username})}", **extra}
+
+
+def scope(username):
+    return {"type": "http", "path": "/", "headers": [(b"authorization", headers(username)["Authorization"].encode())]}
+
+
+@pytest.fixture
+def admin(monkeypatch, make_user):
+    make_user("chefin")
+    monkeypatch.setattr(oauth2, "ADMIN_USERNAMES", {"chefin"})
+    return "chefin"
+
+
+@pytest.fixture
+def shared_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(cache, "backend", SQLiteCache(str(tmp_path / "cache.sqlite")))
+    yield
+    sampling_settings.set(None, ttl=0)
+
+
+def test_username_requires_active_user(make_user):
+    make_user("anna")
+    make_user("ben", is_active=False)
+    middleware = ProfilingMiddleware(None)
+
+    assert middleware._username(scope("anna")) == "anna"
+    assert middleware._username(scope("ben")) is None
+    assert middleware._username(scope("niemand")) is None
+
+
+def test_explicit_profile_only_for_active_admins(client, admin):
+    profiled = client.get("/api/nicht-vorhanden", headers=headers(admin, **{"X-Profile": "1"}))
+    with db_session:
+        User.get(username=admin).delete()
+    cache.invalidate(oauth2.user_cache_namespace(admin))
+    deleted = client.get("/api/nicht-vorhanden", headers=headers(admin, **{"X-Profile": "1"}))
+
+    assert "x-profile-id" in profiled.headers
+    assert "x-profile-id" not in deleted.headers
+
+
+def test_inactive_admin_is_rejected(client, admin, login):
+    with db_session:
+        User.get(username=admin).is_active = False
+    login(admin)
+
+    assert client.get("/api/profiles/").status_code == 403
+
+
+def test_sampling_requires_shared_cache(client, admin, login):
+    login(admin)
+
+    response = client.put("/api/profiles/sampling", json={"rate": 1})
+
+    assert response.status_code == 409
+    assert sampling_settings.get() is None
+
+
+def test_sampling_for_usernames(client, admin, login, make_user, shared_cache):
+    make_user("anna")
+    make_user("ben", is_active=False)
+    login(admin)
+
+    assert client.put("/api/profiles/sampling", json={"rate": 1, "usernames": ["anna", "ben"]}).status_code == 200
+    # Die folgenden Anfragen melden sich über das Token an
+    client.app.dependency_overrides.clear()
+    anna = client.get("/api/nicht-vorhanden", headers=headers("anna"))
+    ben = client.get("/api/nicht-vorhanden", headers=headers("ben"))
+
+    assert "x-profile-id" in anna.headers
+    assert "x-profile-id" not in ben.headers
+    assert profiling.profile_store.list()[0]["username"] == "anna"
+
+
+def test_prefork_refuses_process_local_cache():
+    with pytest.raises(RuntimeError):
+        PreforkServer("app.main:app", workers=2).run()
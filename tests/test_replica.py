@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+import pytest
+from pony.orm import Database, db_session
+from pony.orm.dbapiprovider import OperationalError
+
+from app import cache as cache_module
+from app import database
+from app import replica
+from app.models import entities
+from app.models import schemas
+from app.replica import REPLICA_STICKY_SECONDS, mark_write, read_entities
+from app.services.availability_service import AvailabilityService
+
+
+def add_availability(username, day):
+    return AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+        name="Frei", start_time=datetime(2030, 3, day, 8), end_time=datetime(2030, 3, day, 12)
+    )).id
+
+
+def replicate(path):
+    """Kopiert den aktuellen Stand der Primärdatenbank in die Replikatdatei"""
+    with sqlite3.connect(os.environ["DB_PATH"]) as source, sqlite3.connect(path) as target:
+        source.backup(target)
+
+
+@pytest.fixture
+def use_replica(tmp_path, monkeypatch):
+    """Bindet ein Lesereplikat auf einer zweiten SQLite-Datei mit dem bisherigen Stand der Primärdatenbank.
+
+    Das globale replica_db lässt sich nur einmal binden, daher eine eigene
+    Database mit denselben Entitäten und Verbindungs-Hooks.
+    """
+    def bind():
+        path = str(tmp_path / "replica.sqlite")
+        replicate(path)
+        replica_db = Database()
+        for func, provider in database.replica_db._on_connect_funcs:
+            replica_db.on_connect(provider=provider)(func)
+        replica_entities = entities.define_entities(replica_db)
+        replica_db.bind(provider="sqlite", filename=path)
+        replica_db.generate_mapping(create_tables=False)
+        monkeypatch.setattr(replica, "replica_db", replica_db)
+        monkeypatch.setattr(entities, "replica", replica_entities)
+        return replica_entities
+    return bind
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_without_replica_everything_reads_the_primary():
+    assert read_entities("anna") is entities
+    assert read_entities() is entities
+
+
+def test_reads_go_to_the_replica(use_replica):
+    replica_entities = use_replica()
+
+    assert read_entities("anna") is replica_entities
+    assert read_entities() is replica_entities
+
+
+def test_own_writes_stick_to_the_primary(use_replica, clock):
+    replica_entities = use_replica()
+    mark_write("anna")
+
+    assert read_entities("anna") is entities
+    assert read_entities("ben") is replica_entities
+    clock[0] += REPLICA_STICKY_SECONDS - 1
+    assert read_entities("anna") is entities
+    clock[0] += 2
+    assert read_entities("anna") is replica_entities
+
+
+def test_replica_is_read_only(make_user, use_replica):
+    make_user("anna")
+    replica_entities = use_replica()
+
+    with pytest.raises(OperationalError, match="readonly"):
+        with db_session:
+            replica.replica_db.execute('UPDATE "User" SET full_name = \'Geändert\'')
+    with db_session:
+        assert replica_entities.User.get(username="anna").full_name == "Anna"
+
+
+def test_endpoint_reads_replicated_data(client, make_user, login, use_replica):
+    make_user("anna")
+    replicated = add_availability("anna", 3)
+    use_replica()
+    login("anna")
+
+    # Nur bis hierher repliziert, das Replikat sieht weitere Änderungen nicht
+    with db_session:
+        entities.Availability[replicated].name = "Nicht repliziert"
+    assert [(a["id"], a["name"]) for a in client.get("/api/availability/").json()] == [(replicated, "Frei")]
+
+    # Nach dem eigenen Schreibzugriff liest der Benutzer von der Primärdatenbank
+    added = add_availability("anna", 4)
+    assert [a["id"] for a in client.get("/api/availability/").json()] == [replicated, added]
@@ -0,0 +1,146 @@
+import time
+from datetime import date, datetime
+
+import pytest
+from pony.orm import db_session
+
+from app.cache import cache
+from app.models import schemas
+from app.models.entities import User
+from app.services.assignment_service import AssignmentService
+from app.services.availability_service import AvailabilityService
+from app.services.schedule_service import SCHEDULE_CACHE_NAMESPACE, ScheduleService, ScheduleSnapshot, from_epoch
+
+DAY = datetime(2030, 3, 4)
+
+
+def add_availability(username, day=4, start_hour=8, end_hour=12):
+    return AvailabilityService.create_availability(username, schemas.AvailabilityCreate(
+        name="Frei", start_time=datetime(2030, 3, day, start_hour), end_time=datetime(2030, 3, day, end_hour)
+    )).id
+
+
+def add_assignment(username, project_id, start_hour, end_hour):
+    return AssignmentService.create_assignment(username, schemas.AssignmentCreate(
+        project_id=project_id, start_date=DAY.replace(hour=start_hour), end_date=DAY.replace(hour=end_hour)
+    )).id
+
+
+def hours(slots):
+    return [(slot.start.hour, slot.end.hour) for slot in slots]
+
+
+def free_usernames(start_hour, end_hour, snapshot=None):
+    if snapshot is None:
+        users = ScheduleService.get_free_users(DAY.replace(hour=start_hour), DAY.replace(hour=end_hour))
+        return [user.username for user in users]
+    user_ids = snapshot.free_users(DAY.replace(hour=start_hour), DAY.replace(hour=end_hour)).tolist()
+    with db_session:
+        return sorted(User[user_id].username for user_id in user_ids)
+
+
+def state(snapshot):
+    """Vergleichbarer Inhalt eines Snapshots (nur aktive Zeilen)"""
+    result = {}
+    for name in ("availabilities", "assignments"):
+        columns = getattr(snapshot, name)
+        live = columns.live[:columns.size]
+        result[name] = [
+            (interval_id, user_id, project_id, from_epoch(start), from_epoch(end))
+            for interval_id, user_id, project_id, start, end in zip(
+                *(getattr(columns, column)[:columns.size][live].tolist()
+                  for column in ("ids", "users", "projects", "starts", "ends")))
+        ]
+    return result
+
+
+def fresh():
+    snapshot = ScheduleSnapshot()
+    return snapshot.sync()
+
+
+def test_free_slots_exclude_assignments(make_user, make_project):
+    make_user("anna")
+    add_availability("anna")
+    add_availability("anna", start_hour=14, end_hour=18)
+    add_assignment("anna", make_project(), 9, 10)
+
+    slots = ScheduleService.get_free_slots("anna", DAY, DAY.replace(hour=16))
+
+    assert hours(slots) == [(8, 9), (10, 12), (14, 16)]
+    assert ScheduleService.get_free_slots("niemand", DAY, DAY.replace(hour=16)) is None
+
+
+def test_free_users_need_the_whole_range(make_user, make_project):
+    for username in ("anna", "ben", "carl", "dora"):
+        make_user(username, is_active=username != "dora")
+        add_availability(username)
+    add_availability("carl", day=5)
+    add_assignment("ben", make_project(), 11, 12)
+
+    assert free_usernames(8, 11) == ["anna", "ben", "carl"]
+    assert free_usernames(8, 12) == ["anna", "carl"]
+    assert free_usernames(7, 12) == []
+    with pytest.raises(ValueError):
+        free_usernames(12, 8)
+
+
+def test_other_worker_replays_changes(make_user, make_project, monkeypatch):
+    anna, ben = make_user("anna"), make_user("ben")
+    project_id = make_project()
+    other = fresh()
+
+    add_availability("anna")
+    add_availability("anna", day=5)
+    add_availability("ben")
+    AvailabilityService.shift_availabilities_in_range("anna", date(2030, 3, 5), date(2030, 3, 5), 1)
+    assignment_id = add_assignment("ben", project_id, 8, 9)
+    AssignmentService.update_status(assignment_id, "storniert")
+    add_assignment("anna", project_id, 11, 12)
+    with db_session:
+        User[ben].delete()
+    other.user_removed(ben)
+
+    # Nur das Änderungsprotokoll, kein Neuaufbau
+    monkeypatch.setattr(ScheduleSnapshot, "build", lambda *args: pytest.fail("Neuaufbau"))
+    other.sync()
+    monkeypatch.undo()
+
+    assert other.version == cache.version(SCHEDULE_CACHE_NAMESPACE)
+    assert state(other) == state(fresh())
+    assert other.free_slots(anna, datetime(2030, 3, 6), datetime(2030, 3, 7)) != []
+    assert free_usernames(8, 11, other) == ["anna"]
+
+
+def test_replay_after_rebuild_is_idempotent(make_user):
+    make_user("anna")
+    add_availability("anna")
+    before = cache.version(SCHEDULE_CACHE_NAMESPACE)
+    AvailabilityService.shift_availabilities_in_range("anna", date(2030, 3, 4), date(2030, 3, 4), 1)
+
+    # Der Neuaufbau enthält die Verschiebung schon, das Protokoll wird trotzdem nachgespielt
+    other = fresh()
+    other.version = before
+    other.sync()
+
+    assert state(other) == state(fresh())
+    assert [row[3].day for row in state(other)["availabilities"]] == [5]
+
+
+def test_gap_rebuilds_in_background(make_user):
+    make_user("anna")
+    add_availability("anna")
+    other = fresh()
+    add_availability("anna", day=5)
+    cache.backend.delete(f"changes:{SCHEDULE_CACHE_NAMESPACE}:{cache.version(SCHEDULE_CACHE_NAMESPACE)}")
+
+    # Bis zum Abschluss des Neuaufbaus gilt der bisherige Stand
+    old = state(other)
+    other.sync()
+    deadline = time.monotonic() + 5
+    while other._rebuilding and time.monotonic() < deadline:
+        assert state(other) in (old, state(fresh()))
+        time.sleep(0.01)
+
+    assert other.version == cache.version(SCHEDULE_CACHE_NAMESPACE)
+    assert len(state(other.sync())["availabilities"]) == 2
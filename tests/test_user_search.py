@@ -0,0 +1,126 @@
+import random
+
+import pytest
+from pony.orm import db_session
+
+from app.cache import cache
+from app.models.entities import User, Skill
+from app.services.user_search_service import USER_INDEX_NAMESPACE, UserSearchIndex
+
+QUERIES = [
+    {}, {"q": "an"}, {"q": "ann"}, {"q": "example"}, {"q": "nna mu"}, {"skills": ["Kasse"]},
+    {"active": False}, {"q": "e", "active": True}, {"skills": ["kasse", "Aufbau"]},
+]
+
+
+def results(index, **query):
+    """Alle Seiten einer Suche (Seitengröße 2, damit der Cursor mitgeprüft wird)"""
+    usernames, cursor = [], None
+    while True:
+        users, cursor = index.search(cursor=cursor, limit=2, **query)
+        usernames.extend(user.username for user in users)
+        if cursor is None:
+            return usernames
+
+
+def assert_same_results(index):
+    rebuilt = UserSearchIndex()
+    rebuilt.build(cache.version(USER_INDEX_NAMESPACE))
+    for query in QUERIES:
+        assert results(index, **query) == results(rebuilt, **query), query
+
+
+def add_user(index, username, full_name, skills=()):
+    with db_session:
+        user = User(username=username, email=f"{username}@example.com", full_name=full_name, hashed_password="-")
+        for name in skills:
+            user.skills.add(Skill.get(name=name) or Skill(name=name))
+        user.flush()
+        user_id = user.id
+    index.user_changed(user_id)
+    return user_id
+
+
+def test_search_pages_in_username_order(make_user):
+    for username in ("dora", "anna", "carl", "ben", "annabell"):
+        make_user(username)
+    index = UserSearchIndex().sync()
+
+    assert results(index) == ["anna", "annabell", "ben", "carl", "dora"]
+    assert results(index, q="ann") == ["anna", "annabell"]
+    assert results(index, q="an") == ["anna", "annabell"]
+
+
+def test_changes_are_replayed_without_rebuild(make_user, monkeypatch):
+    make_user("carl")
+    worker = UserSearchIndex().sync()
+    other = UserSearchIndex().sync()
+
+    first = add_user(worker, "anna", "Anna Muster", skills=["Kasse"])
+    add_user(worker, "ben", "Ben Berg")
+    with db_session:
+        User[first].full_name = "Anna Zeller"
+        User[first].is_active = False
+    worker.user_changed(first)
+
+    # Beide Worker spielen nur das Änderungsprotokoll nach
+    monkeypatch.setattr(UserSearchIndex, "build", lambda self, version: pytest.fail("Neuaufbau"))
+    for index in (worker, other):
+        index.sync()
+        assert results(index) == ["anna", "ben", "carl"]
+        assert results(index, q="zeller") == ["anna"]
+        assert results(index, q="muster") == []
+        assert results(index, skills=["kasse"], active=False) == ["anna"]
+    monkeypatch.undo()
+    assert_same_results(worker)
+
+
+def test_deleted_users_are_removed(make_user):
+    make_user("anna")
+    ben = make_user("ben")
+    index = UserSearchIndex().sync()
+
+    with db_session:
+        User[ben].delete()
+    index.user_changed(ben)
+
+    assert results(index.sync()) == ["anna"]
+    assert results(index, q="ben") == []
+
+
+def test_gap_in_change_log_rebuilds(make_user):
+    make_user("anna")
+    index = UserSearchIndex().sync()
+    ben = make_user("ben")
+    index.user_changed(ben)
+    # Änderung abgelaufen oder verdrängt
+    cache.backend.delete(f"changes:{USER_INDEX_NAMESPACE}:{cache.version(USER_INDEX_NAMESPACE)}")
+
+    assert results(index.sync()) == ["anna", "ben"]
+    assert index.version == cache.version(USER_INDEX_NAMESPACE)
+
+
+def test_random_changes_match_rebuild():
+    rng = random.Random(7)
+    index = UserSearchIndex().sync()
+    user_ids = []
+    for step in range(120):
+        action = rng.random()
+        if action < 0.6 or not user_ids:
+            user_ids.append(add_user(index, f"user{rng.randrange(10 ** 6):06d}",
+                                     rng.choice(["Anna Muster", "Ben Berg", "Cleo Kasse"]),
+                                     rng.sample(["Kasse", "Aufbau", "Einlass"], rng.randint(0, 2))))
+        elif action < 0.8:
+            user_id = rng.choice(user_ids)
+            with db_session:
+                User[user_id].full_name = rng.choice(["Dora Zeller", "Emil Mustermann"])
+                User[user_id].is_active = rng.random() < 0.5
+            index.user_changed(user_id)
+        else:
+            user_id = user_ids.pop(rng.randrange(len(user_ids)))
+            with db_session:
+                User[user_id].delete()
+            index.user_changed(user_id)
+        if step % 10 == 0:
+            index.sync()
+    assert_same_results(index.sync())
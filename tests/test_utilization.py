@@ -0,0 +1,54 @@
+from datetime import datetime, date
+
+from pony.orm import db_session
+
+from app.models import schemas
+from app.models.entities import User, Availability
+from app.services.assignment_service import AssignmentService
+from app.services.utilization_service import UtilizationService
+
+
+def plan(username, project_id, start, end, status="geplant"):
+    return AssignmentService.create_assignment(username, schemas.AssignmentCreate(
+        project_id=project_id, start_date=start, end_date=end, status=status
+    ))
+
+
+def test_report_counts_duplicate_intervals(make_user, make_project):
+    make_user("anna")
+    project_id = make_project()
+    # Je zwei identische Einsätze im angeschnittenen März und im vollen April
+    for _ in range(2):
+        plan("anna", project_id, datetime(2030, 3, 15, 8), datetime(2030, 3, 15, 12))
+        plan("anna", project_id, datetime(2030, 4, 10, 8), datetime(2030, 4, 10, 12))
+
+    rows = UtilizationService.get_report(date(2030, 3, 10), date(2030, 5, 20))
+
+    assert [(row.username, row.project_id, row.assigned_hours) for row in rows] == [("anna", project_id, 16.0)]
+
+
+def test_report_matches_rollups_for_duplicate_availabilities(make_user):
+    user_id = make_user("ben")
+    with db_session:
+        user = User[user_id]
+        for _ in range(2):
+            Availability(name="Frei", user=user, start_time=datetime(2030, 6, 3, 8), end_time=datetime(2030, 6, 3, 14))
+    UtilizationService.rebuild_rollups()
+
+    # Voller Monat aus den Rollups, Teilmonat aus den Rohdaten
+    full_month = UtilizationService.get_report(date(2030, 6, 1), date(2030, 6, 30))
+    partial = UtilizationService.get_report(date(2030, 6, 2), date(2030, 6, 4))
+
+    assert [row.availability_hours for row in full_month] == [12.0]
+    assert [row.availability_hours for row in partial] == [12.0]
+
+
+def test_cancelled_assignments_are_ignored(make_user, make_project):
+    make_user("cleo")
+    project_id = make_project()
+    plan("cleo", project_id, datetime(2030, 3, 15, 8), datetime(2030, 3, 15, 12))
+    plan("cleo", project_id, datetime(2030, 3, 15, 8), datetime(2030, 3, 15, 12), status="storniert")
+
+    rows = UtilizationService.get_report(date(2030, 3, 1), date(2030, 3, 31))
+
+    assert [row.assigned_hours for row in rows] == [4.0]